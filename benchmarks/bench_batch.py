@@ -0,0 +1,35 @@
+"""Throughput of batched Jacobian evaluation with a growing process pool.
+
+Usage: python benchmarks/bench_batch.py [N]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append("./src/")
+
+import numpy as np
+
+from team20ad.batchAD import evaluate_many
+
+
+NAMES = ['x', 'y', 'z', 'w']
+FUNCS = ['x * y + sin(z) * w', 'exp(x / 4) * cos(y + z)', 'logsumexp(x, y, z, w)',
+         'sqrt(1 + x ** 2 + w ** 2)', 'tanh(x - y) * logistic(z)']
+
+
+def main(N=10 ** 6):
+    X = np.random.default_rng(0).uniform(-1, 1, (N, len(NAMES)))
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        evaluate_many(NAMES, FUNCS, X[:10 ** 4], workers=workers)  # warm the pool
+        start = time.perf_counter()
+        evaluate_many(NAMES, FUNCS, X, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>3} workers: {elapsed:7.2f}s  {N / elapsed:>12,.0f} points/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
@@ -0,0 +1,78 @@
+"""Per-operation timings of the elementary functions on scalars.
+
+Compares the math-module scalar path of team20ad.elementary with the NumPy
+ufunc it replaced, for plain floats and for scalar DualNumbers, and reports
+the speedup over that baseline.
+
+Usage: python benchmarks/bench_elementary.py [number] [--check]
+"""
+
+import sys
+import timeit
+
+sys.path.append("./src/")
+
+import numpy as np
+
+from team20ad import elementary
+from team20ad.dualNumber import DualNumber
+from team20ad.reverseAD import Node
+
+
+# NumPy reference kernels for a scalar DualNumber, as computed before the
+# math path was added (shared intermediates recomputed)
+_NUMPY_DUAL = {
+    'exp': lambda d: DualNumber(np.exp(d.real), np.exp(d.real) * d.dual),
+    'sin': lambda d: DualNumber(np.sin(d.real), np.cos(d.real) * d.dual),
+    'tan': lambda d: DualNumber(np.tan(d.real), 1 / (np.cos(d.real) ** 2) * d.dual),
+    'tanh': lambda d: DualNumber(np.tanh(d.real), (1 - np.tanh(d.real) ** 2) * d.dual),
+    'log': lambda d: DualNumber(np.log(d.real), 1 / d.real * d.dual),
+    'logistic': lambda d: DualNumber(1 / (1 + np.exp(-d.real)),
+                                     np.exp(-d.real) / (1 + np.exp(-d.real)) ** 2 * d.dual),
+}
+
+
+def per_op(stmts, number, repeat=7):
+    """Returns the best time of each statement in nanoseconds per call.
+
+    The statements are timed in turn within each repetition, so that load
+    changes on the machine affect them alike.
+    """
+    best = [float('inf')] * len(stmts)
+    for _ in range(repeat):
+        for k, stmt in enumerate(stmts):
+            best[k] = min(best[k], timeit.timeit(stmt, number=number) / number * 1e9)
+    return best
+
+
+def main(number=100000, check=False):
+    """Prints the timings and the speedups over the NumPy baseline.
+
+    With check, fails if the math path of any function is not faster than
+    the NumPy baseline on scalar DualNumbers, or is more than 25% slower on
+    plain floats. math.log parses an optional base, so on plain floats log
+    only matches np.log.
+    """
+    x, d = 0.3, DualNumber(0.3, 1.0)
+    print(f"{'function':<10}{'numpy float':>13}{'math float':>12}{'speedup':>9}"
+          f"{'numpy dual':>12}{'math dual':>11}{'speedup':>9}{'Node':>9}")
+    slower = []
+    for name, reference in _NUMPY_DUAL.items():
+        ufunc = getattr(np, name, None) or (lambda v: 1 / (1 + np.exp(-v)))
+        ours = getattr(elementary, name)
+        node = getattr(Node, name)
+        np_float, math_float, np_dual, math_dual, node_time = per_op(
+            [lambda: ufunc(x), lambda: ours(x), lambda: reference(d), lambda: ours(d),
+             lambda: node(Node(x))], number)
+        print(f"{name:<10}{np_float:>11.0f}ns{math_float:>10.0f}ns{np_float / math_float:>8.1f}x"
+              f"{np_dual:>10.0f}ns{math_dual:>9.0f}ns{np_dual / math_dual:>8.1f}x"
+              f"{node_time:>7.0f}ns")
+        if math_float > 1.25 * np_float or math_dual >= np_dual:
+            slower.append(name)
+    if check and slower:
+        sys.exit(f"slower than the NumPy baseline: {', '.join(slower)}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--check"]
+    main(int(args[0]) if args else 100000, "--check" in sys.argv)
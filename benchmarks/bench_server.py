@@ -0,0 +1,76 @@
+"""Throughput and latency of the gradient server against constructing AD per call.
+
+Starts `python -m team20ad.server` on a Unix socket and sends single-point
+requests from several concurrent clients.
+
+Usage: python benchmarks/bench_server.py [requests] [concurrency]
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append("./src/")
+
+import numpy as np
+
+from team20ad.server import GradientClient
+from team20ad.wrapperAD import AD
+
+
+NAMES = ['x', 'y', 'z']
+FUNCS = ['x * y + sin(z)', 'exp(x) / (1 + y ** 2)', 'logsumexp(x, z)', 'sqrt(x ** 2 + z ** 2)']
+
+
+async def run_clients(path, X, concurrency):
+    clients = [await GradientClient.connect(path) for _ in range(4)]
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(k):
+        async with limit:
+            start = time.perf_counter()
+            await clients[k % len(clients)].evaluate(NAMES, FUNCS, X[k])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(k) for k in range(len(X))))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return elapsed, np.array(latencies)
+
+
+def main(N=5000, concurrency=64):
+    X = np.random.default_rng(0).uniform(0.1, 1, (N, len(NAMES))).tolist()
+    path = os.path.join(tempfile.mkdtemp(), "team20ad.sock")
+    env = dict(os.environ, PYTHONPATH=os.path.abspath("./src"))
+    server = subprocess.Popen([sys.executable, "-m", "team20ad.server", "--unix", path],
+                              env=env, stdout=subprocess.PIPE)
+    server.stdout.readline()
+    try:
+        elapsed, latencies = asyncio.run(run_clients(path, X, concurrency))
+    finally:
+        server.terminate()
+    print(f"server:     {N / elapsed:>9,.0f} requests/s  p50 {np.percentile(latencies, 50) * 1e3:6.2f}ms"
+          f"  p99 {np.percentile(latencies, 99) * 1e3:6.2f}ms")
+
+    latencies = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for x in X[:N // 5]:
+            t = time.perf_counter()
+            AD(dict(zip(NAMES, x)), FUNCS)
+            latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    print(f"AD per call:{N // 5 / elapsed:>9,.0f} requests/s  p50 {np.percentile(latencies, 50) * 1e3:6.2f}ms"
+          f"  p99 {np.percentile(latencies, 99) * 1e3:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
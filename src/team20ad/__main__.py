@@ -0,0 +1,296 @@
+"""Command-line batch driver: ``python -m team20ad``.
+
+The functions are parsed once and the points are read, differentiated and
+written chunk by chunk, so point files larger than memory can be processed.
+
+Examples
+--------
+Values and Jacobians of two functions at the points of a CSV file, whose
+header names the variables::
+
+    python -m team20ad -v x,y -f "x * y" -f "exp(x + y)" points.csv -o out.ndjson
+
+The variable names are comma-separated, or given by repeating -v.
+
+The same from a JSON spec file ``{"vars": [...], "funcs": [...]}``, which may
+also set "mode", "chunk_size" and "workers"::
+
+    python -m team20ad --spec spec.json points.npy -o out.csv --workers 4
+
+Points are read from .csv (with or without a header of variable names),
+.npy (an (N, n) array, memory-mapped) or .ndjson/.jsonl (one JSON object
+keyed by variable name, or one list, per line) files. Results are written
+as .ndjson/.jsonl (one object ``{"f": [...], "J": [[...]]}`` per point) or
+.csv (the values f0, f1, ... then the partials df0/dx, df0/dy, ...), or as
+NDJSON to stdout if no output file is given. A throughput summary is
+printed to stderr at the end.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .batchAD import iter_jacobians
+from .compiledAD import CompiledAD
+from .costModel import CostModel
+from .crossCountryAD import CrossCountryAD
+from .mixedAD import MixedAD
+from .reverseAD import ReverseAD
+from .sparseAD import SparseAD
+
+
+MODES = ("batch", "auto", "forward", "reverse", "sparse", "mixed", "cross")
+
+
+def _names(text):
+    return [name.strip() for name in text.split(",") if name.strip()]
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m team20ad",
+        description="Evaluate functions and their Jacobians at the points of a file.")
+    parser.add_argument("points", help="point file (.csv, .npy, .ndjson or .jsonl)")
+    parser.add_argument("-f", "--func", action="append", dest="funcs", metavar="FUNC",
+                        help="a function string; repeat for several functions")
+    parser.add_argument("-v", "--vars", action="extend", type=_names, metavar="VARS",
+                        help="the variable names, comma-separated or repeated, in the order "
+                             "of the point columns")
+    parser.add_argument("--spec", help="JSON file with vars, funcs and optional settings")
+    parser.add_argument("-o", "--output", help="output file (.ndjson, .jsonl or .csv); "
+                                               "NDJSON to stdout if omitted")
+    parser.add_argument("-m", "--mode", choices=MODES,
+                        help="batch (default): vectorized forward mode over chunks of points "
+                             "in parallel; auto: the mode of least estimated cost; or a mode "
+                             "applied point by point")
+    parser.add_argument("-c", "--chunk-size", type=int, help="points per chunk (default 10000)")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes in batch mode (default 1)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print the summary")
+    return parser
+
+
+def _settings(args, parser):
+    """Merges the spec file and the command-line options."""
+    spec = {}
+    if args.spec:
+        try:
+            with open(args.spec) as f:
+                spec = json.load(f)
+        except (OSError, ValueError) as error:
+            parser.error(f"cannot read the spec file: {error}")
+        if not isinstance(spec, dict):
+            parser.error("the spec file should hold a JSON object")
+    var_names = args.vars or spec.get("vars")
+    func_list = args.funcs or spec.get("funcs")
+    if isinstance(func_list, str):
+        func_list = [func_list]
+    if not var_names or not func_list:
+        parser.error("the variables (-v or spec 'vars') and functions (-f or spec 'funcs') are required")
+    mode = args.mode or spec.get("mode", "batch")
+    if mode not in MODES:
+        parser.error(f"invalid mode '{mode}'")
+    chunk_size = args.chunk_size or spec.get("chunk_size", 10000)
+    workers = args.workers or spec.get("workers", 1)
+    if chunk_size < 1 or workers < 1:
+        parser.error("chunk size and workers should be positive")
+    if args.output and os.path.splitext(args.output)[1].lower() not in (".ndjson", ".jsonl", ".csv"):
+        parser.error("the output file should be a .ndjson, .jsonl or .csv file")
+    return list(var_names), list(func_list), mode, chunk_size, workers
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield np.array(chunk, dtype=float)
+
+
+def _row(values, width, path, line):
+    """Checks that a row of a point file holds width values."""
+    if len(values) != width:
+        raise ValueError(f"{path}, line {line}: expected {width} values, got {len(values)}.")
+    return values
+
+
+def read_points(path, var_names, chunk_size):
+    """Reads a point file chunk by chunk.
+
+    Parameters
+    ------
+    path : str
+        a .csv, .npy, .ndjson or .jsonl file
+    var_names : list of str
+        the variable names; they select the columns of a CSV file with a
+        header and the keys of NDJSON objects
+    chunk_size : int
+        the number of points per chunk
+
+    Yields
+    ------
+    numpy.array
+        arrays of at most chunk_size rows, one column per variable
+
+    Raises
+    ------
+    ValueError
+        if the file type is not supported or a row does not hold a value for
+        every variable; the message names the offending line
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        points = np.load(path, mmap_mode="r")
+        if points.ndim != 2 or points.shape[1] != len(var_names):
+            raise ValueError(f"Expected an array of shape (N, {len(var_names)}), got shape {points.shape}.")
+        for start in range(0, len(points), chunk_size):
+            yield np.asarray(points[start:start + chunk_size], dtype=float)
+    elif ext == ".csv":
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            first = next(reader, None)
+            if first is None:
+                return
+            rows = ((reader.line_num, row) for row in reader)
+            try:
+                rows = itertools.chain([(reader.line_num, [float(v) for v in first])], rows)
+                columns = range(len(var_names))
+                width = len(var_names)
+            except ValueError:  # header of variable names
+                header = [name.strip() for name in first]
+                missing = [v for v in var_names if v not in header]
+                if missing:
+                    raise ValueError(f"Missing columns for variables {missing}.")
+                columns = [header.index(v) for v in var_names]
+                width = len(header)
+
+            def points():
+                for line, row in rows:
+                    if row:
+                        _row(row, width, path, line)
+                        yield [row[i] for i in columns]
+            yield from _chunks(points(), chunk_size)
+    elif ext in (".ndjson", ".jsonl"):
+        def points():
+            with open(path) as f:
+                for number, line in enumerate(f, 1):
+                    if line.strip():
+                        point = json.loads(line)
+                        if isinstance(point, dict):
+                            missing = [v for v in var_names if v not in point]
+                            if missing:
+                                raise ValueError(f"{path}, line {number}: missing variables {missing}.")
+                            yield [point[v] for v in var_names]
+                        else:
+                            yield _row(point, len(var_names), path, number)
+        yield from _chunks(points(), chunk_size)
+    else:
+        raise ValueError(f"Unsupported point file '{path}'; use .csv, .npy, .ndjson or .jsonl.")
+
+
+class _Writer:
+    """Writes blocks of values and Jacobians as NDJSON or CSV."""
+
+    def __init__(self, path, var_names, func_list):
+        self.csv = path is not None and path.lower().endswith(".csv")
+        self._file = sys.stdout if path is None else open(path, "w", newline="")
+        if self.csv:
+            self._rows = csv.writer(self._file)
+            self._rows.writerow([f"f{j}" for j in range(len(func_list))] +
+                                [f"df{j}/d{v}" for j in range(len(func_list)) for v in var_names])
+
+    def write(self, func_evals, Dpf):
+        if self.csv:
+            self._rows.writerows(np.hstack([func_evals, Dpf.reshape(len(Dpf), -1)]).tolist())
+        else:
+            self._file.writelines(json.dumps({"f": f, "J": J}) + "\n"
+                                  for f, J in zip(func_evals.tolist(), Dpf.tolist()))
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+def point_evaluator(mode, var_names, func_list):
+    """Returns a function mapping a point to its values and Jacobian in a given mode.
+
+    The functions are parsed once; the tape of reverse and cross-country
+    mode is recorded at the first point and replayed at later ones.
+    """
+    if mode == "auto":
+        mode = CostModel(CompiledAD(var_names, func_list).graph).choose()
+    if mode == "forward":
+        return CompiledAD(var_names, func_list)
+    if mode == "sparse":
+        sparse = SparseAD(var_names, func_list)
+
+        def evaluate(x):
+            func_evals, J = sparse(x)
+            return func_evals, J.toarray()
+        return evaluate
+    if mode == "mixed":
+        return MixedAD(var_names, func_list)
+
+    engine = ReverseAD if mode == "reverse" else CrossCountryAD
+    recorded = []
+
+    def evaluate(x):
+        if not recorded:
+            recorded.append(engine(dict(zip(var_names, x)), func_list))
+            ad = recorded[0]
+            return np.array(ad.func_evals, dtype=float), ad.Dpf
+        func_evals, Dpf = recorded[0].replay(x)
+        return np.array(func_evals, dtype=float), Dpf
+    return evaluate
+
+
+def _blocks(chunks, mode, var_names, func_list, workers):
+    if mode == "batch":
+        yield from iter_jacobians(var_names, func_list, chunks, prefetch=1, workers=workers)
+        return
+    evaluate = point_evaluator(mode, var_names, func_list)
+    for chunk in chunks:
+        results = [evaluate(x) for x in chunk.tolist()]
+        m, n = len(func_list), len(var_names)
+        yield (np.array([f for f, _ in results]).reshape(len(chunk), m),
+               np.array([J for _, J in results]).reshape(len(chunk), m, n))
+
+
+def main(argv = None):
+    """Runs the batch driver with the given command-line arguments."""
+    parser = _parser()
+    args = parser.parse_args(argv)
+    var_names, func_list, mode, chunk_size, workers = _settings(args, parser)
+
+    start = time.perf_counter()
+    writer = _Writer(args.output, var_names, func_list)
+    count = 0
+    try:
+        chunks = read_points(args.points, var_names, chunk_size)
+        for func_evals, Dpf in _blocks(chunks, mode, var_names, func_list, workers):
+            writer.write(func_evals, Dpf)
+            count += len(func_evals)
+    except (OSError, ValueError, TypeError, KeyError, NameError, SyntaxError, ZeroDivisionError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        print(f"{count} points, {len(func_list)} functions, {len(var_names)} variables "
+              f"in {elapsed:.3f}s ({count / elapsed if elapsed else 0:,.0f} points/s, "
+              f"mode {mode}, {workers} worker{'s' if workers > 1 else ''})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
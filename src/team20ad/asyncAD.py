@@ -0,0 +1,154 @@
+"""Awaitable Jacobian evaluation for asyncio programs.
+
+The CPU work is offloaded to a thread or process pool, so evaluations do
+not block the event loop and can overlap with I/O. Large batches are
+submitted chunk by chunk: cancelling the awaiting task drops the chunks not
+started yet, and a concurrency limit bounds the number of chunks in flight.
+"""
+
+import asyncio
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from . import batchAD
+
+
+# executors shared by all evaluators, keyed by kind and number of workers
+_EXECUTORS = {}
+
+EXECUTORS = ("thread", "process")
+
+
+def _executor(kind, workers):
+    key = (kind, workers)
+    if key not in _EXECUTORS:
+        cls = ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor
+        _EXECUTORS[key] = cls(max_workers=workers)
+    return _EXECUTORS[key]
+
+
+@atexit.register
+def _shutdown():
+    """Shuts the executors down at exit, dropping the chunks not started yet."""
+    for executor in _EXECUTORS.values():
+        executor.shutdown(cancel_futures=True)
+    _EXECUTORS.clear()
+
+
+class AsyncAD:
+    """Awaitable evaluator of functions and their Jacobians.
+
+    Parameters
+    ------
+    var_names: list of str or dict
+        names of the independent variables; if a dict is given its keys are used
+    func_list: str or list of str
+        (a list of) function(s) encoded as string(s)
+    executor: {"thread", "process"}, optional (default = "thread")
+        where the evaluations run; NumPy releases the GIL in its kernels, so
+        threads already overlap, while processes scale pure-Python work
+    workers: int, optional
+        the number of threads or processes (default: the number of CPUs)
+    max_concurrency: int, optional
+        the largest number of chunks evaluated at once across all calls of
+        this evaluator; unlimited if None
+    chunk_size: int, optional (default = 10000)
+        the number of points submitted to the pool at once
+
+    Examples
+    --------
+    >>> f = AsyncAD(['x', 'y'], ['x * y', 'exp(x + y)'])
+    >>> func_evals, Dpf = asyncio.run(f.jacobian([1, 0]))
+    >>> Dpf
+    array([[0.        , 1.        ],
+           [2.71828183, 2.71828183]])
+    """
+
+    def __init__(self, var_names, func_list, executor = "thread", workers = None,
+                 max_concurrency = None, chunk_size = 10000):
+        if executor not in EXECUTORS:
+            raise ValueError("executor can be either thread or process.")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency should be a positive integer.")
+        self.var_names = list(var_names)
+        self.func_list = func_list if isinstance(func_list, list) else [func_list]
+        self.executor = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self._compiled = batchAD._evaluator(self.var_names, self.func_list)  # parse errors surface here
+        self._limits = {}
+
+    def __repr__(self):
+        return f"AsyncAD({self.var_names}, {self.func_list}, executor='{self.executor}')"
+
+    def _limit(self):
+        """Returns the semaphore of the running event loop, if any limit is set."""
+        if self.max_concurrency is None:
+            return None
+        loop = asyncio.get_running_loop()
+        if loop not in self._limits:
+            self._limits.clear()  # semaphores of a closed loop cannot be reused
+            self._limits[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._limits[loop]
+
+    async def _chunk(self, points):
+        loop = asyncio.get_running_loop()
+        pool = _executor(self.executor, self.workers)
+        limit = self._limit()
+        if limit is None:
+            return await loop.run_in_executor(pool, batchAD._evaluate_chunk,
+                                              self.var_names, self.func_list, points)
+        async with limit:
+            return await loop.run_in_executor(pool, batchAD._evaluate_chunk,
+                                              self.var_names, self.func_list, points)
+
+    async def jacobian(self, points):
+        """Evaluates the functions and their Jacobian at one point or a batch.
+
+        Parameter
+        ------
+        points : dict, sequence or numpy.array
+            one point (values keyed by name or in the order of var_names), or
+            a batch as an array of shape (N, n) or a dict of N values per variable
+
+        Returns
+        ------
+        func_evals : numpy.array
+            shape (m,) for one point, (N, m) for a batch
+        Dpf : numpy.array
+            shape (m, n) for one point, (N, m, n) for a batch
+
+        Raises
+        ------
+        asyncio.CancelledError
+            if the awaiting task is cancelled; chunks not started are dropped
+        """
+        if isinstance(points, dict):
+            single = all(np.ndim(v) == 0 for v in points.values())
+        else:
+            single = np.ndim(points) == 1
+        if single:
+            X = np.array([self._compiled._point(points)])
+        else:
+            X = self._compiled._points(points)
+
+        bounds = batchAD.chunk_bounds(len(X), self.chunk_size)
+        tasks = [asyncio.ensure_future(self._chunk(X[start:stop])) for start, stop in bounds]
+        try:
+            blocks = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        if not blocks:
+            m, n = len(self.func_list), len(self.var_names)
+            return np.zeros((0, m)), np.zeros((0, m, n))
+        func_evals = np.concatenate([F for F, _ in blocks])
+        Dpf = np.concatenate([J for _, J in blocks])
+        if single:
+            return func_evals[0], Dpf[0]
+        return func_evals, Dpf
@@ -0,0 +1,457 @@
+"""Jacobians at many points, spread over a process pool.
+
+The points are split into chunks of consecutive rows. Each chunk is
+evaluated by a vectorized pass of a compiled evaluator (see
+CompiledAD.evaluate_batch), and the chunks are distributed over the
+workers of a concurrent.futures process pool. Every worker parses the
+functions once and keeps the compiled evaluator for later chunks and calls
+(up to MAX_EVALUATORS of them, least recently used first out). A pool
+whose worker died is replaced by a new one.
+
+The points and the results are not pickled: they are placed in shared
+memory blocks (or memory-mapped temporary files) that the workers map
+directly, so only the names of the blocks and the row range of a chunk
+cross process boundaries, and each worker writes its rows of the values
+and Jacobians in place.
+
+Streams of point chunks that do not fit in memory are differentiated one
+chunk at a time by iter_jacobians, which can read the next chunk in a
+background thread while the current one is differentiated.
+
+Results larger than memory can be written chunk by chunk into a
+caller-supplied np.memmap or .npy file, which the workers then map
+directly. Two layouts are supported, for N points, m functions and n
+variables:
+
+    "point"   (point-major)  values (N, m), Jacobians (N, m, n): the
+              Jacobian at a point is contiguous, Dpf[k, j, i] = df_j/dx_i
+              at point k
+    "output"  (output-major) values (m, N), Jacobians (m, n, N): every
+              partial derivative over all points is contiguous,
+              Dpf[j, i, k] = df_j/dx_i at point k
+"""
+
+import atexit
+import mmap
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .compiledAD import CompiledAD
+
+
+# compiled evaluators of this process, keyed by variable names and functions,
+# least recently used first
+_EVALUATORS = OrderedDict()
+
+# the number of compiled evaluators kept by each process
+MAX_EVALUATORS = 128
+
+# process pools kept alive between calls, keyed by their number of workers
+_POOLS = {}
+
+# where the points and results shared with the workers live
+TRANSPORTS = ("shared_memory", "memmap")
+
+# memory layouts of the results (see the module docstring)
+LAYOUTS = ("point", "output")
+
+# chunks smaller than this do not amortize the cost of a pool round trip
+MIN_CHUNK = 1024
+
+
+def _evaluator(var_names, func_list):
+    """Returns the compiled evaluator of this process for the given functions."""
+    key = (tuple(var_names), tuple(func_list))
+    if key in _EVALUATORS:
+        _EVALUATORS.move_to_end(key)
+    else:
+        _EVALUATORS[key] = CompiledAD(list(var_names), list(func_list))
+        if len(_EVALUATORS) > MAX_EVALUATORS:
+            _EVALUATORS.popitem(last=False)
+    return _EVALUATORS[key]
+
+
+def _evaluate_chunk(var_names, func_list, points):
+    return _evaluator(var_names, func_list).evaluate_batch(points)
+
+
+def _store(F, J, start, stop, func_evals, Dpf, layout):
+    """Writes the results at points start:stop into arrays of the given layout."""
+    if layout == "point":
+        F[start:stop] = func_evals
+        J[start:stop] = Dpf
+    else:
+        F[:, start:stop] = func_evals.T
+        J[:, :, start:stop] = Dpf.transpose(1, 2, 0)
+
+
+def _map(handle):
+    """Maps an array described by a handle; returns it and its shared memory block."""
+    kind, name, shape, offset = handle
+    if kind == 'memmap':
+        return np.memmap(name, dtype=float, mode='r+', shape=shape, offset=offset), None
+    block = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=float, buffer=block.buf), block
+
+
+def _handle(array):
+    """Returns the handle of an array mapping a whole file, or None."""
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and \
+            array.dtype == float and array.flags.c_contiguous and array.filename:
+        return ('memmap', array.filename, array.shape, array.offset)
+    return None
+
+
+def _evaluate_mapped(var_names, func_list, handles, start, stop, layout = "point"):
+    """Evaluates rows start:stop of mapped points into mapped results."""
+    arrays, blocks = zip(*[_map(handle) for handle in handles])
+    try:
+        X, F, J = arrays
+        _store(F, J, start, stop, *_evaluate_chunk(var_names, func_list, X[start:stop]), layout)
+        for array in (F, J):
+            if isinstance(array, np.memmap):
+                array.flush()
+        return stop - start
+    finally:
+        arrays = X = F = J = None  # release the buffers before closing the blocks
+        for block in blocks:
+            if block is not None:
+                block.close()
+
+
+class _Transport:
+    """Arrays shared with the worker processes, as shared memory or memmap files.
+
+    Parameter
+    ------
+    kind : {"shared_memory", "memmap"}
+        where the arrays live
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._blocks = []
+        self._dir = tempfile.mkdtemp(prefix='team20ad-') if kind == 'memmap' else None
+
+    def array(self, shape):
+        """Allocates an array; returns it and the handle workers map it with."""
+        size = int(np.prod(shape)) * 8
+        if self.kind == 'memmap':
+            path = os.path.join(self._dir, f'{len(self._blocks)}.dat')
+            self._blocks.append(path)
+            return np.memmap(path, dtype=float, mode='w+', shape=shape), ('memmap', path, shape, 0)
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._blocks.append(block)
+        return np.ndarray(shape, dtype=float, buffer=block.buf), ('shared_memory', block.name, shape, 0)
+
+    def close(self):
+        """Frees every array; arrays returned by array() must not be used afterwards."""
+        if self.kind == 'memmap':
+            shutil.rmtree(self._dir, ignore_errors=True)
+        else:
+            for block in self._blocks:
+                block.close()
+                block.unlink()
+        self._blocks = []
+
+
+def _pool(workers):
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _POOLS[workers]
+
+
+def _discard(workers):
+    """Drops a pool broken by the death of a worker; the next call starts a new one."""
+    pool = _POOLS.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(workers, fn, calls):
+    """Submits fn(*args) for each args, replacing the pool if a worker died since its last use."""
+    try:
+        return [_pool(workers).submit(fn, *args) for args in calls]
+    except BrokenProcessPool:
+        _discard(workers)
+        return [_pool(workers).submit(fn, *args) for args in calls]
+
+
+@atexit.register
+def _shutdown():
+    """Shuts the pools down at exit, dropping the chunks not started yet."""
+    for pool in _POOLS.values():
+        pool.shutdown(cancel_futures=True)
+    _POOLS.clear()
+
+
+def _func_list(func_list):
+    return func_list if isinstance(func_list, list) else [func_list]
+
+
+def chunk_bounds(N, chunk_size = None, workers = None):
+    """Splits N points into chunks of consecutive rows.
+
+    Parameters
+    ------
+    N : int
+        the number of points
+    chunk_size : int, optional
+        the number of points per chunk; by default about four chunks per
+        worker, but at least MIN_CHUNK points
+    workers : int, optional
+        the number of workers (default: the number of CPUs)
+
+    Returns
+    ------
+    list of tuple
+        the (start, stop) row range of each chunk
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(MIN_CHUNK, -(-N // (4 * workers)))
+    if chunk_size < 1:
+        raise ValueError("chunk_size should be a positive integer.")
+    return [(start, min(start + chunk_size, N)) for start in range(0, N, chunk_size)]
+
+
+def _output(out, shape, name):
+    """Returns the array results are written into: out, a new .npy file or a new array."""
+    if out is None:
+        return np.empty(shape)
+    if isinstance(out, (str, os.PathLike)):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=float, shape=shape)
+    if not isinstance(out, np.ndarray) or out.shape != shape:
+        raise ValueError(f"{name} should be an array of shape {shape}.")
+    return out
+
+
+def evaluate_many(var_names, func_list, points, chunk_size = None, workers = None,
+                  transport = "shared_memory", out = None, values = None, layout = "point"):
+    """Evaluates the functions and their Jacobians at many points in parallel.
+
+    Parameters
+    ------
+    var_names : list of str or dict
+        names of the independent variables; if a dict is given its keys are used
+    func_list : str or list of str
+        (a list of) function(s) encoded as string(s)
+    points : numpy.array or dict
+        array of shape (N, n) with one column per variable (e.g. an
+        np.memmap), or a dict mapping each variable name to an array of N values
+    chunk_size : int, optional
+        the number of points per chunk (see chunk_bounds)
+    workers : int, optional
+        the number of worker processes (default: the number of CPUs); with
+        one worker, or a single chunk, the points are evaluated in this process
+    transport : {"shared_memory", "memmap"}, optional
+        how the points and results are shared with the workers: shared
+        memory blocks, or memory-mapped files in a temporary directory
+    out : numpy.array or str, optional
+        where to write the Jacobians, chunk by chunk: an array (e.g. an
+        np.memmap) of the shape given by layout, or the path of a .npy file
+        to create. Workers write into np.memmap outputs directly.
+    values : numpy.array or str, optional
+        where to write the function values, like out
+    layout : {"point", "output"}, optional (default = "point")
+        point-major or output-major results (see the module docstring)
+
+    Returns
+    ------
+    func_evals : numpy.array
+        the function values, of shape (N, m), or (m, N) output-major
+    Dpf : numpy.array
+        the Jacobians, of shape (N, m, n), or (m, n, N) output-major; out
+        itself (or the np.memmap of its file) if given
+
+    Notes
+    ------
+    Custom primitives (see primitives.register) must be registered when
+    the workers start, e.g. at import time of a module, unless processes
+    are started by fork.
+
+    Examples
+    --------
+    >>> X = np.array([[0., 1.], [1., 2.], [2., 3.]])
+    >>> func_evals, Dpf = evaluate_many(['x', 'y'], ['x * y'], X, workers=1)
+    >>> Dpf[:, 0, :]
+    array([[1., 0.],
+           [2., 1.],
+           [3., 2.]])
+    >>> func_evals, Dpf = evaluate_many(['x', 'y'], ['x * y'], X, workers=1, layout='output')
+    >>> Dpf[0]
+    array([[1., 2., 3.],
+           [0., 1., 2.]])
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError("transport can be either shared_memory or memmap.")
+    if layout not in LAYOUTS:
+        raise ValueError("layout can be either point or output.")
+    var_names = list(var_names)
+    func_list = _func_list(func_list)
+    points = _evaluator(var_names, func_list)._points(points)
+    N, n = points.shape
+    m = len(func_list)
+    if layout == "point":
+        F = _output(values, (N, m), "values")
+        J = _output(out, (N, m, n), "out")
+    else:
+        F = _output(values, (m, N), "values")
+        J = _output(out, (m, n, N), "out")
+
+    workers = workers or os.cpu_count() or 1
+    bounds = chunk_bounds(N, chunk_size, workers)
+    if workers == 1 or len(bounds) <= 1:
+        for start, stop in bounds:
+            _store(F, J, start, stop, *_evaluate_chunk(var_names, func_list, points[start:stop]), layout)
+    else:
+        _evaluate_parallel(var_names, func_list, points, F, J, bounds, workers, transport, layout)
+
+    for array in (F, J):
+        if isinstance(array, np.memmap):
+            array.flush()
+    return F, J
+
+
+def _evaluate_parallel(var_names, func_list, points, F, J, bounds, workers, transport, layout):
+    """Evaluates chunks in the pool; results not in a file are shared through the transport."""
+    shared = _Transport(transport)
+    copies, futures = [], []
+    try:
+        X, handle = shared.array(points.shape)
+        X[:] = points
+        handles = [handle]
+        for array in (F, J):
+            handle = _handle(array)
+            if handle is None:
+                copy, handle = shared.array(array.shape)
+                copies.append((array, copy))
+            handles.append(handle)
+
+        futures.extend(_submit(workers, _evaluate_mapped, [(var_names, func_list, tuple(handles),
+                                                            start, stop, layout) for start, stop in bounds]))
+        try:
+            for future in futures:
+                future.result()
+        except BrokenProcessPool:
+            _discard(workers)
+            raise
+        for array, copy in copies:
+            array[...] = copy
+    finally:
+        # on failure, the chunks still running write into the shared arrays:
+        # drop the pending ones and wait for the others before closing them
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        X = copies = copy = None  # release the buffers before closing the blocks
+        shared.close()
+
+
+class _Raised:
+    """An exception raised by the iterable read in a background thread."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _prefetch(iterable, depth):
+    """Iterates over an iterable read ahead by a background thread.
+
+    At most depth items are read ahead, so memory stays bounded. If the
+    iteration stops early, the thread stops after its current item.
+    """
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as error:
+            put(_Raised(error))
+            return
+        put(done)
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_jacobians(var_names, func_list, chunks, prefetch = 0, workers = 1,
+                   transport = "shared_memory"):
+    """Evaluates the functions and their Jacobians over a stream of point chunks.
+
+    The chunks are read and differentiated one at a time and a block of
+    results is yielded per chunk, so the stream may be unbounded and only
+    a few chunks are held in memory at once.
+
+    Parameters
+    ------
+    var_names : list of str or dict
+        names of the independent variables; if a dict is given its keys are used
+    func_list : str or list of str
+        (a list of) function(s) encoded as string(s)
+    chunks : iterable
+        chunks of points, each an array of shape (k, n) or a dict mapping
+        each variable name to k values
+    prefetch : int, optional (default = 0)
+        the number of chunks read ahead by a background thread while the
+        current chunk is differentiated, e.g. to overlap reading a file
+    workers : int, optional (default = 1)
+        the number of worker processes each chunk is split over (see
+        evaluate_many)
+    transport : {"shared_memory", "memmap"}, optional
+        how points and results are shared with the workers
+
+    Yields
+    ------
+    func_evals : numpy.array
+        array of shape (k, m), the function values at the points of a chunk
+    Dpf : numpy.array
+        array of shape (k, m, n), the Jacobians at the points of a chunk
+
+    Examples
+    --------
+    >>> chunks = (np.full((2, 1), float(i)) for i in range(3))
+    >>> for func_evals, Dpf in iter_jacobians(['x'], 'x ** 2', chunks):
+    ...     print(Dpf[:, 0, 0])
+    [0. 0.]
+    [2. 2.]
+    [4. 4.]
+    """
+    if prefetch < 0:
+        raise ValueError("prefetch should be a non-negative integer.")
+    if prefetch:
+        chunks = _prefetch(chunks, prefetch)
+    for chunk in chunks:
+        yield evaluate_many(var_names, func_list, chunk, workers=workers, transport=transport)
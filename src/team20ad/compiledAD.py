@@ -0,0 +1,497 @@
+"""Compiled Jacobian evaluators for functions encoded as strings.
+
+The function strings are parsed once into an expression graph; the returned
+evaluator then only replays that graph at each new point.
+"""
+
+import ast
+
+import numpy as np
+
+from . import elementary, tape
+from .dualNumber import DualNumber
+from .taylorNumber import TaylorNumber
+
+
+_supported_scalars = (int, float)
+
+# the primitives of the registry, generated for DualNumbers and arrays
+_FUNCTIONS = elementary.FUNCTIONS
+
+_BINOPS = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul',
+           ast.Div: 'truediv', ast.Pow: 'pow'}
+
+_OPERATORS = {
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'truediv': lambda a, b: a / b,
+    'pow': lambda a, b: a ** b,
+    'neg': lambda a: -a,
+    'abs': abs,
+}
+
+
+class Graph:
+    """Expression graph shared by all functions of a compiled evaluator.
+
+    Nodes are stored in topological order; identical subexpressions are
+    stored once and shared between functions.
+
+    Parameters
+    ------
+    var_names: list of str
+        names of the independent variables, in order
+    func_list: list of str
+        functions encoded as strings
+
+    Attributes
+    ------
+    nodes: list of tuple
+        ``(op, args, kwargs)`` for each node, where ``op`` is 'var', 'const',
+        an operator name or a function name; ``args`` holds node indices
+        (or the variable index / constant value for 'var' and 'const') and
+        ``kwargs`` holds ``(name, node index)`` pairs of keyword arguments.
+    outputs: list of int
+        node index of each function
+    """
+
+    def __init__(self, var_names, func_list):
+        self.var_names = list(var_names)
+        self.nodes = []
+        self._index = {}
+        self._vars = {}
+        for i, name in enumerate(self.var_names):
+            self._vars.setdefault(name, self._add('var', (i,)))
+        self.outputs = [self._build(self._parse(func).body) for func in func_list]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @staticmethod
+    def _parse(func):
+        try:
+            return ast.parse(func.strip(), mode='eval')
+        except SyntaxError:
+            raise ValueError(f"Cannot parse function '{func}'.")
+
+    def _add(self, op, args, kwargs = ()):
+        key = (op, args, kwargs)
+        if key not in self._index:
+            self._index[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self._index[key]
+
+    def _build(self, tree):
+        if isinstance(tree, ast.Constant):
+            if isinstance(tree.value, bool) or not isinstance(tree.value, _supported_scalars):
+                raise TypeError(f"Unsupported constant '{tree.value}'")
+            return self._add('const', (tree.value,))
+        if isinstance(tree, ast.Name):
+            if tree.id not in self._vars:
+                raise NameError(f"name '{tree.id}' is not defined")
+            return self._vars[tree.id]
+        if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, (ast.UAdd, ast.USub)):
+            operand = self._build(tree.operand)
+            if isinstance(tree.op, ast.UAdd):
+                return operand
+            return self._add('neg', (operand,))
+        if isinstance(tree, ast.BinOp) and type(tree.op) in _BINOPS:
+            return self._add(_BINOPS[type(tree.op)],
+                             (self._build(tree.left), self._build(tree.right)))
+        if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name):
+            if tree.func.id == 'abs' and len(tree.args) == 1 and not tree.keywords:
+                return self._add('abs', (self._build(tree.args[0]),))
+            if tree.func.id not in _FUNCTIONS:
+                raise NameError(f"name '{tree.func.id}' is not defined")
+            args = tuple(self._build(arg) for arg in tree.args)
+            kwargs = tuple((kw.arg, self._build(kw.value)) for kw in tree.keywords)
+            return self._add(tree.func.id, args, kwargs)
+        raise ValueError(f"Unsupported expression '{ast.unparse(tree)}'")
+
+
+class CompiledAD:
+    """Jacobian evaluator compiled once from string-encoded functions.
+
+    Parameters
+    ------
+    var_names: list of str or dict
+        names of the independent variables; if a dict is given its keys are used
+    func_list: str or list of str
+        (a list of) function(s) encoded as string(s)
+
+    Attributes
+    ------
+    var_names: list of str
+        names of the independent variables, in the order of the Jacobian columns
+    func_list: list of str
+        functions encoded as strings, in the order of the Jacobian rows
+    graph: Graph
+        the parsed expression graph
+
+    Examples
+    --------
+    >>> f = CompiledAD(['x', 'y'], ['x**2 + y**2', 'exp(x + y)'])
+    >>> func_evals, Dpf = f({'x': 1, 'y': 1})
+    >>> func_evals
+    array([2.       , 7.3890561])
+    >>> Dpf
+    array([[2.       , 2.       ],
+           [7.3890561, 7.3890561]])
+    >>> f([0, 0])[0]
+    array([0., 1.])
+    """
+
+    def __init__(self, var_names, func_list):
+        # type checks
+        if isinstance(var_names, dict):
+            var_names = list(var_names.keys())
+        if not isinstance(var_names, (list, tuple)) or \
+                not all(isinstance(v, str) for v in var_names):
+            raise TypeError("var_names should be a list of strings.")
+
+        if isinstance(func_list, list):
+            for f in func_list:
+                if not isinstance(f, str):
+                    raise TypeError("func_list should be a string or a list of strings.")
+        elif not isinstance(func_list, str):
+            raise TypeError("func_list should be a string or a list of strings.")
+
+        self.var_names = list(var_names)
+        if isinstance(func_list, list):
+            self.func_list = func_list
+        else:
+            self.func_list = [func_list]
+
+        self.graph = Graph(self.var_names, self.func_list)
+        self._program = self._link(self.graph, _FUNCTIONS)
+        self._tape_program = self._link(self.graph, tape.FUNCTIONS)
+        self._tape = None
+
+    def __repr__(self):
+        return f"CompiledAD({self.var_names}, {self.func_list})"
+
+    @staticmethod
+    def _link(graph, functions):
+        """Resolves every graph node to the callable that evaluates it."""
+        program = []
+        for op, args, kwargs in graph.nodes:
+            if op in ('var', 'const'):
+                program.append((op, args[0], ()))
+            elif op in _OPERATORS:
+                program.append((_OPERATORS[op], args, kwargs))
+            else:
+                program.append((functions[op], args, kwargs))
+        return program
+
+    def _point(self, point):
+        """Converts a point given as a dict or a sequence to a list of floats."""
+        if isinstance(point, dict):
+            try:
+                return [float(point[v]) for v in self.var_names]
+            except KeyError as e:
+                raise ValueError(f"Missing value for variable {e}.")
+        point = np.asarray(point, dtype=float)
+        if point.shape != (len(self.var_names),):
+            raise ValueError(f"Expected {len(self.var_names)} values, got shape {point.shape}.")
+        return point.tolist()
+
+    def _points(self, points):
+        """Converts a batch of points to a float array of shape (N, n).
+
+        The points are given either as a 2-D array with one column per
+        variable or as a dict mapping each variable name to an array of values.
+        """
+        if isinstance(points, dict):
+            try:
+                columns = [np.asarray(points[v], dtype=float) for v in self.var_names]
+            except KeyError as e:
+                raise ValueError(f"Missing values for variable {e}.")
+            points = np.column_stack(columns) if columns else np.zeros((0, 0))
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or points.shape[1] != len(self.var_names):
+            raise ValueError(f"Expected an array of shape (N, {len(self.var_names)}), got shape {points.shape}.")
+        return points
+
+    def _run(self, inputs, program = None):
+        """Evaluates the graph with the given variable values.
+
+        The values may be any objects supported by the elementary functions,
+        e.g. floats or DualNumbers, or TapeVars when run with the tape program.
+        """
+        vals = []
+        for fn, args, kwargs in program or self._program:
+            if fn == 'var':
+                vals.append(inputs[args])
+            elif fn == 'const':
+                vals.append(args)
+            else:
+                vals.append(fn(*[vals[a] for a in args],
+                               **{k: vals[a] for k, a in kwargs}))
+        return [vals[i] for i in self.graph.outputs]
+
+    def __call__(self, point):
+        """Evaluates the functions and their Jacobian at a point.
+
+        Parameter
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+
+        Returns
+        ------
+        func_evals : numpy.array
+            the evaluation of the function(s) at the point
+        Dpf : numpy.array
+            the Jacobian of the function(s) at the point
+        """
+        x = self._point(point)
+        n, m = len(x), len(self.func_list)
+        func_evals = np.zeros(m)
+        Dpf = np.zeros((m, n))
+
+        # vector mode: one pass with the identity matrix as seed tangents
+        seeds = np.eye(n)
+        for j, out in enumerate(self._run([DualNumber(x[i], seeds[i]) for i in range(n)])):
+            if isinstance(out, DualNumber):
+                func_evals[j] = out.real
+                Dpf[j] = out.dual
+            else:  # function does not depend on any variable
+                func_evals[j] = out
+
+        return func_evals, Dpf
+
+    def evaluate_batch(self, points):
+        """Evaluates the functions and their Jacobians at many points at once.
+
+        Each variable is seeded with a batched DualNumber whose real part holds
+        the values at all N points, so every graph node is computed by a few
+        vectorized NumPy calls rather than once per point.
+
+        Parameter
+        ------
+        points : numpy.array or dict
+            array of shape (N, n) with one column per variable, or a dict
+            mapping each variable name to an array of N values
+
+        Returns
+        ------
+        func_evals : numpy.array
+            array of shape (N, m), the function values at each point
+        Dpf : numpy.array
+            array of shape (N, m, n), the Jacobian at each point
+        """
+        X = self._points(points)
+        N, n = X.shape
+        m = len(self.func_list)
+        func_evals = np.zeros((N, m))
+        Dpf = np.zeros((N, m, n))
+
+        # seed tangents of shape (n, 1) broadcast against the (N,) values
+        seeds = np.eye(n)[:, :, None]
+        for j, out in enumerate(self._run([DualNumber(X[:, i].copy(), seeds[i]) for i in range(n)])):
+            if isinstance(out, DualNumber):
+                func_evals[:, j] = out.real
+                Dpf[:, j, :] = np.broadcast_to(out.dual, (n, N)).T
+            else:  # function does not depend on any variable
+                func_evals[:, j] = out
+
+        return func_evals, Dpf
+
+    def _record(self, x):
+        """Returns the graph recorded on a tape at point x.
+
+        The tape is recorded on first use and replayed at later points.
+        """
+        if self._tape is None:
+            t = tape.Tape()
+            inputs = [t.variable(v) for v in x]
+            self._tape = (t, inputs, self._run(inputs, self._tape_program))
+        else:
+            self._tape[0].replay(x)
+        return self._tape
+
+    def jvp(self, point, v):
+        """Computes the Jacobian-vector product J @ v with a single forward pass.
+
+        Parameters
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+        v : sequence of float
+            the tangent direction, one value per variable
+
+        Returns
+        ------
+        func_evals : numpy.array
+            the evaluation of the function(s) at the point
+        Jv : numpy.array
+            the directional derivative of each function along v
+
+        Examples
+        --------
+        >>> f = CompiledAD(['x', 'y'], ['x * y', 'x + y'])
+        >>> f.jvp([2, 3], [1, 1])
+        (array([6., 5.]), array([5., 2.]))
+        """
+        x = self._point(point)
+        v = self._point(v)
+        func_evals = np.zeros(len(self.func_list))
+        Jv = np.zeros(len(self.func_list))
+        for j, out in enumerate(self._run([DualNumber(a, b) for a, b in zip(x, v)])):
+            if isinstance(out, DualNumber):
+                func_evals[j], Jv[j] = out.real, out.dual
+            else:  # function does not depend on any variable
+                func_evals[j] = out
+        return func_evals, Jv
+
+    def vjp(self, point, u):
+        """Computes the vector-Jacobian product u @ J with a single reverse sweep.
+
+        The graph is recorded on a tape on first use; later calls replay it at
+        the new point, so no graph is rebuilt.
+
+        Parameters
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+        u : sequence of float
+            the adjoint seed, one value per function
+
+        Returns
+        ------
+        func_evals : numpy.array
+            the evaluation of the function(s) at the point
+        uJ : numpy.array
+            the weighted sum of the gradients, one value per variable
+
+        Examples
+        --------
+        >>> f = CompiledAD(['x', 'y'], ['x * y', 'x + y'])
+        >>> f.vjp([2, 3], [1, -1])
+        (array([6., 5.]), array([2., 1.]))
+        """
+        t, inputs, outputs = self._record(self._point(point))
+        func_evals = np.array([getattr(out, 'value', out) for out in outputs], dtype=float)
+        return func_evals, t.vjp(outputs, np.asarray(u, dtype=float).ravel(), inputs)
+
+    def _second_order(self, point, seeds, output):
+        """Pushes DualNumbers seeded with `seeds` through the tape's reverse sweep."""
+        if not 0 <= output < len(self.func_list):
+            raise IndexError(f"Function index {output} out of range.")
+        x = self._point(point)
+        shape = (len(x),) + (np.shape(seeds[0]) if len(seeds) else ())
+        t, inputs, outputs = self._record(x)
+        if not isinstance(outputs[output], tape.TapeVar):  # constant function
+            return np.zeros(len(x)), np.zeros(shape)
+
+        adj = t.gradient_at(outputs[output], [DualNumber(a, d) for a, d in zip(x, seeds)], inputs)
+        grad = np.zeros(len(x))
+        second = np.zeros(shape)
+        for k, a in enumerate(adj):
+            if isinstance(a, DualNumber):
+                grad[k], second[k] = a.real, a.dual
+            else:  # adjoint does not depend on the variables
+                grad[k] = a
+        return grad, second
+
+    def hvp(self, point, v, output = 0):
+        """Computes an exact Hessian-vector product by forward-over-reverse.
+
+        The variables are seeded as DualNumbers with tangent v and pushed
+        through both the forward replay and the reverse sweep of the tape, so
+        the cost is about that of a few gradient evaluations.
+
+        Parameters
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+        v : sequence of float
+            the direction, one value per variable
+        output : int, optional (default = 0)
+            index of the function whose Hessian is used
+
+        Returns
+        ------
+        grad : numpy.array
+            the gradient of the function at the point
+        Hv : numpy.array
+            the product of the Hessian at the point with v
+
+        Examples
+        --------
+        >>> f = CompiledAD(['x', 'y'], 'x**2 * y')
+        >>> f.hvp([1, 2], [1, 0])
+        (array([4., 1.]), array([4., 2.]))
+        """
+        return self._second_order(point, self._point(v), output)
+
+    def hessian(self, point, output = 0):
+        """Computes the full Hessian of one function by forward-over-reverse.
+
+        All n Hessian-vector products are computed at once by seeding the
+        variables with vector-mode DualNumbers whose tangents are the rows of
+        the identity matrix.
+
+        Parameters
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+        output : int, optional (default = 0)
+            index of the function whose Hessian is computed
+
+        Returns
+        ------
+        numpy.array
+            array of shape (n, n), the Hessian at the point
+
+        Examples
+        --------
+        >>> f = CompiledAD(['x', 'y'], 'x**2 * y')
+        >>> f.hessian([1, 2])
+        array([[4., 2.],
+               [2., 0.]])
+        """
+        n = len(self.var_names)
+        return self._second_order(point, list(np.eye(n)), output)[1]
+
+    def taylor(self, point, direction, order):
+        """Computes derivatives of every order up to `order` along a direction.
+
+        The variables are seeded as TaylorNumbers x + t * direction, so the
+        k-th derivative of each function along the direction costs O(k^2)
+        per operation.
+
+        Parameters
+        ------
+        point : dict, sequence or numpy.array
+            values of the variables, or an array of shape (N, n) of points
+        direction : sequence or numpy.array
+            the direction, of shape (n,), or (N, n) for one direction per point
+        order : int
+            the highest derivative order
+
+        Returns
+        ------
+        numpy.array
+            array of shape (m, order + 1), or (N, m, order + 1) for a batch of
+            points, holding d^k/dt^k f(x + t * direction) at t = 0
+
+        Examples
+        --------
+        >>> f = CompiledAD(['x', 'y'], ['x * exp(y)'])
+        >>> f.taylor([1, 0], [0, 1], 3)
+        array([[1., 1., 1., 1.]])
+        """
+        batched = not isinstance(point, dict) and np.ndim(point) == 2
+        x = self._points(point) if batched else np.array(self._point(point))
+        d = np.broadcast_to(np.asarray(direction, dtype=float), x.shape)
+        seeds = [TaylorNumber.variable(x[..., i], order, d[..., i]) for i in range(len(self.var_names))]
+
+        out = np.zeros((len(self.func_list), order + 1) + x.shape[:-1])
+        for j, res in enumerate(self._run(seeds)):
+            if isinstance(res, TaylorNumber):
+                out[j] = res.derivatives()
+            else:  # function does not depend on any variable
+                out[j, 0] = res
+        return np.moveaxis(out, -1, 0) if batched else out
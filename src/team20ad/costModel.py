@@ -0,0 +1,371 @@
+"""Cost model for choosing how to compute a Jacobian.
+
+The expression graph gives the number of operations W of one evaluation,
+the number of variables each output depends on and the number of outputs
+each variable reaches. Every strategy is priced as a sweep over (part of)
+the graph whose cost per operation grows with the width of the tangents or
+adjoints it carries:
+
+    forward  W * (a_f + b_f * n)            one pass with n tangents
+    reverse  W * (a_r + b_r * m)            one sweep with m adjoints
+    sparse   the cheaper of the forward or reverse pass with one tangent or
+             adjoint per color, plus c per structural nonzero for
+             unpacking the compressed product
+    mixed    the dense columns S by a forward pass over the nodes depending
+             on S, the rows R that depend on any other column by a reverse
+             sweep over the cone of R:  W_S * (a_f + b_f |S|) + W_R * (a_r + b_r |R|)
+    cross    recording the tape, then x per edge and per multiply-add of the
+             vertex elimination in Markowitz order:  W * a_r + x * (E + M)
+
+The constants are in microseconds per operation. The defaults were measured
+on a typical machine; calibrate() measures them on the current one.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from .crossCountryAD import CrossCountryAD, eliminate, linearize, markowitz_order
+from .dualNumber import DualNumber
+from .sparseAD import SparseAD, greedy_coloring, input_masks, sparsity_pattern
+
+
+# microseconds per graph operation (a) and per operation and tangent or
+# adjoint component (b) of the forward pass and the reverse sweep, and per
+# structural nonzero unpacked from a compressed Jacobian (c), and per edge or
+# multiply-add of a vertex elimination (x); a_r includes tracing the tape,
+# which costs about as much per operation as a forward pass, and an adjoint
+# row costs about ten tangents, so reverse wins from about ten inputs per output
+DEFAULT_COSTS = {'a_f': 2.0, 'b_f': 0.005, 'a_r': 2.0, 'b_r': 0.05, 'c': 0.5, 'x': 0.5}
+
+# the calibrated constants of the session (None) and of each file path
+_CALIBRATION = {}
+
+
+def output_masks(graph):
+    """Computes which outputs each node of a graph contributes to.
+
+    Parameter
+    ------
+    graph : Graph
+        the expression graph of a compiled evaluator
+
+    Returns
+    ------
+    list of int
+        for each node, a bitmask with bit j set if function j depends on it
+    """
+    masks = [0] * len(graph.nodes)
+    for j, i in enumerate(graph.outputs):
+        masks[i] |= 1 << j
+    for i in range(len(graph.nodes) - 1, -1, -1):
+        op, args, kwargs = graph.nodes[i]
+        if op in ('var', 'const'):
+            continue
+        for a in args:
+            masks[a] |= masks[i]
+        for _, a in kwargs:
+            masks[a] |= masks[i]
+    return masks
+
+
+def _mask_bits(masks, width):
+    """Groups equal bitmasks and unpacks them.
+
+    Parameters
+    ------
+    masks : list of int
+        bitmasks of at most width bits
+    width : int
+        the number of bits
+
+    Returns
+    ------
+    counts : numpy.array
+        the number of times each distinct mask occurs
+    bits : numpy.array
+        array of shape (len(counts), width), the bits of each distinct mask
+    """
+    groups = Counter(masks)
+    size = max((width + 7) // 8, 1)
+    data = b''.join(mask.to_bytes(size, 'little') for mask in groups)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(groups), size),
+                         axis=1, count=width, bitorder='little')
+    return np.fromiter(groups.values(), dtype=np.int64, count=len(groups)), bits
+
+
+class CostModel:
+    """Estimates the cost of the Jacobian strategies for an expression graph.
+
+    Parameters
+    ------
+    graph : Graph
+        the expression graph of a compiled evaluator
+    costs : dict, optional
+        the constants a_f, b_f, a_r, b_r, c and x; missing ones take the
+        values of DEFAULT_COSTS
+
+    Attributes
+    ------
+    num_ops : int
+        the number of operations W of one evaluation
+    output_ops : list of int
+        for each function, the number of operations it depends on
+    input_ops : list of int
+        for each variable, the number of operations depending on it
+    nnz : int
+        the number of structural nonzeros of the Jacobian
+    forward_colors, reverse_colors : int
+        the number of column and row colors of a sparse Jacobian
+    mixed_columns : list of int
+        the columns computed by the forward pass of the best mixed split
+    num_edges : int
+        the number of edges E of the linearized graph
+    elimination_mults : int
+        the number of multiply-adds M of a vertex elimination in Markowitz order
+
+    Examples
+    --------
+    >>> from team20ad.compiledAD import Graph
+    >>> model = CostModel(Graph(['x', 'y', 'z'], ['x * y * z']))
+    >>> model.num_ops, model.nnz
+    (2, 3)
+    >>> model.choose()
+    'forward'
+    """
+
+    def __init__(self, graph, costs = None):
+        self.graph = graph
+        self.costs = dict(DEFAULT_COSTS)
+        self.costs.update(costs or {})
+        self.n, self.m = len(graph.var_names), len(graph.outputs)
+
+        ops = [i for i, (op, _, _) in enumerate(graph.nodes) if op not in ('var', 'const')]
+        self._ops = ops
+        self.num_ops = len(ops)
+        # operations with the same dependencies are counted together: the
+        # distinct masks are few compared to the operations
+        inputs, outputs = input_masks(graph), output_masks(graph)
+        self._in = _mask_bits([inputs[i] for i in ops], self.n)
+        self._out = _mask_bits([outputs[i] for i in ops], self.m)
+        self.input_ops = (self._in[0] @ self._in[1]).tolist()
+        self.output_ops = (self._out[0] @ self._out[1]).tolist()
+
+        self.pattern = sparsity_pattern(graph)
+        self.nnz = sum(len(cols) for cols in self.pattern)
+        rows_of = [[] for _ in range(self.n)]
+        for j, cols in enumerate(self.pattern):
+            for k in cols:
+                rows_of[k].append(j)
+        self._rows_of = rows_of
+        self._colors = None
+        self.mixed_columns, self._mixed_cost = self._split()
+
+        # the edges of the linearized graph: constants carry no derivative,
+        # and every output gets a copy so that all operations can be eliminated
+        degrees = [len({a for a in list(args) + [a for _, a in kwargs] if graph.nodes[a][0] != 'const'})
+                   for args, kwargs in (graph.nodes[i][1:] for i in ops)]
+        self.num_edges = self.m + sum(degrees)
+        # eliminating an operation with a predecessor takes at least one multiply-add
+        self._min_mults = sum(1 for d in degrees if d)
+        self._elimination_mults = None
+
+    @property
+    def forward_colors(self):
+        """The number of column colors, computed on first use."""
+        return self._coloring()[0]
+
+    @property
+    def reverse_colors(self):
+        """The number of row colors, computed on first use."""
+        return self._coloring()[1]
+
+    def _coloring(self):
+        if self._colors is None:
+            self._colors = (max(greedy_coloring(self.pattern, self.n), default=-1) + 1,
+                            max(greedy_coloring(self._rows_of, self.m), default=-1) + 1)
+        return self._colors
+
+    @property
+    def elimination_mults(self):
+        """The multiply-adds of a vertex elimination, computed on first use."""
+        if self._elimination_mults is None:
+            graph, size = self.graph, len(self.graph.nodes)
+            preds = [set() for _ in range(size + self.m)]
+            succs = [set() for _ in range(size + self.m)]
+            for i in self._ops:
+                _, args, kwargs = graph.nodes[i]
+                for a in list(args) + [a for _, a in kwargs]:
+                    if graph.nodes[a][0] != 'const':
+                        preds[i].add(a)
+                        succs[a].add(i)
+            for j, i in enumerate(graph.outputs):
+                preds[size + j].add(i)
+                succs[i].add(size + j)
+            self._elimination_mults = markowitz_order(preds, succs, self._ops)[1]
+        return self._elimination_mults
+
+    def _forward(self, ops, width):
+        return ops * (self.costs['a_f'] + self.costs['b_f'] * width)
+
+    def _reverse(self, ops, width):
+        return ops * (self.costs['a_r'] + self.costs['b_r'] * width)
+
+    def _split(self):
+        """Finds the mixed split of least cost, taking the densest columns forward.
+
+        The columns enter the forward set S in order of density. An operation
+        joins the forward pass once its first column in that order is in S,
+        and leaves the reverse sweep once its last row's last column is, so
+        the operation counts of all splits come from one cumulative sum.
+        """
+        if self.n < 2:
+            return [], float('inf')
+        order = sorted(range(self.n), key=lambda k: -len(self._rows_of[k]))
+        position = np.empty(self.n, dtype=np.int64)
+        position[order] = np.arange(self.n)
+
+        # forward: the split size from which each operation is in the cone of S
+        counts, bits = self._in
+        first = np.where(bits, position, self.n).min(axis=1, initial=self.n)
+        forward_ops = np.cumsum(np.bincount(first, weights=counts, minlength=self.n + 1))
+        # reverse: row j stays in R while its last column is not in S
+        last_row = np.full(self.m, -1, dtype=np.int64)
+        for k, rows in enumerate(self._rows_of):
+            for j in rows:
+                last_row[j] = max(last_row[j], position[k])
+        counts, bits = self._out
+        last = np.where(bits, last_row, -1).max(axis=1, initial=-1)
+        # the number of operations and rows with last position >= size
+        reverse_ops = np.cumsum(np.bincount(last + 1, weights=counts, minlength=self.n + 1)[::-1])[::-1]
+        num_rows = np.cumsum(np.bincount(last_row + 1, minlength=self.n + 1)[::-1])[::-1]
+
+        sizes = np.arange(1, self.n)
+        costs = (self._forward(forward_ops[sizes - 1], sizes)
+                 + self._reverse(reverse_ops[sizes + 1], num_rows[sizes + 1]))
+        best = int(np.argmin(costs))
+        return sorted(order[:best + 1]), float(costs[best])
+
+    def estimate(self):
+        """Returns the estimated cost in microseconds of each strategy.
+
+        A sparse evaluation needs at least as many colors as the densest row
+        or column, and cross-country elimination costs at least the tape, its
+        edges and one multiply-add per operation. Either is only priced in
+        full when that bound is below the cheaper strategies, and is otherwise
+        reported as the bound, so the colorings and the elimination order are
+        only computed when they can win.
+
+        Returns
+        ------
+        dict
+            maps 'forward', 'reverse', 'sparse', 'mixed' and 'cross' to their cost
+        """
+        W = self.num_ops
+        costs = {'forward': self._forward(W, self.n), 'reverse': self._reverse(W, self.m)}
+        dense = min(costs.values())
+        # a row needs as many colors as it has nonzeros, and so does a column
+        sparse = (min(self._forward(W, max(map(len, self.pattern), default=0)),
+                      self._reverse(W, max(map(len, self._rows_of), default=0)))
+                  + self.costs['c'] * self.nnz)
+        if sparse < dense:
+            sparse = (min(self._forward(W, self.forward_colors), self._reverse(W, self.reverse_colors))
+                      + self.costs['c'] * self.nnz)
+        costs['sparse'] = sparse
+        costs['mixed'] = self._mixed_cost
+        cross = self._reverse(W, 0) + self.costs['x'] * (self.num_edges + self._min_mults)
+        if cross < min(costs.values()):
+            cross = self._reverse(W, 0) + self.costs['x'] * (self.num_edges + self.elimination_mults)
+        costs['cross'] = cross
+        return costs
+
+    def choose(self):
+        """Returns the name of the strategy of least estimated cost."""
+        costs = self.estimate()
+        return min(costs, key=costs.get)
+
+
+def _time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def calibrate(path = None, repeat = 5):
+    """Measures the cost constants on this machine.
+
+    A synthetic graph is evaluated with 1 and 64 tangents (forward) and
+    adjoints (reverse); the intercept and slope of the time per operation
+    give a and b, the overhead of a sparse evaluation gives c and the time
+    of a vertex elimination per edge and multiply-add gives x.
+    The result is cached for the session, per path. If a path is given, the
+    constants are read from that JSON file, or else the constants of the
+    session (measured if needed) are written to it for later sessions.
+
+    Parameters
+    ------
+    path : str, optional
+        JSON file to read the constants from, or to write them to
+    repeat : int, optional (default = 5)
+        number of timed runs, of which the fastest is kept
+
+    Returns
+    ------
+    dict
+        the constants a_f, b_f, a_r, b_r, c and x, in microseconds
+    """
+    if path in _CALIBRATION:
+        return dict(_CALIBRATION[path])
+    if path is not None and os.path.exists(path):
+        with open(path) as file:
+            costs = json.load(file)
+    else:
+        costs = _CALIBRATION[None] if None in _CALIBRATION else _measure(repeat)
+        if path is not None:
+            with open(path, 'w') as file:
+                json.dump(costs, file)
+    _CALIBRATION[path] = costs
+    _CALIBRATION.setdefault(None, costs)
+    return dict(costs)
+
+
+def _measure(repeat):
+    from .compiledAD import CompiledAD
+
+    n = 64
+    names = [f'x{i}' for i in range(n)]
+    f = CompiledAD(names, [' + '.join(f'sin({a}) * {b}' for a, b in zip(names, names[1:]))])
+    W = CostModel(f.graph).num_ops
+    point = [0.5] * n
+
+    def forward(width):
+        seeds = np.zeros((n, width))
+        seeds[np.arange(n), np.arange(n) % width] = 1.0
+        return _time(lambda: f._run([DualNumber(point[i], seeds[i]) for i in range(n)]), repeat) / W
+
+    def reverse(width):
+        t, inputs, outputs = f._record(point)
+        seeds = np.ones((1, width))
+        return _time(lambda: (t.replay(point), t.jacobian(outputs, inputs, seeds)), repeat) / W
+
+    f_1, f_64 = forward(1), forward(n)
+    r_1, r_64 = reverse(1), reverse(n)
+    b_f, b_r = max(f_64 - f_1, 0.0) / (n - 1), max(r_64 - r_1, 0.0) / (n - 1)
+    # c is what a sparse evaluation spends beyond its compressed pass
+    sparse = SparseAD(names, f.func_list, mode='reverse')
+    nnz = len(sparse.rows)
+    c = max(_time(lambda: sparse(point), repeat) / W - r_1, 0.0) * W / nnz
+    cross = CrossCountryAD(dict.fromkeys(names, 0.5), f.func_list)
+    preds, succs = linearize(cross.tape, cross._outputs)
+    edges = sum(len(p) for p in preds)
+
+    def accumulate():
+        eliminate(*linearize(cross.tape, cross._outputs), cross.order)
+    x = _time(accumulate, repeat) / (edges + cross.num_mults)
+    return {'a_f': f_1 - b_f, 'b_f': b_f, 'a_r': r_1 - b_r, 'b_r': b_r, 'c': c, 'x': x}
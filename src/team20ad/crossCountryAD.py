@@ -0,0 +1,249 @@
+"""Cross-country Jacobian accumulation by vertex elimination.
+
+The recorded tape is read as the linearized computational graph: one vertex
+per entry and one edge per parent, weighted by the local partial derivative.
+Eliminating an intermediate vertex v connects every predecessor p of v to
+every successor s, adding the product of the weights of p -> v and v -> s
+to the edge p -> s, at the cost of |pred(v)| * |succ(v)| multiply-adds.
+Once every intermediate vertex is gone, the only edges left run from the
+inputs to the outputs and hold the entries of the Jacobian.
+
+Forward and reverse mode are the elimination orders front to back and back
+to front. The Markowitz heuristic eliminates next the vertex with the least
+|pred(v)| * |succ(v)|, which often needs fewer multiply-adds than either.
+The order only depends on the structure of the graph, so it is computed
+once and reused when the tape is replayed at new points.
+"""
+
+import heapq
+
+import numpy as np
+
+from .tape import FUNCTIONS, Tape, TapeVar
+
+
+def markowitz_order(preds, succs, vertices):
+    """Orders vertices for elimination by the Markowitz heuristic.
+
+    The graph is only read; the elimination is carried out on copies of the
+    adjacency sets to track the degrees of the remaining vertices.
+
+    Parameters
+    ------
+    preds, succs : list of iterable of int
+        the predecessors and successors of each vertex
+    vertices : iterable of int
+        the vertices to eliminate
+
+    Returns
+    ------
+    order : list of int
+        the vertices in elimination order
+    mults : int
+        the number of multiply-adds of the elimination
+    """
+    preds = [set(p) for p in preds]
+    succs = [set(s) for s in succs]
+    vertices = set(vertices)
+    heap = [(len(preds[v]) * len(succs[v]), v) for v in vertices]
+    heapq.heapify(heap)
+    done = set()
+    order, mults = [], 0
+    while heap:
+        cost, v = heapq.heappop(heap)
+        if v in done:
+            continue
+        if cost != len(preds[v]) * len(succs[v]):  # stale entry
+            heapq.heappush(heap, (len(preds[v]) * len(succs[v]), v))
+            continue
+        done.add(v)
+        order.append(v)
+        mults += cost
+        for p in preds[v]:
+            succs[p].discard(v)
+            succs[p] |= succs[v]
+        for s in succs[v]:
+            preds[s].discard(v)
+            preds[s] |= preds[v]
+        for u in preds[v] | succs[v]:
+            if u not in done and u in vertices:
+                heapq.heappush(heap, (len(preds[u]) * len(succs[u]), u))
+    return order, mults
+
+
+def linearize(tape, outputs):
+    """Returns the linearized computational graph recorded on a tape.
+
+    Vertex i < len(tape) is entry i of the tape; vertex len(tape) + j is a
+    copy of output j with an edge of weight 1 from the output entry, so
+    outputs that are also used by later entries can be eliminated as well.
+
+    Parameters
+    ------
+    tape : Tape
+        the tape the outputs were recorded on
+    outputs : list of TapeVar, int or float
+        the outputs (constants have no vertex predecessor)
+
+    Returns
+    ------
+    preds, succs : list of dict
+        for each vertex, its predecessors (successors) mapped to the weight
+        of the edge between them
+    """
+    size = len(tape)
+    preds = [{} for _ in range(size + len(outputs))]
+    succs = [{} for _ in range(size + len(outputs))]
+    for v, (a, b, pa, pb) in enumerate(zip(tape.arg0, tape.arg1, tape.partial0, tape.partial1)):
+        for p, w in ((a, pa), (b, pb)):
+            if p >= 0:
+                preds[v][p] = preds[v].get(p, 0.0) + w
+                succs[p][v] = preds[v][p]
+    for j, out in enumerate(outputs):
+        if isinstance(out, TapeVar):
+            preds[size + j][out.index] = 1.0
+            succs[out.index][size + j] = 1.0
+    return preds, succs
+
+
+def eliminate(preds, succs, order):
+    """Eliminates vertices of a linearized graph in place, in the given order.
+
+    Parameters
+    ------
+    preds, succs : list of dict
+        the weighted predecessors and successors of each vertex
+    order : list of int
+        the vertices to eliminate
+    """
+    for v in order:
+        P, S = preds[v], succs[v]
+        for p, a in P.items():
+            succ = succs[p]
+            del succ[v]
+            for s, b in S.items():
+                w = succ.get(s, 0.0) + a * b
+                succ[s] = w
+                preds[s][p] = w
+        for s in S:
+            del preds[s][v]
+        preds[v], succs[v] = {}, {}
+
+
+class CrossCountryAD:
+    """Cross-country mode Automatic Differentiation.
+
+    The functions are recorded on a tape as in ReverseAD, and the Jacobian
+    is accumulated by eliminating the intermediate vertices of the
+    linearized graph in Markowitz order.
+
+    Parameters
+    ------
+    var_dict: dict
+        a dictionary of variables and their corresponding values
+    func_list: str or list of str
+        (a list of) function(s) encoded as string(s)
+
+    Attributes
+    ------
+    func_evals: list
+        the evaluation of function(s) at the given point
+    Dpf: numpy.array
+        derivatives of function(s) evaluated at the given point
+    tape: Tape
+        the recorded operations, kept so that they can be replayed at new points
+    order: list of int
+        the elimination order of the vertices of the linearized graph
+    num_mults: int
+        the number of multiply-adds of one elimination
+
+    Examples
+    --------
+    >>> ad = CrossCountryAD({'x': 1, 'y': 2}, ['x * y', 'exp(x * y) + y'])
+    >>> ad()
+    ===== Cross-country AD =====
+    Vars: {'x': 1, 'y': 2}
+    Funcs: ['x * y', 'exp(x * y) + y']
+    -----
+    Func evals: [2.0, 9.38905609893065]
+    Derivatives:
+    [[ 2.         1.       ]
+     [14.7781122  8.3890561]]
+    <BLANKLINE>
+    """
+    def __init__(self, var_dict, func_list):
+        # type checks
+        if not isinstance(var_dict, dict):
+            raise TypeError("var_dict should be a dictionary.")
+
+        if isinstance(func_list, list):
+            for f in func_list:
+                if not isinstance(f, str):
+                    raise TypeError("func_list should be a string or a list of strings.")
+        elif not isinstance(func_list, str):
+            raise TypeError("func_list should be a string or a list of strings.")
+
+        if isinstance(func_list, list):
+            self.func_list = func_list
+        else: # if a single string, convert it to list
+            self.func_list = [func_list]
+
+        self.var_dict = var_dict
+
+        self.tape = Tape(reuse = True)
+        inputs = {name: self.tape.variable(float(value)) for name, value in var_dict.items()}
+        self._inputs = [v.index for v in inputs.values()]
+        self._outputs = [eval(func, dict(FUNCTIONS), dict(inputs)) for func in self.func_list]
+        self.tape.seal()
+
+        # every vertex but the inputs and the output copies is eliminated
+        preds, succs = linearize(self.tape, self._outputs)
+        inputs = set(self._inputs)
+        vertices = [v for v in range(len(self.tape)) if v not in inputs]
+        self.order, self.num_mults = markowitz_order(preds, succs, vertices)
+        self._accumulate(preds, succs)
+
+    def _accumulate(self, preds, succs):
+        eliminate(preds, succs, self.order)
+        size = len(self.tape)
+        self.func_evals = [getattr(out, 'value', out) for out in self._outputs]
+        self.Dpf = np.zeros((len(self._outputs), len(self._inputs)))
+        for j in range(len(self._outputs)):
+            edges = preds[size + j]
+            for k, i in enumerate(self._inputs):
+                self.Dpf[j, k] = edges.get(i, 0.0)
+
+    def replay(self, point):
+        """Re-evaluates the functions and derivatives at a new point without retracing.
+
+        The recorded tape is replayed at the new values and its linearized
+        graph is eliminated again in the same order; func_evals, Dpf and
+        var_dict are updated.
+
+        Parameter
+        ------
+        point : dict or sequence
+            new values of the variables, keyed by name or in the order of var_dict
+
+        Returns
+        ------
+        func_evals : list
+            the evaluation of function(s) at the new point
+        Dpf : numpy.array
+            derivatives of function(s) evaluated at the new point
+        """
+        if isinstance(point, dict):
+            point = [point[name] for name in self.var_dict]
+        self.tape.replay(point)
+        self.var_dict = dict(zip(self.var_dict, point))
+        self._accumulate(*linearize(self.tape, self._outputs))
+        return self.func_evals, self.Dpf
+
+    def __call__(self):
+        out = "===== Cross-country AD =====\n"
+        out += f"Vars: {self.var_dict}\n"
+        out += f"Funcs: {self.func_list}\n"
+        out += f"-----\n"
+        out += f"Func evals: {self.func_evals}\n"
+        out += f"Derivatives:\n{self.Dpf}\n"
+        print(out)
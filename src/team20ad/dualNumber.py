@@ -1,6 +1,27 @@
 import numpy as np
 
 
+_new = object.__new__
+
+
+def _dual(real, dual):
+    """Creates a DualNumber without validating its parts.
+
+    Used by the arithmetic core, whose operands have already been checked.
+    """
+    res = _new(DualNumber)
+    res.real = real
+    res.dual = dual
+    return res
+
+
+def _any_zero(x):
+    """Checks a scalar or (for batched dual numbers) any array element for zero."""
+    if isinstance(x, np.ndarray):
+        return np.any(x == 0)
+    return x == 0
+
+
 class DualNumber:
     """A dual number class supporting operations for forward mode automatic differentation.
     
@@ -9,12 +30,29 @@ class DualNumber:
     _supported_scalars : tuple
         A tuple containing types of objects that are supported by the
         dual number operations.
-    real : int or float
+    _supported_arrays : tuple
+        A tuple containing array types accepted as the real part of a
+        batched dual number.
+    real : int, float or numpy.array
         The real part of a dual number, which represents the value of user
-        defined function(s) 'f' evaluated at point 'x'.
-    dual : int or float
+        defined function(s) 'f' evaluated at point 'x'. A batched dual number
+        holds an array of shape (N,) with one value per point, and every
+        operation is carried out by vectorized NumPy ufuncs.
+    dual : int, float or numpy.array
         The dual part of a dual number, corresponding to the derivative
-        of user defined functions(s) 'f' evaluated at point 'x'.
+        of user defined functions(s) 'f' evaluated at point 'x'. In vector
+        mode the dual part is an array holding one directional derivative
+        per seed direction, so a single pass yields a whole gradient. In a
+        batched dual number the seed directions come first and the points
+        last, i.e. the dual part has shape (n, N) (or (n, 1), which broadcasts
+        against the real part).
+
+    Notes
+    ------
+    Instances use __slots__ and carry no per-instance __dict__. The
+    constructor validates its arguments; the operators check the common
+    DualNumber-op-DualNumber case first and build their results without
+    re-validation.
 
     Examples
     ------
@@ -22,17 +60,25 @@ class DualNumber:
     DualNumber(3.0, 4)
     >>> DualNumber(3)
     DualNumber(3, 1.0)
+    >>> DualNumber(3, np.array([1.0, 0.0])) * DualNumber(2, np.array([0.0, 1.0]))
+    DualNumber(6, [2. 3.])
+    >>> DualNumber(np.array([1.0, 2.0]), np.array([1.0, 1.0])) ** 2
+    DualNumber([1. 4.], [2. 4.])
     """
 
+    __slots__ = ('real', 'dual')
+
     _supported_scalars = (int, float)
+    _supported_arrays = (np.ndarray,)
 
     def __init__(self, real, dual = 1.0):
         """
         Parameters
         ------
-        real : int or float
-            The value of user defined function(s) 'f' evaluated at point 'x'.
-        dual : int or float, optional (default = 1.0)
+        real : int, float or numpy.array
+            The value of user defined function(s) 'f' evaluated at point 'x'
+            (one value per point for a batched dual number).
+        dual : int, float or numpy.array, optional (default = 1.0)
             The corresponding derivative of user defined functions(s) 'f' evaluated at point 'x'.
         
         Raises
@@ -40,7 +86,7 @@ class DualNumber:
         TypeError
             if an argument value is of unsupported type. 
         """
-        if isinstance(real, self._supported_scalars):
+        if isinstance(real, (*self._supported_scalars, *self._supported_arrays)):
             self.real = real
             self.dual = dual
         else:
@@ -74,7 +120,7 @@ class DualNumber:
         DualNumber
             the negation of the DualNumber instance for both real and dual parts.
         """
-        return DualNumber(-self.real, -self.dual)
+        return _dual(-self.real, -self.dual)
 
     def __add__(self, other):
         """Returns the sum of the DualNumber instance and another given instance of supported type.
@@ -89,11 +135,11 @@ class DualNumber:
         DualNumber
             the sum of the two instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
+        if type(other) is DualNumber or isinstance(other, DualNumber):
+            return _dual(self.real + other.real, self.dual + other.dual)
         if isinstance(other, self._supported_scalars):
-            return DualNumber(self.real + other, self.dual)
-        return DualNumber(self.real + other.real, self.dual + other.dual)
+            return _dual(self.real + other, self.dual)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __radd__(self, other):
         """Returns the sum of the DualNumber instance and another given instance of supported type.
@@ -126,11 +172,11 @@ class DualNumber:
         DualNumber
             the substraction of the two instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
+        if type(other) is DualNumber or isinstance(other, DualNumber):
+            return _dual(self.real - other.real, self.dual - other.dual)
         if isinstance(other, self._supported_scalars):
-            return DualNumber(self.real - other, self.dual)
-        return DualNumber(self.real - other.real, self.dual - other.dual)
+            return _dual(self.real - other, self.dual)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __rsub__(self, other):
         """Returns the substraction of a scalar object and a DualNumber
@@ -145,11 +191,11 @@ class DualNumber:
         DualNumber
             the substraction of the two instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
         if isinstance(other, self._supported_scalars):
-            return DualNumber(other - self.real , -self.dual)
-        return DualNumber(other.real - self.real, other.dual - self.dual)
+            return _dual(other - self.real, -self.dual)
+        if isinstance(other, DualNumber):
+            return _dual(other.real - self.real, other.dual - self.dual)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __mul__(self, other):
         """Returns the product of the DualNumber instance and another given instance of supported type.
@@ -164,12 +210,12 @@ class DualNumber:
         DualNumber
             the product of the two instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
+        if type(other) is DualNumber or isinstance(other, DualNumber):
+            return _dual(self.real * other.real,
+                         self.real * other.dual + other.real * self.dual)
         if isinstance(other, self._supported_scalars):
-            return DualNumber(self.real * other, other * self.dual)
-        return DualNumber(self.real * other.real,
-                          self.real * other.dual + other.real * self.dual)
+            return _dual(self.real * other, other * self.dual)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __rmul__(self, other):
         """Returns the product of the DualNumber instance and another scalar object.
@@ -202,16 +248,16 @@ class DualNumber:
         DualNumber
             the division of the two instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
+        if type(other) is DualNumber or isinstance(other, DualNumber):
+            if _any_zero(other.real):
+                raise ZeroDivisionError("Cannot divide by zero.")
+            return _dual(self.real / other.real,
+                         (self.dual * other.real - self.real * other.dual) / (other.real ** 2))
         if isinstance(other, self._supported_scalars):
             if other == 0:
                 raise ZeroDivisionError("Cannot divide by zero.")
-            return DualNumber(self.real / other, self.dual / other)
-        if other.real == 0:
-            raise ZeroDivisionError("Cannot divide by zero.")
-        return DualNumber(self.real / other.real,
-                          (self.dual * other.real - self.real * other.dual) / (other.real ** 2))
+            return _dual(self.real / other, self.dual / other)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __rtruediv__(self, other):
         """Returns the division of the DualNumber instance and a scalar object.
@@ -230,7 +276,7 @@ class DualNumber:
             raise TypeError(f"Unsupported type '{type(other)}'")
         if other == 0:
             raise ZeroDivisionError("Cannot divide by zero.")
-        return DualNumber(other / self.real, (-other / self.real ** 2) * self.dual)
+        return _dual(other / self.real, (-other / self.real ** 2) * self.dual)
 
     def __pow__(self, other):
         """Returns the exponential of the DualNumber instance as base and another given instance of supported type as an exponent.
@@ -245,11 +291,17 @@ class DualNumber:
         DualNumber
             the result of the exponential operation on the given instances.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
         if isinstance(other, self._supported_scalars):
             real_pow = self.real ** other
             dual_pow = other * (self.real ** (other - 1)) * self.dual
+        elif not isinstance(other, DualNumber):
+            raise TypeError(f"Unsupported type '{type(other)}'")
+        elif isinstance(self.real, self._supported_arrays):
+            # the exponent only contributes where the base is positive
+            positive = self.real > 0
+            real_pow = self.real ** other.real
+            dual_pow = other.real * self.real ** (other.real - 1) * self.dual + np.log(
+                np.where(positive, self.real, 1)) * real_pow * other.dual
         else:
             if self.real > 0:
                 real_pow = self.real ** other.real
@@ -259,6 +311,7 @@ class DualNumber:
                 real_pow = self.real ** other.real
                 dual_pow = other.real * \
                     self.real ** (other.real - 1) * self.dual
+        # validated: a negative base with a fractional exponent yields a complex value
         return DualNumber(real_pow, dual_pow)
 
     def __rpow__(self, other):
@@ -280,7 +333,7 @@ class DualNumber:
         if other < 0:
             raise ValueError(f"Unsupported value '{type(other)}'")
         dual_pow = np.log(other) * other ** self.real * self.dual
-        return DualNumber(real_pow, dual_pow)
+        return _dual(real_pow, dual_pow)
 
     def __eq__(self, other):
         """Compares two objects if they are equal.
@@ -295,11 +348,11 @@ class DualNumber:
         bool
             True if the two instances are equal; and False, otherwise.
         """
-        if not isinstance(other, (*self._supported_scalars, DualNumber)):
-            raise TypeError(f"Unsupported type '{type(other)}'")
+        if isinstance(other, DualNumber):
+            return (self.real == other.real) and (self.dual == other.dual)
         if isinstance(other, self._supported_scalars):
             return (self.real == other.real) and (self.dual == 0)
-        return (self.real == other.real) and (self.dual == other.dual)
+        raise TypeError(f"Unsupported type '{type(other)}'")
 
     def __ne__(self, other):
         """Compares two objects if they are not equal.
@@ -397,6 +450,7 @@ class DualNumber:
         Returns
         ------
         DualNumber
-            the absolute value of the DualNumber instance on both real and dual parts.
+            the absolute value of the real part, with the dual part scaled by
+            the sign of the real part (zero at zero, as on the tape).
         """
-        return DualNumber(abs(self.real), abs(self.dual))
\ No newline at end of file
+        return _dual(abs(self.real), np.sign(self.real) * self.dual)
\ No newline at end of file
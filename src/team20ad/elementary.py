@@ -1,269 +1,234 @@
 """Elementary functions for supporting the operations of forward mode AD.
-"""
-
-import numpy as np
-
-from team20ad.dualNumber import DualNumber
 
+All functions also accept NumPy arrays and batched DualNumbers (whose real
+part is an array), in which case they dispatch to vectorized NumPy ufuncs
+and domain checks apply to every element. TaylorNumbers are dispatched to
+the Taylor-mode propagation rules in taylorNumber.
 
-_supported_scalars = (int, float)
+Python scalars (and scalar DualNumbers) are computed with the math module,
+which avoids the ufunc dispatch overhead of NumPy on single floats, and any
+intermediate shared by the value and the derivative is computed once.
 
+The functions are generated from the primitive registry in primitives.
+"""
 
-def sqrt(val):
-    """square root function supporting operations for forward mode AD.
-    
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute square root
-    """
-    if isinstance(val, DualNumber):
-        if val <= 0:
-            raise ValueError(f"Should not be negative.")
-
-        return DualNumber(np.sqrt(val.real), 1 / 2 / np.sqrt(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        if val <= 0:
-            raise ValueError(f"Should not be negative.")
+import math
 
-        return np.sqrt(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+import numpy as np
 
+from team20ad.dualNumber import DualNumber, _dual
+from team20ad.primitives import _BACKENDS, _BUILTINS, PRIMITIVES, SCALAR_LIB
+from team20ad.taylorNumber import TaylorNumber
 
-def exp(val):
-    """exponential function (base natural) supporting operations for forward mode AD.
-    
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute
 
-    Notes
-    ------
-    exponential functions for other bases are handled by __pow__ in the DualNumber class.
-    """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.exp(val.real), np.exp(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.exp(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+_supported_scalars = (int, float, np.ndarray)
+_fast_scalars = {int, float}
 
+_DOC = """{doc}
 
-def log(val, base = None):
-    """Logarithmic function supporting operations for forward mode AD.
+    Supports operations for forward mode AD.
 
     Parameter
     ------
-    val : DualNumber, int or float
-        value to compute the log
-    base : int or float
-        base value of log function, optional (default = None assumed natural e)
+    val : DualNumber, TaylorNumber, int, float or numpy.array
+        value to compute the function at{params}
     """
-    if isinstance(val, DualNumber):
-        if val.real <= 0:
-            raise ValueError(f"Should not be negative.")
-
-        if base is None:
-            return DualNumber(np.log(val.real), 1 / val.real * val.dual)
-
-        real = np.log(val.real) / np.log(base)
-        dual = (1 / val.real / np.log(base)) * val.dual
-        return DualNumber(real, dual)
-    elif isinstance(val, _supported_scalars):
-        if val <= 0:
-            raise ValueError(f"Should not be negative.")
 
-        if base is None:
-            return np.log(val)
 
-        return np.log(val) / np.log(base)
-    else: 
-        raise TypeError(f"Unsupported type '{type(val)}'")
-
-
-def sin(val):
-    """Sine function supporting operations for forward mode AD.
-
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute sine
-    """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.sin(val.real), np.cos(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.sin(val)
+def _elementary(prim):
+    """Generates the forward mode function of a primitive."""
+    scalar, vector, partial, taylor = prim.scalar, prim.vector, prim.partial, prim.taylor
+    domain, error, check, fast = prim.domain, prim.error, prim.check, prim.fast
+
+    def general(val, *params, **kwargs):
+        if type(val) in _fast_scalars:
+            if domain is None or domain(val):
+                return scalar(val, *params, **kwargs)
+            raise ValueError(error.format(val))
+
+        if isinstance(val, DualNumber):
+            x = val.real
+            if isinstance(x, np.ndarray):
+                check(x)
+                y = vector(x, *params, **kwargs)
+                return _dual(y, partial(np, x, y, *params, **kwargs) * val.dual)
+            if domain is not None and not domain(x):
+                raise ValueError(error.format(x))
+            y = scalar(x, *params, **kwargs)
+            return _dual(y, partial(SCALAR_LIB, x, y, *params, **kwargs) * val.dual)
+        elif isinstance(val, TaylorNumber) and taylor is not None:
+            check(val.real)
+            return taylor(val, *params, **kwargs)
+        elif isinstance(val, np.ndarray):
+            check(val)
+            return vector(val, *params, **kwargs)
+        elif isinstance(val, _supported_scalars):
+            check(val)
+            return scalar(val, *params, **kwargs)
+        else:
+            raise TypeError(f"Unsupported type '{type(val)}'")
+
+    # calls with the default parameters take a one-argument function, so
+    # calls on scalars skip the cost of variadic arguments; plain floats go
+    # to the math kernel before any domain check or dispatch
+    value, derivative, defaults = scalar, partial, prim.defaults
+    if defaults and prim.name not in _BUILTINS:
+        # the kernels of custom primitives need not default their parameters
+        value = lambda x: scalar(x, *defaults)
+        derivative = lambda lib, x, y: partial(lib, x, y, *defaults)
+
+    def unary(val):
+        cls = type(val)
+        if cls is float and fast is not None:
+            try:
+                return fast(val)
+            except (ValueError, OverflowError):
+                pass  # outside the domain or overflowing: handled by general
+        elif cls in _fast_scalars:
+            if domain is None or domain(val):
+                return value(val)
+        elif cls is DualNumber:
+            x = val.real
+            if type(x) in _fast_scalars and (domain is None or domain(x)):
+                y = value(x)
+                return _dual(y, derivative(SCALAR_LIB, x, y) * val.dual)
+        return general(val, *defaults)
+
+    if not prim.param_names:
+        function = unary
     else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+        bind = prim.bind
+
+        def function(val, *params, **kwargs):
+            if not params and not kwargs:
+                return unary(val)
+            params = bind(params, kwargs)
+            if type(val) in _fast_scalars:
+                if domain is None or domain(val):
+                    return scalar(val, *params)
+            elif type(val) is DualNumber:
+                x = val.real
+                if type(x) in _fast_scalars and (domain is None or domain(x)):
+                    y = scalar(x, *params)
+                    return _dual(y, partial(SCALAR_LIB, x, y, *params) * val.dual)
+            return general(val, *params)
+        function.unary = unary
+
+    function.__name__ = function.__qualname__ = prim.name
+    param_docs = "".join(f"\n    {name} : optional (default = {default})"
+                         for name, default in zip(prim.param_names, prim.defaults))
+    function.__doc__ = _DOC.format(doc=prim.doc or prim.name, params=param_docs)
+    return function
+
+
+FUNCTIONS = {name: _elementary(prim) for name, prim in PRIMITIVES.items()}
+
+# log and logistic take their parameters by name in function strings; with
+# a fixed signature, calls with the default parameters are as cheap as those
+# of the one-argument functions
+_log, _logistic = FUNCTIONS['log'], FUNCTIONS['logistic']
+_log_unary, _logistic_unary = _log.unary, _logistic.unary
 
 
-def cos(val):
-    """Cosine function supporting operations for forward mode AD.
+def log(val, base = None):
+    if base is None:
+        if type(val) is float:
+            try:
+                return math.log(val)
+            except ValueError:
+                pass  # outside the domain: raised by the generated function
+        return _log_unary(val)
+    return _log(val, base)
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute cosine
-    """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.cos(val.real), -np.sin(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.cos(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
 
+def logistic(val, L = 1, k = 1, x_0 = 0):
+    if L == 1 and k == 1 and x_0 == 0:
+        return _logistic_unary(val)
+    return _logistic(val, L, k, x_0)
 
-def tan(val):
-    """Tangent function supporting operations for forward mode AD.
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute tangent
-    """
-    if isinstance(val, DualNumber):
-        x = val.real % np.pi == (np.pi / 2)
-        if x:
-            raise ValueError('Tan is undefined in the given domain')
-
-        return DualNumber(np.tan(val.real), 1 / (np.cos(val.real) ** 2) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        x = val.real % np.pi == (np.pi / 2)
-        if x:
-            raise ValueError('Tan is undefined in the given domain')
-
-        return np.tan(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+log.__doc__, logistic.__doc__ = _log.__doc__, _logistic.__doc__
+FUNCTIONS.update(log=log, logistic=logistic)
 
+sqrt, exp, log, sin, cos, tan, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, softplus = (
+    FUNCTIONS[name] for name in ('sqrt', 'exp', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos',
+                                 'arctan', 'sinh', 'cosh', 'tanh', 'logistic', 'softplus'))
 
-def arcsin(val):
-    """Inverse sine function supporting operations for forward mode AD.
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute inverse sine
-    """
-    if isinstance(val, DualNumber):
-        if abs(val.real) >= 1:
-            raise ValueError(
-                'arcsin() cannot be evaluated at {}.'.format(val.real))
-        return DualNumber(np.arcsin(val.real), 1 / np.sqrt(1 - val.real ** 2) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        if abs(val) >= 1:
-            raise ValueError('arcsin() cannot be evaluated at {}.'.format(val))
-        return np.arcsin(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+def _fused_args(name, vals):
+    """Checks the arguments of a fused function and returns their real parts."""
+    if not vals:
+        raise TypeError(f"{name}() needs at least one argument.")
+    for val in vals:
+        if not isinstance(val, (DualNumber, TaylorNumber) + _supported_scalars):
+            raise TypeError(f"Unsupported type '{type(val)}'")
+    return [val.real for val in vals]
 
 
-def arccos(val):
-    """Inverse cosine function supporting operations for forward mode AD.
+def _tangent(vals, weights):
+    """Returns sum_i weights[i] * vals[i].dual over the DualNumber arguments."""
+    dual = None
+    for val, w in zip(vals, weights):
+        if isinstance(val, DualNumber):
+            dual = w * val.dual if dual is None else dual + w * val.dual
+    return dual
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute inverse cosine
-    """
-    if isinstance(val, DualNumber):
-        if abs(val.real) >= 1:
-            raise ValueError(
-                'arccos() cannot be evaluated at {}.'.format(val.real))
-        return DualNumber(np.arccos(val.real), -1 / np.sqrt(1 - val.real ** 2) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        if abs(val) >= 1:
-            raise ValueError('arccos() cannot be evaluated at {}.'.format(val))
-        return np.arccos(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
 
+def logsumexp(*vals):
+    """Log-sum-exp log(exp(val_1) + ... + exp(val_n)) as a single fused operation.
 
-def arctan(val):
-    """Inverse tangent function supporting operations for forward mode AD.
+    The largest argument is factored out, so the result does not overflow,
+    and the derivative with respect to each argument is its softmax weight.
 
     Parameter
     ------
-    val : DualNumber, int or float
-        value to compute inverse tangent
+    *vals : DualNumber, TaylorNumber, int, float or numpy.array
+        values to combine
     """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.arctan(val.real), 1 / (1 + val.real ** 2) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.arctan(val)
+    reals = _fused_args('logsumexp', vals)
+    if any(isinstance(val, TaylorNumber) for val in vals):
+        m = max(float(np.max(r)) for r in reals)
+        return m + log(sum(exp(val - m) for val in vals))
+
+    if all(type(r) in _fast_scalars for r in reals):
+        m = max(reals)
+        weights = [PRIMITIVES['exp'].scalar(r - m) for r in reals]
+        total = sum(weights)
+        value = m + PRIMITIVES['log'].scalar(total)
     else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
-
-
-def sinh(val):
-    """Hyperbolic sine function supporting operations for forward mode AD.
+        m = reals[0]
+        for r in reals[1:]:
+            m = np.maximum(m, r)
+        weights = [np.exp(r - m) for r in reals]
+        total = sum(weights)
+        value = m + np.log(total)
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute hyerbolic sine
-    """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.sinh(val.real), np.cosh(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.sinh(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+    dual = _tangent(vals, [w / total for w in weights])
+    return value if dual is None else _dual(value, dual)
 
 
-def cosh(val):
-    """Hyperbolic cosine function supporting operations for forward mode AD.
+def sumsq(*vals):
+    """Sum of squares val_1 ** 2 + ... + val_n ** 2 as a single fused operation.
 
     Parameter
     ------
-    val : DualNumber, int or float
-        value to compute hyerbolic cosine
+    *vals : DualNumber, TaylorNumber, int, float or numpy.array
+        values to square and add
     """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.cosh(val.real), np.sinh(val.real) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.cosh(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+    reals = _fused_args('sumsq', vals)
+    if any(isinstance(val, TaylorNumber) for val in vals):
+        return sum(val * val for val in vals)
 
+    value = sum(r * r for r in reals)
+    dual = _tangent(vals, [2 * r for r in reals])
+    return value if dual is None else _dual(value, dual)
 
-def tanh(val):
-    """Hyperbolic tangent function supporting operations for forward mode AD.
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute hyerbolic tangent
-    """
-    if isinstance(val, DualNumber):
-        return DualNumber(np.tanh(val.real), (1 - (np.tanh(val.real) ** 2)) * val.dual)
-    elif isinstance(val, _supported_scalars):
-        return np.tanh(val)
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
+FUNCTIONS.update(logsumexp=logsumexp, sumsq=sumsq)
 
 
-def logistic(val, L = 1, k = 1, x_0 = 0):
-    """Logistic function supporting operations for forward mode AD.
+def _add(prim):
+    FUNCTIONS[prim.name] = _elementary(prim)
 
-    Parameter
-    ------
-    val : DualNumber, int or float
-        value to compute the logistic
-    L : int or float, optional (default = 1)
-        the supremum of the values of the function
-    k : int or float, optional (default = 1)
-        the logistic growth rate or steepness of the curve
-    x_0 : int or float, optional (default = 0)
-        the x value of the sigmoid's midpoint
-    """
-    if isinstance(val, DualNumber):
-        real = L / (1 + np.exp(-k * (val.real - x_0) ) )
-        dual = k * real * (1 - real / L) * val.dual
-        return DualNumber(real, dual)
-    elif isinstance(val, _supported_scalars):
-        return L / (1 + np.exp(-k * (val.real - x_0) ) )
-    else:
-        raise TypeError(f"Unsupported type '{type(val)}'")
\ No newline at end of file
+
+_BACKENDS.append(_add)
@@ -61,9 +61,6 @@ class ForwardAD:
         elif not isinstance(func_list, str):
             raise TypeError("func_list should be a string or a list of strings.")
 
-        # var inits
-        elem_funcs = ['sqrt', 'exp', 'log', 'sin', 'cos', 'tan',
-                      'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']
         self.var_dict = var_dict
 
         if isinstance(func_list, list):
@@ -71,31 +68,28 @@ class ForwardAD:
         else:
             self.func_list = [func_list]
 
-        vars = list(self.var_dict.keys())
+        # vector mode: variable i is seeded with the i-th unit tangent, so a
+        # single pass yields the full gradient of every function
+        seeds = np.eye(len(self.var_dict))
+        namespace = {}
+        for i, (var, value) in enumerate(self.var_dict.items()):
+            if isinstance(value, np.generic):
+                value = value.item()
+            namespace[var] = DualNumber(value, seeds[i])
 
         self.func_evals = []
         self.Dpf = np.zeros((len(self.func_list), len(self.var_dict)))
-        i = 0  # a helper counter to determine which partial deriv to take
-
-        for _ in self.var_dict:
-            for var in self.var_dict:
-                if var == vars[i]:
-                    dual = 1
-                else:
-                    dual = 0
-                exec(f"{var} = DualNumber({self.var_dict[var]}, {dual})")
-
-            for j in range(0, len(self.func_list)):
-                for f in elem_funcs:
-                    func = self.func_list[j]
-                    if f in self.func_list[j]:
-                        break
-                self.func_evals.append(eval(func).real)  # primal trace
-                self.Dpf[j, i] = eval(func).dual  # tangent trace
-
-            i += 1
-
-        self.func_evals = self.func_evals[:len(self.func_list)]
+
+        # the registry functions, including user-registered primitives
+        env = dict(globals())
+        env.update(FUNCTIONS)
+        for j, func in enumerate(self.func_list):
+            res = eval(func, env, namespace)
+            if isinstance(res, DualNumber):
+                self.func_evals.append(res.real)  # primal trace
+                self.Dpf[j] = res.dual  # tangent trace
+            else:  # function does not depend on any variable
+                self.func_evals.append(res)
 
     def __call__(self):
         out = "===== Forward AD =====\n"
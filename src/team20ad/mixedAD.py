@@ -0,0 +1,111 @@
+"""Jacobians computed partly in forward mode and partly in reverse mode.
+
+A few dense columns (variables most functions depend on) are computed by a
+forward pass seeded with those columns only; every other nonzero lies in a
+row that depends on one of the remaining variables, and those rows are
+computed by a single vector-adjoint reverse sweep seeded with those rows.
+"""
+
+import numpy as np
+
+from .compiledAD import CompiledAD
+from .costModel import CostModel
+from .dualNumber import DualNumber
+
+
+class MixedAD:
+    """Compiled Jacobian evaluator combining forward and reverse mode.
+
+    Parameters
+    ------
+    var_names: list of str or dict
+        names of the independent variables; if a dict is given its keys are used
+    func_list: str or list of str
+        (a list of) function(s) encoded as string(s)
+    columns: list of int, optional
+        the columns to compute in forward mode. If None, the split of least
+        estimated cost is chosen by the cost model.
+
+    Attributes
+    ------
+    compiled: CompiledAD
+        the underlying compiled evaluator
+    columns: list of int
+        the columns computed by the forward pass
+    rows: list of int
+        the rows computed by the reverse sweep
+
+    Examples
+    --------
+    >>> f = MixedAD(['x', 'y', 'z'], ['x * y', 'x * z', 'x + y + z'], columns=[0])
+    >>> f.rows
+    [0, 1, 2]
+    >>> func_evals, Dpf = f([1, 2, 3])
+    >>> Dpf
+    array([[2., 1., 0.],
+           [3., 0., 1.],
+           [1., 1., 1.]])
+    """
+
+    def __init__(self, var_names, func_list, columns = None):
+        self.compiled = CompiledAD(var_names, func_list)
+        n = len(self.compiled.var_names)
+        model = CostModel(self.compiled.graph)
+        if columns is None:
+            columns = model.mixed_columns
+        if not all(isinstance(k, int) and 0 <= k < n for k in columns):
+            raise ValueError(f"Columns should be indices between 0 and {n - 1}.")
+
+        self.columns = sorted(set(columns))
+        self._rest = [k for k in range(n) if k not in self.columns]
+        rest = set(self._rest)
+        self.rows = [j for j, cols in enumerate(model.pattern) if rest.intersection(cols)]
+
+        # tangent seeds of shape (n, |S|) and adjoint seeds of shape (m, |R|)
+        self._tangents = np.zeros((n, len(self.columns)))
+        self._tangents[self.columns, np.arange(len(self.columns))] = 1.0
+        self._adjoints = np.zeros((len(self.compiled.func_list), len(self.rows)))
+        self._adjoints[self.rows, np.arange(len(self.rows))] = 1.0
+
+    def __repr__(self):
+        return f"MixedAD({self.compiled.var_names}, {self.compiled.func_list}, columns={self.columns})"
+
+    def __call__(self, point):
+        """Evaluates the functions and their Jacobian at a point.
+
+        Parameter
+        ------
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+
+        Returns
+        ------
+        func_evals : numpy.array
+            the evaluation of the function(s) at the point
+        Dpf : numpy.array
+            the Jacobian of the function(s) at the point
+        """
+        x = self.compiled._point(point)
+        m = len(self.compiled.func_list)
+        func_evals = np.zeros(m)
+        Dpf = np.zeros((m, len(x)))
+
+        if self.columns:
+            # variables outside S enter the forward pass as constants
+            inputs = [DualNumber(x[i], self._tangents[i]) if i in self.columns else x[i]
+                      for i in range(len(x))]
+            for j, out in enumerate(self.compiled._run(inputs)):
+                if isinstance(out, DualNumber):
+                    func_evals[j] = out.real
+                    Dpf[j, self.columns] = out.dual
+                else:
+                    func_evals[j] = out
+
+        if self.rows:
+            tape, inputs, outputs = self.compiled._record(x)
+            if not self.columns:
+                func_evals[:] = [getattr(out, 'value', out) for out in outputs]
+            compressed = tape.jacobian(outputs, inputs, self._adjoints)
+            Dpf[np.ix_(self.rows, self._rest)] = compressed[:, self._rest]
+
+        return func_evals, Dpf
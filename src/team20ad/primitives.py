@@ -0,0 +1,369 @@
+"""Registry of the primitive (elementary) functions.
+
+Each primitive is described once: by its primal kernel, in scalar (math) and
+vectorized (NumPy) form, and by its local derivative rule. The elementary
+functions on DualNumbers, the Node methods of reverse mode, the tape ops and
+the function tables of the string parsers are all generated from this
+registry, so adding a primitive takes a single entry.
+"""
+
+import inspect
+import math
+from types import SimpleNamespace
+
+import numpy as np
+
+from . import taylorNumber as taylor
+
+
+def _exp(x):
+    """Scalar exponential, overflowing to inf like np.exp."""
+    try:
+        return math.exp(x)
+    except OverflowError:
+        return math.inf
+
+
+def _sinh(x):
+    """Scalar hyperbolic sine, overflowing to +-inf like np.sinh."""
+    try:
+        return math.sinh(x)
+    except OverflowError:
+        return math.copysign(math.inf, x)
+
+
+def _cosh(x):
+    """Scalar hyperbolic cosine, overflowing to inf like np.cosh."""
+    try:
+        return math.cosh(x)
+    except OverflowError:
+        return math.inf
+
+
+def _tan(x):
+    """Scalar tangent, raising ValueError where tan is undefined."""
+    if x % math.pi == math.pi / 2:
+        raise ValueError
+    return math.tan(x)
+
+
+def _sigmoid(x):
+    """Scalar logistic function with the default parameters, without overflow."""
+    if x < 0:
+        e = math.exp(x)
+        return e / (1 + e)
+    return 1 / (1 + math.exp(-x))
+
+
+def _logistic(x, L = 1, k = 1, x_0 = 0):
+    """Scalar logistic function, evaluated without overflow for any x."""
+    z = -k * (x - x_0)
+    if z > 0:
+        e = _exp(-z)
+        return L * e / (1 + e)
+    return L / (1 + math.exp(z))
+
+
+# the functions available to derivative rules evaluated on Python scalars;
+# numpy plays the same role for arrays and elementary for DualNumbers
+SCALAR_LIB = SimpleNamespace(sqrt=math.sqrt, exp=_exp, log=math.log, sin=math.sin,
+                             cos=math.cos, sinh=_sinh, cosh=_cosh)
+
+
+class Primitive:
+    """A differentiable function of one variable and optional constant parameters.
+
+    Parameters
+    ------
+    name : str
+        the name of the function in function strings
+    scalar : callable
+        ``scalar(x, *params)``, the value at a Python float
+    vector : callable
+        ``vector(x, *params)``, the elementwise value at a numpy array
+    partial : callable
+        ``partial(lib, x, y, *params)``, the local derivative at x given the
+        value y. It may only use arithmetic and the functions of lib (sqrt,
+        exp, log, sin, cos, sinh, cosh), which is SCALAR_LIB, numpy or the
+        elementary module, so one rule serves scalars, arrays and DualNumbers.
+    taylor : callable, optional
+        ``taylor(t, *params)``, the propagation rule for TaylorNumbers
+    domain : callable, optional
+        ``domain(x)``, True where x lies in the domain (elementwise for arrays)
+    error : str, optional
+        message of the ValueError raised outside the domain, formatted with x
+    doc : str, optional
+        docstring of the generated functions
+    params : dict, optional
+        the constant parameters mapped to their default values; by default
+        they are read from the signature of scalar
+    fast : callable, optional
+        ``fast(x)``, the value at a float for the default parameters, e.g. a
+        math function called without any domain check or dispatch; it must
+        raise ValueError or OverflowError wherever the value differs from
+        scalar or x is outside the domain
+
+    Attributes
+    ------
+    param_names : tuple of str
+        names of the constant parameters
+    defaults : tuple
+        default values of the constant parameters
+    """
+
+    def __init__(self, name, scalar, vector, partial, taylor = None, domain = None,
+                 error = "{} is outside the domain.", doc = None, params = None, fast = None):
+        self.name = name
+        self.scalar = scalar
+        self.vector = vector
+        self.partial = partial
+        self.taylor = taylor
+        self.domain = domain
+        self.error = error
+        self.doc = doc
+        self.fast = fast
+
+        if params is None:
+            params = _signature_params(name, scalar)
+        self.param_names = tuple(params)
+        self.defaults = tuple(params.values())
+
+    def __repr__(self):
+        return f"Primitive('{self.name}')"
+
+    def bind(self, params, kwargs):
+        """Returns the full tuple of parameters of a call, defaults filled in."""
+        if len(params) > len(self.defaults):
+            raise TypeError(f"{self.name}() takes at most {len(self.defaults) + 1} arguments.")
+        values = list(params) + list(self.defaults[len(params):])
+        for key, value in kwargs.items():
+            if key not in self.param_names:
+                raise TypeError(f"{self.name}() got an unexpected keyword argument '{key}'")
+            values[self.param_names.index(key)] = value
+        return tuple(values)
+
+    def check(self, x):
+        """Raises ValueError if x (a scalar or an array) is outside the domain."""
+        if self.domain is not None:
+            inside = self.domain(x)
+            if inside is not True and not np.all(inside):
+                raise ValueError(self.error.format(x))
+
+
+def _signature_params(name, scalar):
+    """Reads the constant parameters of a primitive from the signature of its scalar kernel.
+
+    Ufuncs only take their inputs as constants, and builtins without a
+    signature (e.g. math.log) are taken to have none.
+    """
+    if isinstance(scalar, np.ufunc):
+        return {}
+    try:
+        params = list(inspect.signature(scalar).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return {}
+    params = [p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    if any(p.default is p.empty for p in params):
+        raise TypeError(f"Parameters of primitive '{name}' need default values.")
+    return {p.name: p.default for p in params}
+
+
+PRIMITIVES = {}
+
+# fused functions of several arguments, defined by each engine next to the
+# generated primitives; their names cannot be registered
+FUSED = ('logsumexp', 'sumsq')
+
+# callbacks of the engines (elementary, tape, reverseAD) generating their
+# functions for a newly registered primitive
+_BACKENDS = []
+
+
+def _define(*args, **kwargs):
+    prim = Primitive(*args, **kwargs)
+    PRIMITIVES[prim.name] = prim
+    return prim
+
+
+def register(name, value, derivative, vector = None, vector_derivative = None,
+             taylor = None, domain = None, error = None, doc = None, overwrite = False,
+             params = None):
+    """Registers a custom primitive with a hand-written derivative.
+
+    Once registered, the function can be called by name in the function
+    strings of ForwardAD, ReverseAD, AD and the compiled evaluators, where it
+    is evaluated as a single graph node, and it is available as a forward
+    mode function in elementary and as a Node method.
+
+    Parameters
+    ------
+    name : str
+        the name of the function in function strings
+    value : callable
+        ``value(x, *params)``, the value at a float; extra parameters must
+        have default values and are passed as constants
+    derivative : callable
+        ``derivative(x, y, *params)``, the derivative at x given the value
+        y = value(x). Forward mode multiplies it with the incoming tangent
+        (JVP) and reverse mode with the incoming adjoint (VJP).
+    vector, vector_derivative : callable, optional
+        vectorized versions of value and derivative for numpy arrays, used by
+        batched evaluation; by default value and derivative are applied
+        elementwise
+    taylor : callable, optional
+        ``taylor(t, *params)``, the propagation rule for TaylorNumbers
+    domain : callable, optional
+        ``domain(x)``, True where x lies in the domain (elementwise for arrays)
+    error : str, optional
+        message of the ValueError raised outside the domain, formatted with x
+    doc : str, optional
+        docstring of the generated functions
+    overwrite : bool, optional (default = False)
+        if True, replace a custom primitive registered under the same name
+    params : dict, optional
+        the constant parameters mapped to their default values, for value
+        functions whose signature cannot be read or does not list them;
+        by default they are read from the signature of value (none for
+        ufuncs and builtins without a signature)
+
+    Returns
+    ------
+    Primitive
+        the registered primitive
+
+    Raises
+    ------
+    ValueError
+        if the name is not a valid identifier or is already registered
+
+    Notes
+    ------
+    Second order derivatives (hvp, hessian) also differentiate the
+    derivative; this requires it to be written with arithmetic and the
+    functions of team20ad.elementary rather than math or numpy.
+
+    Examples
+    --------
+    >>> import math
+    >>> p = register('erf', math.erf, lambda x, y: 2 / math.sqrt(math.pi) * math.exp(-x * x))
+    >>> from team20ad.compiledAD import CompiledAD
+    >>> CompiledAD(['x'], ['erf(2 * x)'])([0])[1]
+    array([[2.25675833]])
+    """
+    if not isinstance(name, str) or not name.isidentifier():
+        raise ValueError(f"'{name}' is not a valid function name.")
+    if name in FUSED or (name in PRIMITIVES and (not overwrite or name in _BUILTINS)):
+        raise ValueError(f"A primitive named '{name}' is already registered.")
+
+    if vector is None:
+        vector = value if isinstance(value, np.ufunc) else np.vectorize(value, otypes=[float])
+    if vector_derivative is None:
+        vector_derivative = np.vectorize(derivative, otypes=[float])
+
+    def partial(lib, x, y, *params, **kwargs):
+        if lib is np:
+            return vector_derivative(x, y, *params, **kwargs)
+        return derivative(x, y, *params, **kwargs)
+
+    prim = Primitive(name, value, vector, partial, taylor, domain,
+                     error or f"{name}() cannot be evaluated at {{}}.", doc, params)
+    PRIMITIVES[name] = prim
+    for backend in _BACKENDS:
+        backend(prim)
+    return prim
+
+
+def _log(x, base = None):
+    return math.log(x) if base is None else math.log(x) / math.log(base)
+
+
+def _log_vector(x, base = None):
+    return np.log(x) if base is None else np.log(x) / math.log(base)
+
+
+def _logistic_vector(x, L = 1, k = 1, x_0 = 0):
+    return L / (1 + np.exp(-k * (x - x_0)))
+
+
+def _softplus(x):
+    # log(1 + e^x) = max(x, 0) + log(1 + e^-|x|), which cannot overflow
+    if x > 0:
+        return x + math.log1p(math.exp(-x))
+    return math.log1p(math.exp(x))
+
+
+_define('sqrt', math.sqrt, np.sqrt,
+        lambda lib, x, y: 0.5 * x ** -0.5,
+        taylor.sqrt, lambda x: x > 0, "Should not be negative.",
+        doc="Square root.")
+
+_define('exp', _exp, np.exp,
+        lambda lib, x, y: y,
+        taylor.exp, fast=math.exp,
+        doc="Exponential function (base natural). Other bases are handled by __pow__.")
+
+_define('log', _log, _log_vector,
+        lambda lib, x, y, base = None: 1 / x if base is None else 1 / x / lib.log(base),
+        taylor.log, lambda x: x > 0, "Should not be negative.", fast=math.log,
+        doc="Logarithm; natural unless a base (int or float) is given.")
+
+_define('sin', math.sin, np.sin,
+        lambda lib, x, y: lib.cos(x),
+        taylor.sin, fast=math.sin,
+        doc="Sine function.")
+
+_define('cos', math.cos, np.cos,
+        lambda lib, x, y: -lib.sin(x),
+        taylor.cos, fast=math.cos,
+        doc="Cosine function.")
+
+# sec^2 = 1 + tan^2 reuses the value instead of a second cos call
+_define('tan', math.tan, np.tan,
+        lambda lib, x, y: 1 + y * y,
+        taylor.tan, lambda x: x % math.pi != (math.pi / 2),
+        'Tan is undefined in the given domain', fast=_tan,
+        doc="Tangent function.")
+
+_define('arcsin', math.asin, np.arcsin,
+        lambda lib, x, y: 1 / lib.sqrt(1 - x * x),
+        taylor.arcsin, lambda x: abs(x) < 1, 'arcsin() cannot be evaluated at {}.',
+        doc="Inverse sine function.")
+
+_define('arccos', math.acos, np.arccos,
+        lambda lib, x, y: -1 / lib.sqrt(1 - x * x),
+        taylor.arccos, lambda x: abs(x) < 1, 'arccos() cannot be evaluated at {}.',
+        doc="Inverse cosine function.")
+
+_define('arctan', math.atan, np.arctan,
+        lambda lib, x, y: 1 / (1 + x * x),
+        taylor.arctan, fast=math.atan,
+        doc="Inverse tangent function.")
+
+_define('sinh', _sinh, np.sinh,
+        lambda lib, x, y: lib.cosh(x),
+        taylor.sinh, fast=math.sinh,
+        doc="Hyperbolic sine function.")
+
+_define('cosh', _cosh, np.cosh,
+        lambda lib, x, y: lib.sinh(x),
+        taylor.cosh, fast=math.cosh,
+        doc="Hyperbolic cosine function.")
+
+_define('tanh', math.tanh, np.tanh,
+        lambda lib, x, y: 1 - y * y,
+        taylor.tanh, fast=math.tanh,
+        doc="Hyperbolic tangent function.")
+
+_define('logistic', _logistic, _logistic_vector,
+        lambda lib, x, y, L = 1, k = 1, x_0 = 0: k * y * (1 - y / L),
+        taylor.logistic, fast=_sigmoid,
+        doc="Logistic function L / (1 + exp(-k (x - x_0))), by default the "
+            "sigmoid (supremum L = 1, growth rate k = 1, midpoint x_0 = 0).")
+# the derivative, the sigmoid, is exp(x - softplus(x)), which is accurate for
+# large |x| where 1 - exp(-softplus(x)) would cancel
+_define('softplus', _softplus, lambda x: np.logaddexp(0, x),
+        lambda lib, x, y: lib.exp(x - y),
+        lambda t: taylor.log(taylor.exp(t) + 1),
+        doc="Softplus function log(1 + exp(x)), evaluated without overflow.")
+
+_BUILTINS = frozenset(PRIMITIVES)
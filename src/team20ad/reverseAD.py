@@ -1,7 +1,8 @@
 import numpy as np
-import re
 
 from .elementary import *
+from .primitives import _BACKENDS, _BUILTINS, PRIMITIVES, SCALAR_LIB
+from .tape import FUNCTIONS, Tape
 
 class ReverseAD:
     """Reverse Mode Automatic Differentiation.
@@ -19,6 +20,8 @@ class ReverseAD:
         the evaluation of function(s) at the given point 
     Dpf: numpy.array
         derivatives of function(s) evaluated at the given point
+    tape: Tape
+        the recorded operations, kept so that they can be replayed at new points
 
     Examples
     --------
@@ -64,29 +67,53 @@ class ReverseAD:
         else: # if a single string, convert it to list
             self.func_list = [func_list]
  
-        self.func_evals = []
-        self.Dpf = []
         self.var_dict = var_dict
 
-        elem_funcs = ['sqrt', 'exp', 'log', 'sin', 'cos', 'tan',
-                      'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']
+        # record all functions on one tape so that shared subexpressions are
+        # evaluated once, then differentiate them with one vector-adjoint sweep
+        self.tape = Tape(reuse = True)
+        inputs = {name: self.tape.variable(float(value)) for name, value in var_dict.items()}
+        self._inputs = list(inputs.values())
+        self._outputs = [eval(func, dict(FUNCTIONS), dict(inputs)) for func in self.func_list]
+        self.tape.seal()
 
-        for func in self.func_list:
-            for i in elem_funcs:
-                if i in func:
-                    func = re.sub(i + r'\(', 'Node.' + i + '(', func)
-                    func = re.sub('arcNode.', 'arc', func)
+        self.func_evals = [getattr(out, 'value', out) for out in self._outputs]
+        self.Dpf = self.tape.jacobian(self._outputs, self._inputs)
 
-            for var_name, var_value in var_dict.items():
-                exec(f'{var_name} = Node(float(var_value))')
-            vals = eval(func)
+    def replay(self, point):
+        """Re-evaluates the functions and derivatives at a new point without retracing.
 
-            value_keys = str(list(var_dict.keys())).replace('\'','')
-            v, d = eval(f'vals.g_derivatives({value_keys})')
+        The recorded tape is replayed at the new values and swept backward
+        again, reusing its buffers; func_evals, Dpf and var_dict are updated.
 
-            self.func_evals.append(v)
-            self.Dpf.append(d)
-        self.Dpf = np.array(self.Dpf)
+        Parameter
+        ------
+        point : dict or sequence
+            new values of the variables, keyed by name or in the order of var_dict
+
+        Returns
+        ------
+        func_evals : list
+            the evaluation of function(s) at the new point
+        Dpf : numpy.array
+            derivatives of function(s) evaluated at the new point
+
+        Examples
+        --------
+        >>> ad = ReverseAD({'x': 1, 'y': 2}, ['x * y', 'exp(x + y)'])
+        >>> func_evals, Dpf = ad.replay({'x': 0, 'y': 1})
+        >>> Dpf
+        array([[1.        , 0.        ],
+               [2.71828183, 2.71828183]])
+        """
+        if isinstance(point, dict):
+            point = [point[name] for name in self.var_dict]
+        self.tape.replay(point)
+        self.var_dict = dict(zip(self.var_dict, point))
+
+        self.func_evals = [getattr(out, 'value', out) for out in self._outputs]
+        self.Dpf = self.tape.jacobian(self._outputs, self._inputs)
+        return self.func_evals, self.Dpf
 
     def __call__(self):
         out = "===== Reverse AD =====\n"
@@ -553,6 +580,16 @@ class Node():
         return new_val
 
         
+    @staticmethod
+    def _primitive(var, name, *params):
+        """Applies a primitive of the registry to a Node, recording its local derivative."""
+        prim = PRIMITIVES[name]
+        value = prim.scalar(var.var, *params)
+        new_val = Node(value)
+        var.child.append((new_val, prim.partial(SCALAR_LIB, var.var, value, *params)))
+        return new_val
+
+
     @staticmethod
     def log(var, base = None):
         """Logarithmic function supporting operations for reverse mode AD.
@@ -571,13 +608,8 @@ class Node():
             raise TypeError(f"Invalid input type.")
 
         if base is None:
-            log_var = Node(np.log(var.var))
-            var.child.append((log_var, (1. / var.var) * 1))
-            return log_var
-
-        log_var = Node(np.log(var.var) / np.log(base.var))
-        var.child.append((log_var, (1 / var.var / np.log(base.var)) * 1))
-        return log_var
+            return Node._primitive(var, 'log')
+        return Node._primitive(var, 'log', base.var)
         
 
     @staticmethod
@@ -593,11 +625,9 @@ class Node():
             raise ValueError("Invalid input: value must be greater than or equal to zero.")
         else:
             try:
-                sqrt_var = Node(var.var**(1/2))
-                var.child.append((sqrt_var, (1/2)*var.var**(-1/2)))
+                return Node._primitive(var, 'sqrt')
             except:
                 raise TypeError(f"Invalid input type.")
-        return sqrt_var
 
 
     @staticmethod
@@ -614,14 +644,12 @@ class Node():
         exponential functions for other bases are handled by __pow__ in the Node class.
         """
         try:
-            new_val = Node(np.exp(var.var))
-            var.child.append((new_val, np.exp(var.var) * 1))
-            return new_val
+            return Node._primitive(var, 'exp')
         except:
             if not isinstance(var, int) and not isinstance(var, float):
                 raise TypeError(f"Invalid input type.")
         
-            return np.exp(var)
+            return PRIMITIVES['exp'].scalar(var)
 
 
     @staticmethod
@@ -634,14 +662,12 @@ class Node():
             value to compute sine
         """
         try:
-            new_val = Node(np.sin(var.var))
-            var.child.append((new_val, 1 * np.cos(var.var)))
-            return new_val
+            return Node._primitive(var, 'sin')
         except:
             if not isinstance(var, int) and not isinstance(var, float):
                 raise TypeError(f"Invalid input")
         
-            return np.sin(var)
+            return PRIMITIVES['sin'].scalar(var)
 
 
     @staticmethod
@@ -654,14 +680,12 @@ class Node():
             value to compute cosine
         """
         try:
-            new_val = Node(np.cos(var.var))
-            var.child.append((new_val, 1 * -np.sin(var.var)))
-            return new_val
+            return Node._primitive(var, 'cos')
         except:
             if not isinstance(var, int) and not isinstance(var, float):
                 raise TypeError(f"Invalid input")
         
-            return np.cos(var)
+            return PRIMITIVES['cos'].scalar(var)
     
     
     @staticmethod
@@ -674,14 +698,12 @@ class Node():
             value to compute tangent
         """
         try:
-            new_val = Node(np.tan(var.var))
-            var.child.append((new_val, 1 * 1 / np.power(np.cos(var.var), 2)))
-            return new_val
+            return Node._primitive(var, 'tan')
         except:
             if not isinstance(var, int) and not isinstance(var, float):
                 raise TypeError(f"Input {var} is not valid.")
         
-            return np.tan(var)
+            return PRIMITIVES['tan'].scalar(var)
 
 
     @staticmethod
@@ -697,13 +719,11 @@ class Node():
             if var.var > 1 or var.var < -1:
                 raise ValueError('Please input -1 <= x <=1')
             else:
-                new_val = Node(np.arcsin(var.var))
-                var.child.append((new_val, 1 / np.sqrt(1 - (var.var ** 2))))
-                return new_val
+                return Node._primitive(var, 'arcsin')
         except:
             if not isinstance(var, int) and not isinstance(var, float):
                 raise TypeError(f"Input {var} is not valid.")
-            return np.arcsin(var)
+            return PRIMITIVES['arcsin'].scalar(var)
 
 
     @staticmethod
@@ -717,14 +737,12 @@ class Node():
         """
         try:
             if isinstance(var, int) or isinstance(var, float):
-                return np.arccos(var)
+                return PRIMITIVES['arccos'].scalar(var)
 
             if var.var > 1 or var.var < -1:
                 raise ValueError('Please input -1 <= x <=1')
             else:
-                new_val = Node(np.arccos(var.var))
-                var.child.append((new_val, -1 / np.sqrt(1 - (var.var ** 2))))
-            return new_val
+                return Node._primitive(var, 'arccos')
         except:
                 raise TypeError(f"Input {var} is not valid.")
 
@@ -739,13 +757,10 @@ class Node():
             value to compute inverse tangent
         """
         try:
-            new_val = Node(np.arctan(var.var))
-            var.child.append((new_val, 1 * 1 / (1 + np.power(var.var, 2))))
-
-            return new_val
+            return Node._primitive(var, 'arctan')
 
         except AttributeError:
-            return np.arctan(var)
+            return PRIMITIVES['arctan'].scalar(var)
 
 
     @staticmethod
@@ -758,12 +773,10 @@ class Node():
             value to compute inverse hyperbolic sine
         """
         try:
-            new_val = Node(np.sinh(var.var))
-            var.child.append((new_val, 1 * np.cosh(var.var)))
-            return new_val
+            return Node._primitive(var, 'sinh')
 
         except AttributeError:
-            return np.sinh(var)
+            return PRIMITIVES['sinh'].scalar(var)
 
 
     @staticmethod
@@ -776,13 +789,10 @@ class Node():
             value to compute inverse hyperbolic cosine
         """
         try:
-            new_val = Node(np.cosh(var.var))
-            var.child.append((new_val, 1 * np.sinh(var.var)))
-
-            return new_val
+            return Node._primitive(var, 'cosh')
 
         except AttributeError:
-            return np.cosh(var)
+            return PRIMITIVES['cosh'].scalar(var)
 
 
     @staticmethod
@@ -795,25 +805,117 @@ class Node():
             value to compute inverse hyperbolic tangent
         """
         try:
-            new_val = Node(np.tanh(var.var))
-            var.child.append((new_val, 1 * 1 / np.power(np.cosh(var.var), 2)))
-            return new_val
+            return Node._primitive(var, 'tanh')
         except AttributeError:
-            return np.tanh(var)
+            return PRIMITIVES['tanh'].scalar(var)
 
     @staticmethod
-    def logistic(var):
+    def logistic(var, L = 1, k = 1, x_0 = 0):
         """Logistic function supporting operations for reverse mode AD.
 
         Parameter
         ------
-        var : Node, int or float
+        var : Node
             value to compute the logistic
+        L : int or float, optional (default = 1)
+            the supremum of the values of the function
+        k : int or float, optional (default = 1)
+            the logistic growth rate or steepness of the curve
+        x_0 : int or float, optional (default = 0)
+            the x value of the sigmoid's midpoint
         """
         try:
-            logistic_var = Node(1 / (1 + np.exp(-var.var)))
-            var.child.append((logistic_var, 1 / (1 + np.exp(-var.var)) * (1-(1 / (1 + np.exp(-var.var)) * 1))))
-            return logistic_var
+            return Node._primitive(var, 'logistic', L, k, x_0)
         except:
-            raise TypeError(f"Invalid input type.")   
-        
\ No newline at end of file
+            raise TypeError(f"Invalid input type.")
+
+
+    @staticmethod
+    def softplus(var):
+        """Softplus function log(1 + exp(x)) supporting operations for reverse mode AD.
+
+        Parameter
+        ------
+        var : Node, int or float
+            value to compute the softplus
+        """
+        try:
+            return Node._primitive(var, 'softplus')
+        except AttributeError:
+            if not isinstance(var, int) and not isinstance(var, float):
+                raise TypeError(f"Invalid input type.")
+            return PRIMITIVES['softplus'].scalar(var)
+
+
+    @staticmethod
+    def _fused(vars, function, partial):
+        """Applies a fused function of several Nodes as a single Node."""
+        reals = []
+        for var in vars:
+            if isinstance(var, Node):
+                reals.append(var.var)
+            elif isinstance(var, (int, float)):
+                reals.append(var)
+            else:
+                raise TypeError(f"Invalid input type.")
+        value = function(*reals)
+        if not any(isinstance(var, Node) for var in vars):
+            return value
+
+        new_val = Node(value)
+        for var in vars:
+            if isinstance(var, Node):
+                var.child.append((new_val, partial(var.var, value)))
+        return new_val
+
+
+    @staticmethod
+    def logsumexp(*vars):
+        """Log-sum-exp log(exp(x_1) + ... + exp(x_n)) as a single Node, without overflow.
+
+        Parameter
+        ------
+        *vars : Node, int or float
+            values to combine
+        """
+        return Node._fused(vars, logsumexp, lambda x, value: PRIMITIVES['exp'].scalar(x - value))
+
+
+    @staticmethod
+    def sumsq(*vars):
+        """Sum of squares x_1 ** 2 + ... + x_n ** 2 as a single Node.
+
+        Parameter
+        ------
+        *vars : Node, int or float
+            values to square and add
+        """
+        return Node._fused(vars, sumsq, lambda x, value: 2 * x)
+
+
+def _node_method(prim):
+    """Generates the Node method of a custom primitive."""
+    name = prim.name
+
+    def method(var, *params):
+        if isinstance(var, Node):
+            prim.check(var.var)
+            return Node._primitive(var, name, *params)
+        if isinstance(var, (int, float)):
+            prim.check(var)
+            return prim.scalar(var, *params)
+        raise TypeError(f"Invalid input type.")
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"{prim.doc or name} Supports operations for reverse mode AD."
+    return method
+
+
+def _add(prim):
+    if prim.name not in _BUILTINS:
+        setattr(Node, prim.name, staticmethod(_node_method(prim)))
+
+
+for _prim in PRIMITIVES.values():
+    _add(_prim)
+_BACKENDS.append(_add)
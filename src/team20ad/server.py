@@ -0,0 +1,336 @@
+"""Local gradient-evaluation service with request micro-batching.
+
+An asyncio server, listening on a Unix socket or a localhost TCP port,
+keeps one compiled evaluator per function set warm. Single-point requests
+for the same function set that arrive within a short time window are merged
+into one vectorized batch (see CompiledAD.evaluate_batch), evaluated in a
+worker thread, and answered one by one.
+
+The protocol is newline-delimited JSON. A request
+
+    {"id": 1, "vars": ["x", "y"], "funcs": ["x * y"], "point": [1, 2]}
+
+(the point may also be an object keyed by variable name) is answered by
+
+    {"id": 1, "f": [2.0], "J": [[2.0, 1.0]]}
+
+or by {"id": 1, "error": "..."}. Requests on one connection may be pipelined;
+responses carry the id of their request and may arrive out of order.
+
+Run a server with ``python -m team20ad.server --unix /tmp/team20ad.sock``
+or ``--port 8765``, and connect with GradientClient.
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from .compiledAD import CompiledAD
+
+
+class _Batcher:
+    """Collects the requests for one function set and evaluates them in batches."""
+
+    def __init__(self, var_names, func_list, window, max_batch, stats, tasks):
+        self.compiled = CompiledAD(var_names, func_list)
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = stats
+        self.tasks = tasks
+        self._pending = []
+        self._timer = None
+
+    def submit(self, point):
+        """Queues a point and returns a future of its values and Jacobian."""
+        x = self.compiled._point(point)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((x, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # the event loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._evaluate(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def _one_by_one(self, points):
+        results = []
+        for x in points:
+            try:
+                results.append(self.compiled(x))
+            except Exception as error:
+                results.append(error)
+        return results
+
+    async def _evaluate(self, batch):
+        loop = asyncio.get_running_loop()
+        points = [x for x, _ in batch]
+        self.stats['batches'] += 1
+        try:
+            F, J = await loop.run_in_executor(None, self.compiled.evaluate_batch, np.array(points))
+            results = list(zip(F, J))
+        except Exception:
+            # a point outside the domain fails the whole batch: isolate it
+            results = await loop.run_in_executor(None, self._one_by_one, points)
+        for (_, future), result in zip(batch, results):
+            if future.done():  # the request was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class GradientServer:
+    """Asyncio server evaluating Jacobians with warm compiled evaluators.
+
+    Parameters
+    ------
+    window : float, optional (default = 0.002)
+        the time in seconds a request waits for others to join its batch
+    max_batch : int, optional (default = 4096)
+        the batch size at which a batch is evaluated without waiting
+    max_functions : int, optional (default = 128)
+        the number of function sets kept warm; the least recently used
+        evaluator is dropped beyond that
+
+    Attributes
+    ------
+    address : tuple
+        where the server listens, as the arguments of GradientClient.connect:
+        (path,) for a Unix socket or (None, host, port)
+    stats : dict
+        the number of requests served and of batches evaluated
+
+    Examples
+    --------
+    >>> async def main():
+    ...     server = GradientServer()
+    ...     await server.start(port=0)
+    ...     client = await GradientClient.connect(*server.address)
+    ...     func_evals, Dpf = await client.evaluate(['x', 'y'], ['x * y'], [1, 2])
+    ...     await client.close()
+    ...     await server.close()
+    ...     return Dpf
+    >>> asyncio.run(main())
+    array([[2., 1.]])
+    """
+
+    def __init__(self, window = 0.002, max_batch = 4096, max_functions = 128):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_functions = max_functions
+        self.stats = {'requests': 0, 'batches': 0}
+        self.address = None
+        self._batchers = OrderedDict()
+        self._tasks = set()
+        self._server = None
+
+    async def start(self, path = None, host = "127.0.0.1", port = 8765):
+        """Starts listening on a Unix socket if a path is given, else on host:port."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+            self.address = (path,)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.address = (None,) + self._server.sockets[0].getsockname()[:2]
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stops listening, then evaluates the queued requests and waits for the batches in flight."""
+        self._server.close()
+        for batcher in self._batchers.values():
+            batcher._flush()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        await self._server.wait_closed()
+
+    def _batcher(self, var_names, func_list):
+        key = (tuple(var_names), tuple(func_list))
+        if key in self._batchers:
+            self._batchers.move_to_end(key)
+        else:
+            self._batchers[key] = _Batcher(list(var_names), list(func_list), self.window,
+                                           self.max_batch, self.stats, self._tasks)
+            if len(self._batchers) > self.max_functions:
+                self._batchers.popitem(last=False)
+        return self._batchers[key]
+
+    def _reply(self, writer, response):
+        self.stats['requests'] += 1
+        if not writer.is_closing():
+            writer.write((json.dumps(response) + "\n").encode())
+
+    def _result(self, writer, request_id, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._reply(writer, {'id': request_id, 'error': str(error)})
+        else:
+            func_evals, Dpf = future.result()
+            self._reply(writer, {'id': request_id, 'f': func_evals.tolist(), 'J': Dpf.tolist()})
+
+    def _request(self, line, writer):
+        """Queues the request on a line; returns the future of its result, if any."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request should be a JSON object.")
+            request_id = request.get('id')
+            funcs = request['funcs']
+            batcher = self._batcher(request['vars'], funcs if isinstance(funcs, list) else [funcs])
+            future = batcher.submit(request['point'])
+        except KeyError as error:
+            self._reply(writer, {'id': request_id, 'error': f"Missing field {error}."})
+            return None
+        except Exception as error:
+            self._reply(writer, {'id': request_id, 'error': str(error)})
+            return None
+        future.add_done_callback(functools.partial(self._result, writer, request_id))
+        return future
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                future = self._request(line, writer)
+                if future is not None:
+                    pending.add(future)
+                    future.add_done_callback(pending.discard)
+                await writer.drain()
+            if pending:
+                await asyncio.wait(pending)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class GradientClient:
+    """Asyncio client of a GradientServer; requests may be issued concurrently.
+
+    Use GradientClient.connect to create one.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._listener = asyncio.ensure_future(self._listen())
+
+    @classmethod
+    async def connect(cls, path = None, host = "127.0.0.1", port = 8765):
+        """Connects to a server on a Unix socket if a path is given, else on host:port."""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("The server closed the connection."))
+
+    async def evaluate(self, var_names, func_list, point):
+        """Evaluates functions and their Jacobian at a point on the server.
+
+        Parameters
+        ------
+        var_names : list of str
+            names of the independent variables
+        func_list : str or list of str
+            (a list of) function(s) encoded as string(s)
+        point : dict or sequence
+            values of the variables, keyed by name or in the order of var_names
+
+        Returns
+        ------
+        func_evals : numpy.array
+            the evaluation of the function(s) at the point
+        Dpf : numpy.array
+            the Jacobian of the function(s) at the point
+
+        Raises
+        ------
+        ValueError
+            if the server could not evaluate the request
+        """
+        if isinstance(point, np.ndarray):
+            point = point.tolist()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        request = {'id': request_id, 'vars': list(var_names), 'funcs': func_list, 'point': point}
+        self._writer.write((json.dumps(request) + "\n").encode())
+        try:
+            response = await future
+        finally:
+            self._waiting.pop(request_id, None)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return np.array(response['f']), np.array(response['J'])
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._listener.cancel()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog="python -m team20ad.server",
+                                     description="Serve Jacobian evaluations with micro-batching.")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port (default 8765)")
+    parser.add_argument("--window", type=float, default=2.0, help="batching window in ms (default 2)")
+    parser.add_argument("--max-batch", type=int, default=4096, help="largest batch (default 4096)")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = GradientServer(args.window / 1000, args.max_batch)
+        await server.start(args.unix, args.host, args.port)
+        where = server.address[0] or "{}:{}".format(*server.address[1:])
+        print(f"team20ad server listening on {where}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
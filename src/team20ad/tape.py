@@ -0,0 +1,691 @@
+"""Tape-based (Wengert list) engine for reverse mode AD.
+
+Every operation is recorded as one entry of a flat tape holding an integer op
+code, the indices of its (at most two) parents, a constant operand and the
+local partial derivatives with respect to the parents. Derivatives are then
+accumulated by a single linear backward sweep over an adjoint buffer, so the
+depth of an expression is not limited by the recursion limit.
+
+The tape is stored as parallel typed arrays (int32 op codes and parent
+indices, float64 constants, values and partials), about 44 bytes per
+operation, so graphs with tens of millions of operations fit in memory.
+"""
+
+from array import array
+
+import numpy as np
+
+from . import elementary
+from .primitives import _BACKENDS, PRIMITIVES, SCALAR_LIB
+
+
+# op codes of the arithmetic and fused operations; the primitives of the
+# registry are numbered after them (see OPS)
+VAR, ADD, ADD_C, SUB, RSUB_C, MUL, MUL_C, DIV, RDIV_C, POW, POW_C, RPOW_C, NEG, ABS, \
+    LSE, LSE_C, SUMSQ, SQ_ADD = range(18)
+
+
+def _pow(a, b, c):
+    value = a ** b
+    return value, b * a ** (b - 1), value * elementary.log(a) if a > 0 else 0.0
+
+
+def _lse(a, b, c):
+    # log(e^a + e^b) shifted by the larger real part, with softmax partials
+    m = max(a.real, b.real)
+    value = m + elementary.log(elementary.exp(a - m) + elementary.exp(b - m))
+    return value, elementary.exp(a - value), elementary.exp(b - value)
+
+
+# kernels map (parent value a, parent value b, constant c) to
+# (value, partial w.r.t. a, partial w.r.t. b); they only use arithmetic and
+# the elementary functions, so they also accept DualNumbers
+_KERNELS = {
+    VAR: lambda a, b, c: (c, 0.0, 0.0),
+    ADD: lambda a, b, c: (a + b, 1.0, 1.0),
+    ADD_C: lambda a, b, c: (a + c, 1.0, 0.0),
+    SUB: lambda a, b, c: (a - b, 1.0, -1.0),
+    RSUB_C: lambda a, b, c: (c - a, -1.0, 0.0),
+    MUL: lambda a, b, c: (a * b, b, a),
+    MUL_C: lambda a, b, c: (a * c, c, 0.0),
+    DIV: lambda a, b, c: (a / b, 1 / b, -a / b ** 2),
+    RDIV_C: lambda a, b, c: (c / a, -c / a ** 2, 0.0),
+    POW: _pow,
+    POW_C: lambda a, b, c: (a ** c, c * a ** (c - 1), 0.0),
+    RPOW_C: lambda a, b, c: (c ** a, c ** a * np.log(c), 0.0),
+    NEG: lambda a, b, c: (-a, -1.0, 0.0),
+    ABS: lambda a, b, c: (abs(a), 1.0 if a > 0 else -1.0 if a < 0 else 0.0, 0.0),
+    LSE: _lse,
+    LSE_C: lambda a, b, c: _lse(a, c, None)[:2] + (0.0,),
+    SUMSQ: lambda a, b, c: (a * a + b * b, 2 * a, 2 * b),
+    SQ_ADD: lambda a, b, c: (a + b * b, 1.0, 2 * b),
+}
+
+
+def _kernel(prim):
+    """Generates the tape kernel of a primitive.
+
+    The constant c of a primitive entry is the tuple of its parameters, or
+    None (stored as 0.0) when they all take their default values.
+    """
+    function, partial = elementary.FUNCTIONS[prim.name], prim.partial
+
+    def kernel(a, b, c):
+        params = c if type(c) is tuple else ()
+        value = function(a, *params)
+        if type(a) is float:
+            return value, partial(SCALAR_LIB, a, value, *params), 0.0
+        return value, partial(elementary, a, value, *params), 0.0
+
+    return kernel
+
+
+OPS = {}
+for _code, _prim in enumerate(PRIMITIVES.values(), start=len(_KERNELS)):
+    OPS[_prim.name] = _code
+    _KERNELS[_code] = _kernel(_prim)
+
+SQRT, EXP, LOG, SIN, COS, TAN, ARCSIN, ARCCOS, ARCTAN, SINH, COSH, TANH, LOGISTIC, SOFTPLUS = (
+    OPS[name] for name in ('sqrt', 'exp', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos',
+                           'arctan', 'sinh', 'cosh', 'tanh', 'logistic', 'softplus'))
+
+
+class Tape:
+    """A flat record of operations for reverse mode AD.
+
+    Parameter
+    ------
+    reuse : bool, optional (default = False)
+        if True, recording an operation that is already on the tape (same op
+        code, parents and constant) returns the existing entry, so common
+        subexpressions of several outputs are stored and evaluated once. The
+        index of recorded operations this takes (about 200 bytes per entry)
+        is kept until seal is called.
+
+    Attributes
+    ------
+    ops : array of int32
+        the op code of each entry
+    arg0, arg1 : array of int32
+        the indices of the first and second parent of each entry (-1 if none)
+    consts : array of float64
+        the constant operand of each entry (0.0 if none)
+    params : dict
+        the tuple of constant operands of entries taking several (e.g. the
+        parameters of logistic), keyed by entry index
+    values : array of float64
+        the primal value of each entry
+    partial0, partial1 : array of float64
+        the local partial derivatives of each entry with respect to its parents
+    inputs : list of int
+        the indices of the independent variables, in the order they were recorded
+
+    Notes
+    ------
+    A tape is a trace of one evaluation. It can be replayed at new variable
+    values (see replay) as long as the recorded functions take the same
+    branches, i.e. do not depend on comparisons of the variable values.
+
+    Examples
+    --------
+    >>> tape = Tape()
+    >>> x, y = tape.variable(1.0), tape.variable(2.0)
+    >>> z = x * y + sin(x)
+    >>> z.value
+    2.8414709848078967
+    >>> tape.gradient(z, [x, y])
+    array([2.54030231, 1.        ])
+    """
+
+    def __init__(self, reuse = False):
+        self._index = {} if reuse else None
+        self.ops = array('i')
+        self.arg0 = array('i')
+        self.arg1 = array('i')
+        self.consts = array('d')
+        self.params = {}
+        self.values = array('d')
+        self.partial0 = array('d')
+        self.partial1 = array('d')
+        self.inputs = []
+        self._adjoint = array('d')
+        self._adjoint_block = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return f"Tape({len(self)} entries)"
+
+    def variable(self, value):
+        """Records an independent variable and returns its handle.
+
+        Parameter
+        ------
+        value : int or float
+            the value of the variable
+
+        Returns
+        ------
+        TapeVar
+            the handle of the new variable
+        """
+        if not isinstance(value, (int, float)):
+            raise TypeError("Input must be int or float.")
+        self.inputs.append(len(self.ops))
+        return self.record(VAR, -1, -1, value)
+
+    def record(self, op, a, b = -1, c = None):
+        """Evaluates an operation on recorded values and appends it to the tape.
+
+        Parameters
+        ------
+        op : int
+            the op code
+        a, b : int
+            the indices of the parents (-1 if none)
+        c : int, float or tuple, optional
+            the constant operand
+
+        Returns
+        ------
+        TapeVar
+            the handle of the new entry
+        """
+        if self._index is not None and op != VAR:
+            key = (op, a, b, c)
+            if key in self._index:
+                return TapeVar(self, self._index[key])
+            self._index[key] = len(self.ops)
+        va = self.values[a] if a >= 0 else None
+        vb = self.values[b] if b >= 0 else None
+        value, p0, p1 = _KERNELS[op](va, vb, c)
+        if isinstance(c, tuple):
+            self.params[len(self.ops)] = c
+            c = 0.0
+        self.ops.append(op)
+        self.arg0.append(a)
+        self.arg1.append(b)
+        self.consts.append(0.0 if c is None else c)
+        self.values.append(value)
+        self.partial0.append(p0)
+        self.partial1.append(p1)
+        return TapeVar(self, len(self.ops) - 1)
+
+    def seal(self):
+        """Releases the index of recorded operations once recording is done.
+
+        Replaying and sweeping the tape do not need it; operations recorded
+        afterwards are appended without looking for an existing entry.
+        """
+        self._index = None
+
+    def replay(self, values):
+        """Re-evaluates the recorded operations at new variable values.
+
+        The values and local partials are overwritten in place, so no entries
+        are created and the tape can be swept backward right away.
+
+        Parameter
+        ------
+        values : sequence of int or float
+            the new value of each variable, in the order they were recorded
+
+        Raises
+        ------
+        ValueError
+            if the number of values does not match the number of variables.
+        """
+        if len(values) != len(self.inputs):
+            raise ValueError(f"Expected {len(self.inputs)} values, got {len(values)}.")
+        ops, arg0, arg1, consts, params = self.ops, self.arg0, self.arg1, self.consts, self.params
+        vals, partial0, partial1 = self.values, self.partial0, self.partial1
+        for i, value in zip(self.inputs, values):
+            vals[i] = float(value)
+        for i in range(len(ops)):
+            op = ops[i]
+            if op == VAR:
+                continue
+            b = arg1[i]
+            vals[i], partial0[i], partial1[i] = _KERNELS[op](
+                vals[arg0[i]], vals[b] if b >= 0 else None,
+                params[i] if i in params else consts[i])
+
+    def _clear_adjoint(self):
+        """Returns the reusable adjoint buffer, zeroed and sized to the tape."""
+        adj = self._adjoint
+        if len(adj) < len(self.ops):
+            adj.extend(array('d', bytes(8 * (len(self.ops) - len(adj)))))
+        np.frombuffer(adj, dtype=float)[:] = 0.0
+        return adj
+
+    def _sweep(self, adj, last):
+        """Propagates the seeded adjoints backward from entry `last` to the first entry."""
+        arg0, arg1, partial0, partial1 = self.arg0, self.arg1, self.partial0, self.partial1
+        for i in range(last, -1, -1):
+            a = adj[i]
+            if a == 0.0:
+                continue
+            p = arg0[i]
+            if p >= 0:
+                adj[p] += a * partial0[i]
+                p = arg1[i]
+                if p >= 0:
+                    adj[p] += a * partial1[i]
+        return adj
+
+    def backward(self, output):
+        """Accumulates the adjoints of all entries with a single reverse sweep.
+
+        The adjoint buffer is kept and reused by later sweeps.
+
+        Parameter
+        ------
+        output : TapeVar or int
+            the entry to differentiate
+
+        Returns
+        ------
+        array of float64
+            the derivative of the output with respect to every entry
+        """
+        output = output.index if isinstance(output, TapeVar) else output
+        adj = self._clear_adjoint()
+        adj[output] = 1.0
+        return self._sweep(adj, output)
+
+    def vjp(self, outputs, u, inputs):
+        """Computes the vector-Jacobian product u @ J with a single reverse sweep.
+
+        Parameters
+        ------
+        outputs : list of TapeVar, int or float
+            the entries forming the rows of J (constants have zero derivatives)
+        u : sequence of float
+            the adjoint seed of each output
+        inputs : list of TapeVar
+            the variables forming the columns of J
+
+        Returns
+        ------
+        numpy.array
+            the product, one value per input
+        """
+        if len(u) != len(outputs):
+            raise ValueError(f"Expected {len(outputs)} adjoint seeds, got {len(u)}.")
+        adj = self._clear_adjoint()
+        last = -1
+        for out, w in zip(outputs, u):
+            if isinstance(out, TapeVar):
+                adj[out.index] += float(w)
+                last = max(last, out.index)
+        self._sweep(adj, last)
+        return np.array([adj[v.index] for v in inputs], dtype=float)
+
+    def gradient_at(self, output, values, inputs):
+        """Replays the tape at values of any numeric type and sweeps it backward.
+
+        Unlike replay, the recorded float buffers are left untouched: values,
+        partials and adjoints are carried in fresh lists, so DualNumbers can be
+        pushed through both sweeps (forward-over-reverse). With variables
+        seeded as ``DualNumber(x, v)`` the adjoint of each input has the
+        gradient as its real part and the Hessian-vector product H @ v as its
+        dual part.
+
+        Parameters
+        ------
+        output : TapeVar or int
+            the entry to differentiate
+        values : sequence
+            the value of each variable, in the order they were recorded
+        inputs : list of TapeVar
+            the variables to differentiate with respect to
+
+        Returns
+        ------
+        list
+            the adjoint of each input
+        """
+        if len(values) != len(self.inputs):
+            raise ValueError(f"Expected {len(self.inputs)} values, got {len(values)}.")
+        output = output.index if isinstance(output, TapeVar) else output
+        ops, arg0, arg1, consts, params = self.ops, self.arg0, self.arg1, self.consts, self.params
+        vals = [None] * (output + 1)
+        partial0 = [0.0] * (output + 1)
+        partial1 = [0.0] * (output + 1)
+        for i, value in zip(self.inputs, values):
+            if i <= output:
+                vals[i] = value
+        for i in range(output + 1):
+            op = ops[i]
+            if op == VAR:
+                continue
+            b = arg1[i]
+            vals[i], partial0[i], partial1[i] = _KERNELS[op](
+                vals[arg0[i]], vals[b] if b >= 0 else None,
+                params[i] if i in params else consts[i])
+
+        adj = [0.0] * (output + 1)
+        adj[output] = 1.0
+        for i in range(output, -1, -1):
+            a = adj[i]
+            p = arg0[i]
+            if p >= 0:
+                adj[p] = adj[p] + a * partial0[i]
+                p = arg1[i]
+                if p >= 0:
+                    adj[p] = adj[p] + a * partial1[i]
+        return [adj[v.index] if v.index <= output else 0.0 for v in inputs]
+
+    def gradient(self, output, inputs):
+        """Computes the derivatives of an output with respect to the given inputs.
+
+        Parameters
+        ------
+        output : TapeVar, int or float
+            the entry to differentiate (a constant has zero derivatives)
+        inputs : list of TapeVar
+            the variables to differentiate with respect to
+
+        Returns
+        ------
+        numpy.array
+            the derivative with respect to each input
+        """
+        if not isinstance(output, TapeVar):
+            return np.zeros(len(inputs))
+        adj = self.backward(output)
+        return np.array([adj[v.index] for v in inputs], dtype=float)
+
+
+    def jacobian(self, outputs, inputs, seeds = None):
+        """Computes the Jacobian of several outputs with one vector-adjoint sweep.
+
+        Each entry carries a row of adjoints, one per output, so all outputs
+        are differentiated by a single reverse sweep over the shared tape.
+        The adjoint block is kept and reused by later sweeps of the same shape.
+
+        Parameters
+        ------
+        outputs : list of TapeVar, int or float
+            the entries to differentiate (constants have zero derivatives)
+        inputs : list of TapeVar
+            the variables to differentiate with respect to
+        seeds : numpy.array, optional (default = None)
+            array of shape (len(outputs), p) of adjoint seeds; if given, the
+            compressed product ``seeds.T @ J`` is returned instead of J
+
+        Returns
+        ------
+        numpy.array
+            array of shape (len(outputs), len(inputs)), or (p, len(inputs))
+            if seeds are given
+        """
+        if seeds is None:
+            seeds = np.eye(len(outputs))
+        if seeds.shape[1] == 1:
+            # a single adjoint per entry: the scalar sweep avoids numpy calls
+            return self.vjp(outputs, seeds[:, 0], inputs)[None, :]
+        rows =[(j, out.index) for j, out in enumerate(outputs) if isinstance(out, TapeVar)]
+        if not rows:
+            return np.zeros((seeds.shape[1], len(inputs)))
+        last = max(i for _, i in rows)
+        adj = self._adjoint_block
+        if adj is None or adj.shape != (last + 1, seeds.shape[1]):
+            adj = self._adjoint_block = np.zeros((last + 1, seeds.shape[1]))
+        else:
+            adj.fill(0.0)
+        for j, i in rows:
+            adj[i] += seeds[j]
+
+        arg0, arg1, partial0, partial1 = self.arg0, self.arg1, self.partial0, self.partial1
+        for i in range(last, -1, -1):
+            p = arg0[i]
+            if p < 0:
+                continue
+            a = adj[i]
+            if not a.any():
+                continue
+            adj[p] += a * partial0[i]
+            p = arg1[i]
+            if p >= 0:
+                adj[p] += a * partial1[i]
+        jac = np.zeros((seeds.shape[1], len(inputs)))
+        for k, v in enumerate(inputs):
+            if v.index <= last:
+                jac[:, k] = adj[v.index]
+        return jac
+
+
+class TapeVar:
+    """Handle to an entry of a Tape, supporting operator overloading.
+
+    The handle exposes the interface of Node (the var attribute,
+    g_derivatives, the comparison operators and the elementary functions as
+    static methods, e.g. TapeVar.sin(x)), while the graph itself lives in the
+    compact arrays of the tape.
+
+    Attributes
+    ------
+    tape : Tape
+        the tape the entry belongs to
+    index : int
+        the position of the entry on the tape
+    """
+
+    __slots__ = ('tape', 'index')
+
+    def __init__(self, tape, index):
+        self.tape = tape
+        self.index = index
+
+    @property
+    def value(self):
+        """The primal value of the entry."""
+        return self.tape.values[self.index]
+
+    @property
+    def var(self):
+        """The primal value of the entry (alias of value, as in Node)."""
+        return self.tape.values[self.index]
+
+    def __repr__(self):
+        return f"TapeVar({self.value})"
+
+    def g_derivatives(self, inputs):
+        """Get derivatives for each variable in the function.
+
+        Parameter
+        ------
+        inputs : list of TapeVar
+            the variables to differentiate with respect to
+
+        Returns
+        ------
+        var_val : float
+            the value of the entry.
+        der_list : numpy.array
+            the derivative with respect to each variable.
+        """
+        return self.value, self.tape.gradient(self, inputs)
+
+    def _binary(self, other, op, op_c):
+        if isinstance(other, TapeVar):
+            if other.tape is not self.tape:
+                raise ValueError("Operands are recorded on different tapes.")
+            return self.tape.record(op, self.index, other.index)
+        if isinstance(other, (int, float)):
+            return self.tape.record(op_c, self.index, -1, other)
+        raise TypeError(f"Unsupported type '{type(other)}'")
+
+    def _unary(self, other, op_c):
+        if isinstance(other, (int, float)):
+            return self.tape.record(op_c, self.index, -1, other)
+        raise TypeError(f"Unsupported type '{type(other)}'")
+
+    def __add__(self, other):
+        return self._binary(other, ADD, ADD_C)
+
+    def __radd__(self, other):
+        return self._unary(other, ADD_C)
+
+    def __sub__(self, other):
+        if isinstance(other, (int, float)):
+            return self.tape.record(ADD_C, self.index, -1, -other)
+        return self._binary(other, SUB, ADD_C)
+
+    def __rsub__(self, other):
+        return self._unary(other, RSUB_C)
+
+    def __mul__(self, other):
+        return self._binary(other, MUL, MUL_C)
+
+    def __rmul__(self, other):
+        return self._unary(other, MUL_C)
+
+    def __truediv__(self, other):
+        if isinstance(other, (int, float)):
+            if other == 0:
+                raise ZeroDivisionError("Cannot divide by zero.")
+            return self.tape.record(MUL_C, self.index, -1, 1 / other)
+        return self._binary(other, DIV, MUL_C)
+
+    def __rtruediv__(self, other):
+        return self._unary(other, RDIV_C)
+
+    def __pow__(self, other):
+        return self._binary(other, POW, POW_C)
+
+    def __rpow__(self, other):
+        return self._unary(other, RPOW_C)
+
+    def __neg__(self):
+        return self.tape.record(NEG, self.index)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self.tape.record(ABS, self.index)
+
+    def __lt__(self, other):
+        return self.value < getattr(other, 'value', other)
+
+    def __gt__(self, other):
+        return self.value > getattr(other, 'value', other)
+
+    def __le__(self, other):
+        return self.value <= getattr(other, 'value', other)
+
+    def __ge__(self, other):
+        return self.value >= getattr(other, 'value', other)
+
+    def __eq__(self, other):
+        if not isinstance(other, TapeVar):
+            raise TypeError('Input has incomparable type.')
+        return self.value == other.value
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def _apply(op, x, c = None):
+    """Records a unary elementary function on a TapeVar or evaluates it on a scalar."""
+    if isinstance(x, TapeVar):
+        return x.tape.record(op, x.index, -1, c)
+    if isinstance(x, (int, float)):
+        return _KERNELS[op](x, None, c)[0]
+    raise TypeError(f"Unsupported type '{type(x)}'")
+
+
+def _function(prim):
+    """Generates the function recording a primitive on the tape."""
+    op, defaults = OPS[prim.name], prim.defaults
+
+    def function(x, *params, **kwargs):
+        c = None
+        if params or kwargs:
+            c = prim.bind(params, kwargs)
+            if c == defaults:
+                c = None
+        return _apply(op, x, c)
+
+    function.__name__ = function.__qualname__ = prim.name
+    function.__doc__ = f"{prim.doc or prim.name} Recorded on the tape."
+    return function
+
+
+def _fused_args(name, xs):
+    """Splits the arguments of a fused function into TapeVars and constants."""
+    if not xs:
+        raise TypeError(f"{name}() needs at least one argument.")
+    tvars, consts = [], []
+    for x in xs:
+        if isinstance(x, TapeVar):
+            if tvars and x.tape is not tvars[0].tape:
+                raise ValueError("Operands are recorded on different tapes.")
+            tvars.append(x)
+        elif isinstance(x, (int, float)):
+            consts.append(x)
+        else:
+            raise TypeError(f"Unsupported type '{type(x)}'")
+    return tvars, consts
+
+
+def logsumexp(*xs):
+    """Log-sum-exp recorded as a chain of fused binary entries, one per extra variable.
+
+    The constant arguments are combined into a single constant operand.
+    """
+    tvars, consts = _fused_args('logsumexp', xs)
+    if not tvars:
+        return elementary.logsumexp(*consts)
+    tape, out = tvars[0].tape, tvars[0].index
+    for x in tvars[1:]:
+        out = tape.record(LSE, out, x.index).index
+    if consts:
+        return tape.record(LSE_C, out, -1, float(elementary.logsumexp(*consts)))
+    return TapeVar(tape, out)
+
+
+def sumsq(*xs):
+    """Sum of squares recorded as a chain of fused binary entries, one per extra variable.
+
+    The squares of the constant arguments are added as a single constant.
+    """
+    tvars, consts = _fused_args('sumsq', xs)
+    if not tvars:
+        return elementary.sumsq(*consts)
+    tape = tvars[0].tape
+    if len(tvars) == 1:
+        out = tape.record(MUL, tvars[0].index, tvars[0].index)
+    else:
+        out = tape.record(SUMSQ, tvars[0].index, tvars[1].index)
+    for x in tvars[2:]:
+        out = tape.record(SQ_ADD, out.index, x.index)
+    if consts:
+        return tape.record(ADD_C, out.index, -1, float(elementary.sumsq(*consts)))
+    return out
+
+
+FUNCTIONS = {name: _function(prim) for name, prim in PRIMITIVES.items()}
+FUNCTIONS.update(logsumexp=logsumexp, sumsq=sumsq)
+
+sqrt, exp, log, sin, cos, tan, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, softplus = (
+    FUNCTIONS[name] for name in ('sqrt', 'exp', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos',
+                                 'arctan', 'sinh', 'cosh', 'tanh', 'logistic', 'softplus'))
+
+# Node-style access to the elementary functions, e.g. TapeVar.sin(x)
+for _name, _func in FUNCTIONS.items():
+    setattr(TapeVar, _name, staticmethod(_func))
+
+
+def _add(prim):
+    if prim.name not in OPS:
+        OPS[prim.name] = len(_KERNELS)
+    _KERNELS[OPS[prim.name]] = _kernel(prim)
+    FUNCTIONS[prim.name] = _function(prim)
+    setattr(TapeVar, prim.name, staticmethod(FUNCTIONS[prim.name]))
+
+
+_BACKENDS.append(_add)
@@ -0,0 +1,383 @@
+import math
+
+import numpy as np
+
+
+class TaylorNumber:
+    """A truncated Taylor polynomial supporting arbitrary-order univariate derivatives.
+
+    The number represents x(t) = c_0 + c_1 t + ... + c_K t^K, truncated at
+    order K. Propagating it through a function f yields the Taylor
+    coefficients of f(x(t)), from which the derivatives of f along the
+    direction of x(t) follow as d^k f / dt^k = k! c_k. Every operation costs
+    O(K^2) arithmetic, instead of the 2^K of nested dual numbers.
+
+    Attributes
+    ------
+    _supported_scalars : tuple
+        A tuple containing types of objects that are supported by the
+        Taylor number operations.
+    coeffs : numpy.array
+        The Taylor coefficients, of shape (K + 1,), or (K + 1, N) for a
+        batched Taylor number holding N points.
+
+    Examples
+    ------
+    >>> x = TaylorNumber.variable(0.0, 4)
+    >>> exp(x).coeffs
+    array([1.        , 1.        , 0.5       , 0.16666667, 0.04166667])
+    >>> (x * x + 3 * x).derivatives()
+    array([0., 3., 2., 0., 0.])
+    """
+
+    _supported_scalars = (int, float)
+
+    def __init__(self, coeffs):
+        """
+        Parameters
+        ------
+        coeffs : sequence or numpy.array
+            The Taylor coefficients c_0, ..., c_K (each a float, or an array
+            of N values for a batched Taylor number).
+
+        Raises
+        ------
+        TypeError
+            if the coefficients are not numeric.
+        ValueError
+            if no coefficient is given.
+        """
+        try:
+            coeffs = np.array(coeffs, dtype=float)
+        except (TypeError, ValueError):
+            raise TypeError("Coefficients should be numeric.")
+        if coeffs.ndim == 0 or len(coeffs) == 0:
+            raise ValueError("At least one coefficient is required.")
+        self.coeffs = coeffs
+
+    @classmethod
+    def variable(cls, value, order, direction = 1.0):
+        """Creates the Taylor number x(t) = value + direction * t.
+
+        Parameters
+        ------
+        value : int, float or numpy.array
+            The point (one value per point for a batched Taylor number).
+        order : int
+            The truncation order K.
+        direction : int, float or numpy.array, optional (default = 1.0)
+            The direction in which derivatives are taken.
+
+        Returns
+        ------
+        TaylorNumber
+            the seeded Taylor number.
+        """
+        if not isinstance(order, int) or order < 0:
+            raise ValueError("Order should be a non-negative integer.")
+        value = np.asarray(value, dtype=float)
+        coeffs = np.zeros((order + 1,) + value.shape)
+        coeffs[0] = value
+        if order >= 1:
+            coeffs[1] = direction
+        return cls(coeffs)
+
+    @property
+    def order(self):
+        """The truncation order K."""
+        return len(self.coeffs) - 1
+
+    @property
+    def real(self):
+        """The value c_0 at t = 0."""
+        return self.coeffs[0]
+
+    def derivatives(self):
+        """Returns the derivatives d^k/dt^k = k! c_k for k = 0, ..., K.
+
+        Returns
+        ------
+        numpy.array
+            array of the same shape as coeffs.
+        """
+        factorials = np.array([math.factorial(k) for k in range(self.order + 1)], dtype=float)
+        return self.coeffs * factorials.reshape((-1,) + (1,) * (self.coeffs.ndim - 1))
+
+    def __repr__(self):
+        """Returns a representation of the TaylorNumber instance."""
+        return f"TaylorNumber({self.coeffs.tolist()})"
+
+    def __str__(self):
+        """Returns a string representation of the TaylorNumber instance."""
+        return f"TaylorNumber: order = {self.order}, coeffs = {self.coeffs}"
+
+    def _coeffs_of(self, other):
+        """Returns the coefficients of another TaylorNumber of the same order."""
+        if isinstance(other, TaylorNumber):
+            if other.order != self.order:
+                raise ValueError("TaylorNumbers should have the same order.")
+            return other.coeffs
+        raise TypeError(f"Unsupported type '{type(other)}'")
+
+    def __neg__(self):
+        """Returns the negation of the TaylorNumber instance."""
+        return TaylorNumber(-self.coeffs)
+
+    def __pos__(self):
+        """Returns the TaylorNumber instance itself."""
+        return self
+
+    def __add__(self, other):
+        """Returns the sum of the TaylorNumber instance and a TaylorNumber, int or float."""
+        if isinstance(other, self._supported_scalars):
+            coeffs = self.coeffs.copy()
+            coeffs[0] = coeffs[0] + other
+            return TaylorNumber(coeffs)
+        return TaylorNumber(self.coeffs + self._coeffs_of(other))
+
+    def __radd__(self, other):
+        """Returns the sum of a scalar object and the TaylorNumber instance."""
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        """Returns the difference of the TaylorNumber instance and a TaylorNumber, int or float."""
+        if isinstance(other, self._supported_scalars):
+            return self.__add__(-other)
+        return TaylorNumber(self.coeffs - self._coeffs_of(other))
+
+    def __rsub__(self, other):
+        """Returns the difference of a scalar object and the TaylorNumber instance."""
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        """Returns the product of the TaylorNumber instance and a TaylorNumber, int or float."""
+        if isinstance(other, self._supported_scalars):
+            return TaylorNumber(self.coeffs * other)
+        return TaylorNumber(_mul(self.coeffs, self._coeffs_of(other)))
+
+    def __rmul__(self, other):
+        """Returns the product of a scalar object and the TaylorNumber instance."""
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """Returns the division of the TaylorNumber instance by a TaylorNumber, int or float."""
+        if isinstance(other, self._supported_scalars):
+            if other == 0:
+                raise ZeroDivisionError("Cannot divide by zero.")
+            return TaylorNumber(self.coeffs / other)
+        b = self._coeffs_of(other)
+        if np.any(b[0] == 0):
+            raise ZeroDivisionError("Cannot divide by zero.")
+        return TaylorNumber(_div(self.coeffs, b))
+
+    def __rtruediv__(self, other):
+        """Returns the division of a scalar object by the TaylorNumber instance."""
+        if not isinstance(other, self._supported_scalars):
+            raise TypeError(f"Unsupported type '{type(other)}'")
+        if np.any(self.coeffs[0] == 0):
+            raise ZeroDivisionError("Cannot divide by zero.")
+        a = np.zeros_like(self.coeffs)
+        a[0] = other
+        return TaylorNumber(_div(a, self.coeffs))
+
+    def __pow__(self, other):
+        """Returns the TaylorNumber instance raised to a TaylorNumber, int or float exponent."""
+        if isinstance(other, int) and other >= 0:
+            return TaylorNumber(_int_pow(self.coeffs, other))
+        if isinstance(other, self._supported_scalars):
+            if np.any(self.coeffs[0] == 0):
+                raise ValueError("Non-integer powers are not differentiable at zero.")
+            return TaylorNumber(_pow(self.coeffs, other))
+        self._coeffs_of(other)
+        return exp(other * log(self))
+
+    def __rpow__(self, other):
+        """Returns a scalar object raised to the TaylorNumber instance as exponent."""
+        if not isinstance(other, self._supported_scalars):
+            raise TypeError(f"Unsupported type '{type(other)}'")
+        if other <= 0:
+            raise ValueError(f"Unsupported value '{other}'")
+        return exp(self * math.log(other))
+
+    def __abs__(self):
+        """Returns the absolute value, i.e. the polynomial with the sign of c_0."""
+        return TaylorNumber(self.coeffs * np.sign(self.coeffs[0]))
+
+    def __lt__(self, other):
+        return self.real < getattr(other, 'real', other)
+
+    def __gt__(self, other):
+        return self.real > getattr(other, 'real', other)
+
+    def __le__(self, other):
+        return self.real <= getattr(other, 'real', other)
+
+    def __ge__(self, other):
+        return self.real >= getattr(other, 'real', other)
+
+
+def _mul(a, b):
+    """Truncated Cauchy product of two coefficient arrays."""
+    out = np.zeros(np.broadcast_shapes(a.shape, b.shape))
+    for k in range(len(out)):
+        for i in range(k + 1):
+            out[k] += a[i] * b[k - i]
+    return out
+
+
+def _div(a, b):
+    """Coefficients of a / b, from a = b * c solved for c term by term."""
+    out = np.zeros(np.broadcast_shapes(a.shape, b.shape))
+    for k in range(len(out)):
+        acc = a[k]
+        for i in range(1, k + 1):
+            acc = acc - b[i] * out[k - i]
+        out[k] = acc / b[0]
+    return out
+
+
+def _int_pow(a, n):
+    """Coefficients of a ** n for a non-negative integer n, by repeated squaring."""
+    out = np.zeros_like(a)
+    out[0] = 1.0
+    while n:
+        if n & 1:
+            out = _mul(out, a)
+        a = _mul(a, a)
+        n >>= 1
+    return out
+
+
+def _pow(a, r):
+    """Coefficients of a ** r, from a p' = r a' p (requires a_0 != 0)."""
+    out = np.zeros_like(a)
+    out[0] = a[0] ** r
+    for k in range(1, len(a)):
+        for j in range(1, k + 1):
+            out[k] += ((r + 1) * j - k) * a[j] * out[k - j]
+        out[k] /= k * a[0]
+    return out
+
+
+def _integrate(u0, a, g):
+    """Coefficients of u with u' = g a' and u_0 = u0."""
+    out = np.zeros(np.broadcast_shapes(a.shape, g.shape))
+    out[0] = u0
+    for k in range(1, len(out)):
+        for j in range(1, k + 1):
+            out[k] += j * a[j] * g[k - j]
+        out[k] /= k
+    return out
+
+
+def _sin_cos(a, hyperbolic = False):
+    """Coefficients of sin(a) and cos(a) (or sinh and cosh), computed together."""
+    s, c = np.zeros_like(a), np.zeros_like(a)
+    s[0], c[0] = (np.sinh(a[0]), np.cosh(a[0])) if hyperbolic else (np.sin(a[0]), np.cos(a[0]))
+    sign = 1 if hyperbolic else -1
+    for k in range(1, len(a)):
+        for j in range(1, k + 1):
+            s[k] += j * a[j] * c[k - j]
+            c[k] += j * a[j] * s[k - j]
+        s[k] /= k
+        c[k] *= sign / k
+    return s, c
+
+
+def exp(t):
+    """Exponential function of a TaylorNumber."""
+    a = t.coeffs
+    out = np.zeros_like(a)
+    out[0] = np.exp(a[0])
+    for k in range(1, len(a)):
+        for j in range(1, k + 1):
+            out[k] += j * a[j] * out[k - j]
+        out[k] /= k
+    return TaylorNumber(out)
+
+
+def log(t, base = None):
+    """Logarithm of a TaylorNumber (natural unless a base is given)."""
+    a = t.coeffs
+    out = np.zeros_like(a)
+    out[0] = np.log(a[0])
+    for k in range(1, len(a)):
+        acc = np.zeros_like(a[0])
+        for j in range(1, k):
+            acc += j * out[j] * a[k - j]
+        out[k] = (a[k] - acc / k) / a[0]
+    if base is not None:
+        out /= np.log(base)
+    return TaylorNumber(out)
+
+
+def sqrt(t):
+    """Square root of a TaylorNumber."""
+    return TaylorNumber(_pow(t.coeffs, 0.5))
+
+
+def sin(t):
+    """Sine function of a TaylorNumber."""
+    return TaylorNumber(_sin_cos(t.coeffs)[0])
+
+
+def cos(t):
+    """Cosine function of a TaylorNumber."""
+    return TaylorNumber(_sin_cos(t.coeffs)[1])
+
+
+def tan(t):
+    """Tangent function of a TaylorNumber."""
+    s, c = _sin_cos(t.coeffs)
+    return TaylorNumber(_div(s, c))
+
+
+def sinh(t):
+    """Hyperbolic sine function of a TaylorNumber."""
+    return TaylorNumber(_sin_cos(t.coeffs, hyperbolic = True)[0])
+
+
+def cosh(t):
+    """Hyperbolic cosine function of a TaylorNumber."""
+    return TaylorNumber(_sin_cos(t.coeffs, hyperbolic = True)[1])
+
+
+def tanh(t):
+    """Hyperbolic tangent function of a TaylorNumber."""
+    s, c = _sin_cos(t.coeffs, hyperbolic = True)
+    return TaylorNumber(_div(s, c))
+
+
+def arcsin(t):
+    """Inverse sine function of a TaylorNumber."""
+    a = t.coeffs
+    g = _pow(_one_minus_square(a), -0.5)
+    return TaylorNumber(_integrate(np.arcsin(a[0]), a, g))
+
+
+def arccos(t):
+    """Inverse cosine function of a TaylorNumber."""
+    a = t.coeffs
+    g = -_pow(_one_minus_square(a), -0.5)
+    return TaylorNumber(_integrate(np.arccos(a[0]), a, g))
+
+
+def arctan(t):
+    """Inverse tangent function of a TaylorNumber."""
+    a = t.coeffs
+    one = np.zeros_like(a)
+    one[0] = 1.0
+    g = _div(one, one + _mul(a, a))
+    return TaylorNumber(_integrate(np.arctan(a[0]), a, g))
+
+
+def logistic(t, L = 1, k = 1, x_0 = 0):
+    """Logistic function of a TaylorNumber."""
+    return L / (1 + exp(-k * (t - x_0)))
+
+
+def _one_minus_square(a):
+    """Coefficients of 1 - a * a."""
+    out = -_mul(a, a)
+    out[0] = out[0] + 1.0
+    return out
@@ -1,13 +1,61 @@
+from . import batchAD, costModel
+from .asyncAD import AsyncAD
+from .compiledAD import CompiledAD, Graph
+from .crossCountryAD import CrossCountryAD
 from .forwardAD import ForwardAD
+from .mixedAD import MixedAD
+from .primitives import register
 from .reverseAD import ReverseAD
+from .sparseAD import SparseAD
+
+
+class CompiledResult:
+    """Result of a compiled evaluator at one point, printed like ForwardAD and ReverseAD.
+
+    Parameters
+    ------
+    title: str
+        name of the mode shown when printed
+    var_dict: dict
+        a dictionary of variables and their corresponding values
+    func_list: str or list of str
+        (a list of) function(s) encoded as string(s)
+    evaluator: callable
+        a compiled evaluator mapping a point to ``(func_evals, Dpf)``
+
+    Attributes
+    ------
+    func_evals: numpy.array
+        the evaluation of function(s) at the given point
+    Dpf: numpy.array
+        derivatives of function(s) evaluated at the given point, as a dense array
+    """
+    def __init__(self, title, var_dict, func_list, evaluator):
+        self.title = title
+        self.var_dict = var_dict
+        self.func_list = func_list
+        self.func_evals, Dpf = evaluator(var_dict)
+        self.Dpf = Dpf.toarray() if hasattr(Dpf, 'toarray') else Dpf
+
+    def __call__(self):
+        out = f"===== {self.title} =====\n"
+        out += f"Vars: {self.var_dict}\n"
+        out += f"Funcs: {self.func_list}\n"
+        out += f"-----\n"
+        out += f"Func evals: {self.func_evals.tolist()}\n"
+        out += f"Derivatives:\n{self.Dpf}\n"
+        print(out)
 
 
 class AD:
     """Automatic Differentiation wrapper that a mode can be specified. 
 
     If the mode is left unspecified by the user, it automatically determines 
-    which mode to use based on the number of independent variables 
-    and the number of functions to differentiate.
+    which mode to use from a cost model of the expression graph (see
+    costModel), which weighs the number of operations, the number of
+    independent variables and functions and the sparsity of the Jacobian.
+    If the functions cannot be parsed into a graph, forward mode is used when
+    there are no more variables than functions and reverse mode otherwise.
 
     Parameters
     ------
@@ -15,24 +63,36 @@ class AD:
         a dictionary of variables and their corresponding values
     func_list: str or list of str
         (a list of) function(s) encoded as string(s)
-    mode: {None, "forward", "f", "reverse", "r"}
-        string indicating mode of AD. Default is None.
+    mode: {None, "forward", "f", "reverse", "r", "sparse", "s", "mixed", "m", "cross", "c"}
+        string indicating mode of AD. Default is None. Cross-country mode
+        accumulates the Jacobian by vertex elimination (see crossCountryAD).
+    calibrate: bool, optional (default = False)
+        if True and the mode is None, the constants of the cost model are
+        measured on this machine (once per session) instead of using defaults
 
     Attributes
     ------
+    mode: str
+        the mode given, or the mode chosen if it was left unspecified
+    estimates: dict or None
+        the estimated cost in microseconds of each mode (see
+        costModel.CostModel.estimate) if the mode was chosen by the cost
+        model, and None otherwise
     func_evals: numpy.array
         the evaluation of function(s) at the given point 
     Dpf: numpy.array
         derivatives of function(s) evaluated at the given point
-    res: ForwardAD or ReverseAD objects
-        ForwardAD or ReverseAD objects that the AD instance delegates diffirentiation tasks to
+    res: ForwardAD, ReverseAD, CrossCountryAD or CompiledResult objects
+        ForwardAD, ReverseAD or CrossCountryAD objects that the AD instance delegates diffirentiation tasks to,
+        or the result of a SparseAD or MixedAD evaluator in sparse and mixed mode
 
     Examples
     --------
     >>> var_dict = {'x': 1, 'y': 1}
     >>> func_list = ['x**2 + y**2', 'exp(x + y)']
     >>> ad = AD(var_dict, func_list)
-    Number of variables <= number of functions: forward mode by default.
+    >>> ad.mode
+    'forward'
     >>> ad()
     ===== Forward AD =====
     Vars: {'x': 1, 'y': 1}
@@ -45,8 +105,7 @@ class AD:
 
     >>> var_dict = {'x': 1, 'y': 2, 'z': 3}
     >>> func_list = ['tan(x) + exp(y) + sqrt(z)']
-    >>> ad = AD(var_dict, func_list)
-    Number of variables > number of functions: reverse mode by default.
+    >>> ad = AD(var_dict, func_list, mode='r')
     >>> ad()
     ===== Reverse AD =====
     Vars: {'x': 1, 'y': 2, 'z': 3}
@@ -55,7 +114,7 @@ class AD:
     Func evals: [10.67851463115443]
     Derivatives:
     [[3.42551882 7.3890561  0.28867513]]
-
+    <BLANKLINE>
     >>> v = {'x': 1, 'y': 2}
     >>> f = ['x**2 + y**2', 'exp(x + y)', 'tan(x + y) * sqrt(y)']
     >>> ad = AD(v, f, mode='r')
@@ -69,33 +128,226 @@ class AD:
     [[ 2.          4.        ]
      [20.08553692 20.08553692]
      [ 1.4429497   1.39255189]]
+    <BLANKLINE>
+
+    >>> ad = AD({'x': 1, 'y': 2, 'z': 0}, ['x * y', 'y * z', 'exp(z)'], mode='s')
+    >>> ad.Dpf
+    array([[2., 1., 0.],
+           [0., 0., 2.],
+           [0., 0., 1.]])
     """
-    def __init__(self, var_dict, func_list, mode = None):
+    def __init__(self, var_dict, func_list, mode = None, calibrate = False):
         # check mode param valid
-        if (mode is not None) and (mode not in ("forward", "f", "reverse", "r")):
-            raise ValueError(f"Mode can be either forward, f, reverse, r, or None.") 
+        if (mode is not None) and (mode not in ("forward", "f", "reverse", "r", "sparse", "s", "mixed", "m", "cross", "c")):
+            raise ValueError(f"Mode can be either forward, f, reverse, r, sparse, s, mixed, m, cross, c, or None.") 
         
         self.mode = mode
+        self.estimates = None
         if self.mode is None: # if None, choose mode based on the criterion mentioned above
-            num_var = len(var_dict)
-            num_func = 1  # case: func_list is one string
-            if isinstance(func_list, list):
-                num_func = len(func_list)
-
-            if num_var <= num_func:
-                self.mode = "forward"
-                print('Number of variables <= number of functions: forward mode by default.')
+            try:
+                graph = Graph(list(var_dict), func_list if isinstance(func_list, list) else [func_list])
+            except (SyntaxError, NameError, TypeError, ValueError):
+                graph = None
+
+            if graph is not None:
+                model = costModel.CostModel(graph, costModel.calibrate() if calibrate else None)
+                self.estimates = model.estimate()
+                self.mode = min(self.estimates, key=self.estimates.get)
             else:
-                self.mode = "reverse"
-                print('Number of variables > number of functions: reverse mode by default.')
+                num_var = len(var_dict)
+                num_func = 1  # case: func_list is one string
+                if isinstance(func_list, list):
+                    num_func = len(func_list)
+
+                if num_var <= num_func:
+                    self.mode = "forward"
+                else:
+                    self.mode = "reverse"
 
         if self.mode in ("forward", "f"):
             self.res = ForwardAD(var_dict, func_list)
-        else:
+        elif self.mode in ("reverse", "r"):
             self.res = ReverseAD(var_dict, func_list)
+        elif self.mode in ("cross", "c"):
+            self.res = CrossCountryAD(var_dict, func_list)
+        elif self.mode in ("sparse", "s"):
+            self.res = CompiledResult("Sparse AD", var_dict, func_list, SparseAD(var_dict, func_list))
+        else:
+            self.res = CompiledResult("Mixed AD", var_dict, func_list, MixedAD(var_dict, func_list))
 
+        self.var_dict = var_dict
+        self.func_list = func_list
+        self._async = {}
         self.func_evals = self.res.func_evals
         self.Dpf = self.res.Dpf
 
     def __call__(self):
         return self.res.__call__()
+
+    def evaluate_many(self, points, chunk_size = None, workers = None, transport = "shared_memory",
+                      out = None, values = None, layout = "point"):
+        """Evaluates the function(s) and their Jacobians at many points in parallel.
+
+        The points are split into chunks that a process pool evaluates with
+        vectorized compiled evaluators, cached in each worker (see batchAD).
+        The points and results are shared with the workers through shared
+        memory or memory-mapped files rather than pickled.
+
+        Parameters
+        ------
+        points: numpy.array or dict
+            array of shape (N, n) with one column per variable, in the order
+            of var_dict, or a dict mapping each variable name to N values
+        chunk_size: int, optional
+            the number of points per chunk
+        workers: int, optional
+            the number of worker processes (default: the number of CPUs)
+        transport: {"shared_memory", "memmap"}, optional
+            how the points and results are shared with the workers
+        out: numpy.array or str, optional
+            an array (e.g. an np.memmap) or the path of a .npy file to create,
+            into which the Jacobians are written chunk by chunk
+        values: numpy.array or str, optional
+            where to write the function values, like out
+        layout: {"point", "output"}, optional (default = "point")
+            point-major (N, m, n) or output-major (m, n, N) results
+
+        Returns
+        ------
+        func_evals: numpy.array
+            array of shape (N, m), the function values at each point, or (m, N)
+        Dpf: numpy.array
+            array of shape (N, m, n), the Jacobian at each point, or (m, n, N)
+
+        Examples
+        --------
+        >>> ad = AD({'x': 1, 'y': 2}, ['x * y', 'x + y'], mode='f')
+        >>> func_evals, Dpf = ad.evaluate_many([[1, 2], [3, 4]], workers=1)
+        >>> func_evals
+        array([[ 2.,  3.],
+               [12.,  7.]])
+        """
+        return batchAD.evaluate_many(list(self.var_dict), self.func_list, points,
+                                     chunk_size, workers, transport, out, values, layout)
+
+    def iter_jacobians(self, chunks, prefetch = 0, workers = 1):
+        """Evaluates the function(s) and their Jacobians over a stream of point chunks.
+
+        A block of results is yielded per chunk, so streams that do not fit
+        in memory can be differentiated (see batchAD.iter_jacobians).
+
+        Parameters
+        ------
+        chunks: iterable
+            chunks of points, each an array of shape (k, n) with one column
+            per variable, in the order of var_dict, or a dict of k values per variable
+        prefetch: int, optional (default = 0)
+            the number of chunks read ahead by a background thread
+        workers: int, optional (default = 1)
+            the number of worker processes each chunk is split over
+
+        Yields
+        ------
+        func_evals: numpy.array
+            array of shape (k, m), the function values at the points of a chunk
+        Dpf: numpy.array
+            array of shape (k, m, n), the Jacobians at the points of a chunk
+        """
+        return batchAD.iter_jacobians(list(self.var_dict), self.func_list, chunks, prefetch, workers)
+
+    async def ajacobian(self, points, executor = "thread", max_concurrency = None):
+        """Evaluates the function(s) and their Jacobians without blocking the event loop.
+
+        The work runs in a thread or process pool (see asyncAD.AsyncAD), so
+        many evaluations can overlap with I/O. Cancelling the awaiting task
+        drops the chunks of a batch not started yet.
+
+        Parameters
+        ------
+        points: dict, sequence or numpy.array
+            one point, or a batch as an array of shape (N, n) with one column
+            per variable in the order of var_dict, or a dict of N values per variable
+        executor: {"thread", "process"}, optional (default = "thread")
+            where the evaluations run
+        max_concurrency: int, optional
+            the largest number of chunks in flight across the concurrent
+            calls of this AD instance with the same settings
+
+        Returns
+        ------
+        func_evals: numpy.array
+            shape (m,) for one point, (N, m) for a batch
+        Dpf: numpy.array
+            shape (m, n) for one point, (N, m, n) for a batch
+
+        Examples
+        --------
+        >>> import asyncio
+        >>> ad = AD({'x': 1, 'y': 2}, ['x * y'], mode='f')
+        >>> asyncio.run(ad.ajacobian([3, 4]))[1]
+        array([[4., 3.]])
+        """
+        key = (executor, max_concurrency)
+        if key not in self._async:
+            self._async[key] = AsyncAD(list(self.var_dict), self.func_list, executor,
+                                       max_concurrency=max_concurrency)
+        return await self._async[key].jacobian(points)
+
+    @staticmethod
+    def compile(var_names, func_list, sparse = False):
+        """Parses the function(s) once and returns a reusable Jacobian evaluator.
+
+        Parameters
+        ------
+        var_names: list of str or dict
+            names of the independent variables (the keys are used if a dict is given)
+        func_list: str or list of str
+            (a list of) function(s) encoded as string(s)
+        sparse: bool, optional (default = False)
+            if True, return a SparseAD evaluator that detects the sparsity
+            pattern and computes compressed products by graph coloring
+
+        Returns
+        ------
+        CompiledAD or SparseAD
+            a callable mapping a point to ``(func_evals, Dpf)``
+
+        Examples
+        --------
+        >>> f = AD.compile(['x', 'y'], ['x**2 + y**2', 'exp(x + y)'])
+        >>> func_evals, Dpf = f([1, 1])
+        """
+        if sparse:
+            return SparseAD(var_names, func_list)
+        return CompiledAD(var_names, func_list)
+
+    @staticmethod
+    def register(name, value, derivative, **kwargs):
+        """Registers a custom primitive with a hand-written derivative.
+
+        The function can then be used by name in the function strings of
+        ForwardAD, ReverseAD, AD and the compiled evaluators, where it is a
+        single graph node. See primitives.register for the optional
+        vectorized kernels, Taylor rule and domain.
+
+        Parameters
+        ------
+        name: str
+            the name of the function in function strings
+        value: callable
+            ``value(x, *params)``, the value at a float
+        derivative: callable
+            ``derivative(x, y, *params)``, the derivative at x given the value y
+
+        Returns
+        ------
+        Primitive
+            the registered primitive
+
+        Examples
+        --------
+        >>> p = AD.register('softsign', lambda x: x / (1 + abs(x)), lambda x, y: 1 / (1 + abs(x)) ** 2)
+        >>> AD({'x': 1.0}, 'softsign(2 * x)', mode='r').Dpf
+        array([[0.22222222]])
+        """
+        return register(name, value, derivative, **kwargs)
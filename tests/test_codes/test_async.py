@@ -0,0 +1,108 @@
+import sys
+sys.path.append("./src/")
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from team20ad import batchAD
+from team20ad.asyncAD import *
+from team20ad.compiledAD import CompiledAD
+from team20ad.wrapperAD import AD
+
+
+names = ['x', 'y']
+funcs = ['x * y', 'sin(x) + y ** 2']
+
+
+class TestAsyncAD:
+
+    def test_jacobian(self):
+        X = np.random.default_rng(0).uniform(-1, 1, (50, 2))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+
+        async def main():
+            f = AsyncAD(names, funcs, chunk_size = 16)
+            g = AsyncAD(names, funcs, executor = 'process', workers = 2)
+            return await asyncio.gather(f.jacobian(X), f.jacobian({'x': 1, 'y': 2}),
+                                        g.jacobian(X[:3]), f.jacobian(np.zeros((0, 2))))
+
+        (F, J), (f1, J1), (F3, J3), (F0, J0) = asyncio.run(main())
+        assert np.allclose(F, ref[0]) and np.allclose(J, ref[1])
+        assert f1.shape == (2,) and np.allclose(J1, [[2, 1], [np.cos(1), 4]])
+        assert np.allclose(J3, ref[1][:3])
+        assert F0.shape == (0, 2) and J0.shape == (0, 2, 2)
+
+        with pytest.raises(ValueError):
+            AsyncAD(names, funcs, executor = 'gpu')
+        with pytest.raises(ValueError):
+            AsyncAD(names, funcs, max_concurrency = 0)
+
+    def test_limit_and_cancel(self, monkeypatch):
+        # the chunks wait at a gate, so the ones running at once can be counted
+        running, peak, started = [0], [0], []
+        lock, gate = threading.Lock(), threading.Event()
+        entered, left = threading.Semaphore(0), threading.Semaphore(0)
+        evaluate_chunk = batchAD._evaluate_chunk
+
+        def gated_chunk(var_names, func_list, points):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                started.append(len(points))
+            entered.release()
+            gate.wait()
+            with lock:
+                running[0] -= 1
+            left.release()
+            return evaluate_chunk(var_names, func_list, points)
+        monkeypatch.setattr(batchAD, '_evaluate_chunk', gated_chunk)
+
+        async def wait_for(semaphore):
+            # in a helper thread, so the event loop keeps running
+            loop = asyncio.get_running_loop()
+            assert await loop.run_in_executor(None, lambda: semaphore.acquire(timeout = 10))
+
+        X = np.zeros((40, 2))
+
+        async def limited():
+            f = AsyncAD(names, funcs, workers = 8, max_concurrency = 2, chunk_size = 5)
+            task = asyncio.ensure_future(f.jacobian(X))
+            await wait_for(entered)
+            await wait_for(entered)
+            assert len(started) == 2 and not task.done()
+            gate.set()
+            return await task
+
+        F, J = asyncio.run(limited())
+        assert peak[0] == 2 and len(started) == 8
+        assert J.shape == (40, 2, 2)
+
+        del started[:]
+        gate.clear()
+        entered, left = threading.Semaphore(0), threading.Semaphore(0)
+
+        async def cancelled():
+            f = AsyncAD(names, funcs, workers = 8, max_concurrency = 1, chunk_size = 5)
+            task = asyncio.ensure_future(f.jacobian(X))
+            await wait_for(entered)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            gate.set()
+            await wait_for(left)
+
+        asyncio.run(cancelled())
+        # the running chunk completes, the ones waiting for the limit are dropped
+        assert started == [5]
+
+    def test_AD(self):
+        ad = AD({'x': 1, 'y': 2}, funcs, mode = 'r')
+
+        async def main():
+            return await asyncio.gather(*(ad.ajacobian([x, 1.0], max_concurrency = 2) for x in range(5)))
+
+        results = asyncio.run(main())
+        assert np.allclose([J[0] for F, J in results], [[1, x] for x in range(5)])
+        assert len(ad._async) == 1
@@ -0,0 +1,217 @@
+import sys
+sys.path.append("./src/")
+
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from team20ad import batchAD
+from team20ad.batchAD import *
+from team20ad.compiledAD import CompiledAD
+from team20ad.wrapperAD import AD
+
+
+names = ['x', 'y', 'z']
+funcs = ['x * y + sin(z)', 'exp(x) / (1 + y ** 2)', 'logsumexp(x, z)']
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Records the arguments and futures of the chunks submitted to the pool of two workers."""
+    calls = []
+    pool = batchAD._pool(2)
+    submit = pool.submit
+
+    def recording_submit(fn, *args):
+        future = submit(fn, *args)
+        calls.append((args, future))
+        return future
+    monkeypatch.setattr(pool, 'submit', recording_submit)
+    return calls
+
+
+class TestBatchAD:
+
+    def test_chunks(self):
+        assert chunk_bounds(10, 4) == [(0, 4), (4, 8), (8, 10)]
+        assert chunk_bounds(0, 4) == []
+        assert chunk_bounds(10 ** 5, workers = 2) == [(0, 12500), (12500, 25000)] + \
+            [(k * 12500, (k + 1) * 12500) for k in range(2, 8)]
+        assert len(chunk_bounds(100, workers = 8)) == 1
+        with pytest.raises(ValueError):
+            chunk_bounds(10, 0)
+
+    def test_evaluate_many(self):
+        X = np.random.default_rng(0).uniform(-1, 1, (500, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        for workers, chunk_size in ((1, None), (2, 64), (2, None)):
+            func_evals, Dpf = evaluate_many(names, funcs, X, chunk_size, workers)
+            assert func_evals.shape == (500, 3) and Dpf.shape == (500, 3, 3)
+            assert np.allclose(func_evals, ref[0]) and np.allclose(Dpf, ref[1])
+
+        func_evals, Dpf = evaluate_many({'x': 0, 'y': 0, 'z': 0}, 'x * y',
+                                        {'x': [1, 2], 'y': [3, 4], 'z': [0, 0]}, workers = 1)
+        assert np.allclose(Dpf[:, 0], [[3, 1, 0], [4, 2, 0]])
+        with pytest.raises(ValueError):
+            evaluate_many(names, funcs, np.zeros((4, 2)))
+
+    def test_broken_pool(self):
+        X = np.random.default_rng(4).uniform(-1, 1, (400, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        pool = batchAD._pool(2)
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+        func_evals, Dpf = evaluate_many(names, funcs, X, 100, 2)
+        assert np.allclose(Dpf, ref[1])
+        assert batchAD._POOLS[2] is not pool
+
+    def test_evaluator_cache(self, monkeypatch):
+        monkeypatch.setattr(batchAD, 'MAX_EVALUATORS', 2)
+        monkeypatch.setattr(batchAD, '_EVALUATORS', batchAD.OrderedDict())
+        first = batchAD._evaluator(['x'], ['x'])
+        batchAD._evaluator(['x'], ['2 * x'])
+        assert batchAD._evaluator(['x'], ['x']) is first
+        batchAD._evaluator(['x'], ['3 * x'])
+        assert list(batchAD._EVALUATORS) == [(('x',), ('x',)), (('x',), ('3 * x',))]
+
+    def test_transport(self, submitted):
+        X = np.random.default_rng(2).uniform(-1, 1, (400, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        for transport in TRANSPORTS:
+            func_evals, Dpf = evaluate_many(names, funcs, X, 50, 2, transport)
+            assert np.allclose(func_evals, ref[0]) and np.allclose(Dpf, ref[1])
+        with pytest.raises(ValueError):
+            evaluate_many(names, funcs, X, transport = 'pickle')
+
+        # only handles and row ranges are sent to the workers
+        submitted.clear()
+        evaluate_many(names, funcs, X, 100, 2)
+        assert len(submitted) == 4
+        assert all(not isinstance(arg, np.ndarray) for args, _ in submitted for arg in args)
+
+    def test_failed_chunk(self, submitted, monkeypatch):
+        # the transport is only closed once no chunk is running anymore
+        done_at_close = []
+        close = batchAD._Transport.close
+
+        def recording_close(self):
+            done_at_close.append(all(future.done() for _, future in submitted))
+            close(self)
+        monkeypatch.setattr(batchAD._Transport, 'close', recording_close)
+
+        X = np.random.default_rng(7).uniform(1, 2, (800, 3))
+        X[150, 0] = -1.0
+        for transport in TRANSPORTS:
+            with pytest.raises(ValueError):
+                evaluate_many(names, ['log(x) * y'], X, 50, 2, transport)
+        assert done_at_close == [True, True]
+        func_evals, Dpf = evaluate_many(names, ['log(x) * y'], X[200:], 50, 2)
+        assert np.allclose(Dpf[:, 0, 1], np.log(X[200:, 0]))
+
+    def test_AD(self):
+        ad = AD({'x': 1, 'y': 2, 'z': 3}, funcs, mode = 'r')
+        X = np.random.default_rng(1).uniform(-1, 1, (300, 3))
+        func_evals, Dpf = ad.evaluate_many(X, chunk_size = 100, workers = 2)
+        assert np.allclose(Dpf[7], AD(dict(zip(names, X[7])), funcs, mode = 'f').Dpf)
+        assert np.allclose(func_evals[7], ad.res.replay(X[7])[0])
+
+
+class TestOutput:
+
+    def test_layouts(self):
+        X = np.random.default_rng(4).uniform(-1, 1, (300, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        for workers in (1, 2):
+            func_evals, Dpf = evaluate_many(names, funcs, X, 64, workers, layout = 'output')
+            assert func_evals.shape == (3, 300) and Dpf.shape == (3, 3, 300)
+            assert np.allclose(func_evals, ref[0].T)
+            assert np.allclose(Dpf, ref[1].transpose(1, 2, 0))
+        with pytest.raises(ValueError):
+            evaluate_many(names, funcs, X, layout = 'column')
+        with pytest.raises(ValueError):
+            evaluate_many(names, funcs, X, out = np.zeros((300, 3)))
+
+    def test_npy(self, tmp_path):
+        X = np.random.default_rng(5).uniform(-1, 1, (300, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        for layout, workers in (('point', 1), ('output', 2)):
+            path = tmp_path / f"J_{layout}.npy"
+            evaluate_many(names, funcs, X, 64, workers, out = str(path),
+                          values = tmp_path / "F.npy", layout = layout)
+            Dpf = np.load(path, mmap_mode = 'r')
+            expected = ref[1] if layout == 'point' else ref[1].transpose(1, 2, 0)
+            assert isinstance(Dpf, np.memmap) and np.allclose(Dpf, expected)
+        assert np.allclose(np.load(tmp_path / "F.npy"), ref[0].T)
+
+    def test_memmap(self, tmp_path, submitted):
+        X = np.random.default_rng(6).uniform(-1, 1, (400, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        out = np.memmap(tmp_path / "J.bin", dtype = float, mode = 'w+', shape = (400, 3, 3))
+        F = np.zeros((400, 3))
+
+        # workers write into the caller's file directly
+        func_evals, Dpf = evaluate_many(names, funcs, X, 100, 2, out = out, values = F)
+        assert Dpf is out and func_evals is F
+        assert submitted[0][0][2][2] == ('memmap', out.filename, (400, 3, 3), 0)
+        assert np.allclose(F, ref[0])
+        assert np.allclose(np.fromfile(tmp_path / "J.bin").reshape(400, 3, 3), ref[1])
+
+        ad = AD({'x': 1, 'y': 2, 'z': 3}, funcs, mode = 'f')
+        J = np.zeros((3, 3, 400))
+        ad.evaluate_many(X, workers = 1, out = J, layout = 'output')
+        assert np.allclose(J[1, 0], ref[1][:, 1, 0])
+
+
+class TestStream:
+
+    def test_iter_jacobians(self):
+        X = np.random.default_rng(3).uniform(-1, 1, (250, 3))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+        for prefetch in (0, 1, 3):
+            chunks = (X[i:i + 100] for i in range(0, 250, 100))
+            blocks = list(iter_jacobians(names, funcs, chunks, prefetch))
+            assert [len(F) for F, J in blocks] == [100, 100, 50]
+            assert np.allclose(np.concatenate([J for F, J in blocks]), ref[1])
+            assert np.allclose(np.concatenate([F for F, J in blocks]), ref[0])
+
+        ad = AD({'x': 1, 'y': 2, 'z': 3}, funcs, mode = 'f')
+        blocks = list(ad.iter_jacobians([X[:10], dict(zip(names, X[10:20].T))], workers = 2))
+        assert np.allclose(blocks[1][1], ref[1][10:20])
+
+        with pytest.raises(ValueError):
+            next(iter_jacobians(names, funcs, [X], prefetch = -1))
+
+    def test_prefetch(self):
+        read, reading = [], [threading.Event() for _ in range(100)]
+
+        def chunks():
+            for i in range(100):
+                read.append(i)
+                reading[i].set()
+                yield np.full((1, 3), float(i))
+
+        f = CompiledAD(names, funcs)
+        stream = iter_jacobians(names, funcs, chunks(), prefetch = 2)
+        func_evals, Dpf = next(stream)
+        assert np.allclose(Dpf[0], f([0, 0, 0])[1])
+        # the reader fills the queue of depth 2 and then holds chunk 3
+        # until a chunk is taken from the queue
+        assert reading[3].wait(10)
+        assert read == [0, 1, 2, 3]
+        func_evals, Dpf = next(stream)
+        assert np.allclose(Dpf[0], f([1, 1, 1])[1])
+        assert reading[4].wait(10)
+        assert read == [0, 1, 2, 3, 4]
+        stream.close()
+
+        def failing():
+            yield X0
+            raise IOError("broken stream")
+
+        X0 = np.zeros((2, 3))
+        stream = iter_jacobians(names, funcs, failing(), prefetch = 1)
+        next(stream)
+        with pytest.raises(IOError):
+            next(stream)
@@ -0,0 +1,188 @@
+import sys
+sys.path.append("./src/")
+
+import numpy as np
+import pytest
+from team20ad.compiledAD import *
+from team20ad.forwardAD import ForwardAD
+from team20ad.reverseAD import ReverseAD
+from team20ad.wrapperAD import AD
+
+
+class TestCompiledAD:
+
+    def test_matches_forward(self):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
+        f = AD.compile(vars, fcts)
+        func_evals, Dpf = f(vars)
+        z = ForwardAD(vars, fcts)
+
+        assert np.allclose(func_evals, z.func_evals)
+        assert np.allclose(Dpf, z.Dpf)
+
+    def test_reuse(self):
+        f = CompiledAD(['x', 'y'], ['x**2 + y**2', 'exp(x + y)'])
+        for x, y in [(1, 1), (0, 2), (-1.5, 0.25)]:
+            func_evals, Dpf = f([x, y])
+            assert np.allclose(func_evals, [x**2 + y**2, np.exp(x + y)])
+            assert np.allclose(Dpf, [[2 * x, 2 * y], [np.exp(x + y)] * 2])
+
+    def test_functions(self):
+        f = CompiledAD(['x'], ['log(x, 2)', 'logistic(x, L=2, k=3)', '-x + +x', '5', '2 ** x'])
+        func_evals, Dpf = f([1.0])
+        assert np.allclose(func_evals, [0, 2 / (1 + np.exp(-3)), 0, 5, 2])
+        s = 2 / (1 + np.exp(-3))
+        assert np.allclose(Dpf[:, 0], [1 / np.log(2), 3 * s * (1 - s / 2), 0, 0, 2 * np.log(2)])
+
+    def test_abs(self):
+        fcts = ['abs(x - y) * y', 'abs(x) + x * y', 'abs(sin(y))']
+        f = CompiledAD(['x', 'y'], fcts)
+        points = [(-2.0, 3.0), (1.5, -0.5), (4.0, 1.0)]
+        for x, y in points:
+            vars = {'x': x, 'y': y}
+            func_evals, Dpf = f(vars)
+            z, r = ForwardAD(vars, fcts), ReverseAD(vars, fcts)
+            assert np.allclose(func_evals, z.func_evals)
+            assert np.allclose(Dpf, z.Dpf)
+            assert np.allclose(Dpf, r.Dpf)
+            assert np.allclose(f.vjp(vars, [1, 1, 1])[1], Dpf.sum(axis=0))
+
+        func_evals, Dpf = f.evaluate_batch(points)
+        for k, point in enumerate(points):
+            assert np.allclose(Dpf[k], f(point)[1])
+        ad = AD({'x': -2.0, 'y': 3.0}, fcts)
+        assert np.allclose(ad.Dpf, f([-2.0, 3.0])[1])
+        assert np.allclose(ad.evaluate_many(points, workers=1)[1], Dpf)
+
+    def test_shared_subexpressions(self):
+        f = CompiledAD(['x', 'y'], ['exp(x + y) * 2', 'exp(x + y) + 1'])
+        ops = [op for op, _, _ in f.graph.nodes]
+        assert ops.count('exp') == 1
+        assert ops.count('add') == 2
+
+    def test_errors(self):
+        with pytest.raises(TypeError):
+            CompiledAD('x', 'x')
+        with pytest.raises(TypeError):
+            CompiledAD(['x'], [1])
+        with pytest.raises(NameError):
+            CompiledAD(['x'], 'x + z')
+        with pytest.raises(NameError):
+            CompiledAD(['x'], 'gamma(x)')
+        with pytest.raises(ValueError):
+            CompiledAD(['x'], 'x if x else 1')
+        with pytest.raises(ValueError):
+            CompiledAD(['x'], 'x +')
+
+        f = CompiledAD(['x', 'y'], 'x * y')
+        with pytest.raises(ValueError):
+            f({'x': 1})
+        with pytest.raises(ValueError):
+            f([1, 2, 3])
+        assert isinstance(repr(f), str)
+
+
+class TestBatch:
+
+    def test_matches_pointwise(self):
+        f = CompiledAD(['x', 'y'], ['x**y + sin(x) * y', 'log(x) / sqrt(y) - 3', 'tanh(x - y) ** 2', '4'])
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0.1, 2, size=(50, 2))
+        func_evals, Dpf = f.evaluate_batch(X)
+
+        assert func_evals.shape == (50, 4)
+        assert Dpf.shape == (50, 4, 2)
+        for k in range(50):
+            v, d = f(X[k])
+            assert np.allclose(func_evals[k], v)
+            assert np.allclose(Dpf[k], d)
+
+    def test_linear_and_dict(self):
+        f = CompiledAD(['x', 'y'], ['x', '2 * x - y'])
+        func_evals, Dpf = f.evaluate_batch({'x': [1, 2, 3], 'y': [0, 0, 1]})
+        assert np.allclose(func_evals, [[1, 2], [2, 4], [3, 5]])
+        assert np.allclose(Dpf, [[[1, 0], [2, -1]]] * 3)
+
+    def test_errors(self):
+        f = CompiledAD(['x', 'y'], 'sqrt(x) * y')
+        with pytest.raises(ValueError):
+            f.evaluate_batch(np.ones((3, 3)))
+        with pytest.raises(ValueError):
+            f.evaluate_batch({'x': [1, 2]})
+        with pytest.raises(ValueError):
+            f.evaluate_batch([[1, 1], [-1, 1]])
+
+
+class TestProducts:
+
+    def test_jvp_vjp(self):
+        f = CompiledAD(['x', 'y', 'z'], ['x * y * sin(z)', 'exp(x - z) / y', 'log(y, 3) + 2', '1'])
+        rng = np.random.default_rng(1)
+        for k in range(3):
+            point = rng.uniform(0.5, 2, size=3)
+            v, u = rng.normal(size=3), rng.normal(size=4)
+            func_evals, Dpf = f(point)
+
+            vals, Jv = f.jvp(point, v)
+            assert np.allclose(vals, func_evals)
+            assert np.allclose(Jv, Dpf @ v)
+
+            vals, uJ = f.vjp(point, u)
+            assert np.allclose(vals, func_evals)
+            assert np.allclose(uJ, u @ Dpf)
+
+            # the tape is recorded once and replayed afterwards
+            if k == 0:
+                recorded = f._tape[0]
+            assert f._tape[0] is recorded
+
+    def test_errors(self):
+        f = CompiledAD(['x', 'y'], ['x * y', 'x + y'])
+        with pytest.raises(ValueError):
+            f.jvp([1, 2], [1])
+        with pytest.raises(ValueError):
+            f.vjp([1, 2], [1, 2, 3])
+
+
+class TestHessian:
+
+    def test_hessian(self):
+        f = CompiledAD(['x', 'y', 'z'], ['x**2 * y + exp(x * z) - sin(y) / z', 'log(x) * tanh(y) + arctan(z)',
+                                         'x ** y + 2 ** z - sqrt(x * y)', '3 * x - 1'])
+        point = np.array([0.7, 1.3, 0.4])
+        h = 1e-5
+        for j in range(4):
+            H = f.hessian(point, j)
+            # central differences of the exact gradients
+            fd = np.array([(f(point + h * e)[1][j] - f(point - h * e)[1][j]) / (2 * h) for e in np.eye(3)])
+            assert np.allclose(H, fd, atol=1e-6)
+            assert np.allclose(H, H.T)
+
+            v = np.array([1.0, -2.0, 0.5])
+            grad, Hv = f.hvp(point, v, j)
+            assert np.allclose(grad, f(point)[1][j])
+            assert np.allclose(Hv, H @ v)
+
+    def test_constant_and_errors(self):
+        f = CompiledAD(['x', 'y'], ['x * y', '5'])
+        assert np.array_equal(f.hessian([1, 2], 1), np.zeros((2, 2)))
+        assert np.array_equal(f.hvp([1, 2], [1, 1], 1)[1], np.zeros(2))
+        assert np.array_equal(f.hessian([1, 2]), [[0, 1], [1, 0]])
+        with pytest.raises(IndexError):
+            f.hessian([1, 2], 2)
+        with pytest.raises(ValueError):
+            f.hvp([1, 2], [1])
+
+
+def test_compiled_fused():
+    f = CompiledAD(['x', 'y'], ['logsumexp(x, y, 0.5) + softplus(x)', 'sumsq(x, y) * y'])
+    g = CompiledAD(['x', 'y'], ['log(exp(x) + exp(y) + exp(0.5)) + log(1 + exp(x))', '(x**2 + y**2) * y'])
+    assert len(f.graph) < len(g.graph)
+    for point in ([0.3, -0.2], [1.5, 2.0]):
+        vals, jac = f(point)
+        assert np.allclose(vals, g(point)[0]) and np.allclose(jac, g(point)[1])
+        assert np.allclose(f.vjp(point, [1.0, 1.0])[1], jac.sum(axis=0))
+        assert np.allclose(f.hessian(point, 1), g.hessian(point, 1))
+    vals, jac = f.evaluate_batch(np.array([[0.3, -0.2], [1.5, 2.0]]))
+    assert np.allclose(jac[1], g([1.5, 2.0])[1])
@@ -0,0 +1,136 @@
+import sys
+sys.path.append("./src/")
+
+import numpy as np
+import pytest
+from team20ad.compiledAD import CompiledAD, Graph
+from team20ad import costModel
+from team20ad.costModel import *
+from team20ad.mixedAD import MixedAD
+from team20ad.wrapperAD import AD
+
+
+class TestCostModel:
+
+    def test_counts(self):
+        graph = Graph(['x', 'y', 'z'], ['x * y', 'exp(x) + z', '2'])
+        model = CostModel(graph)
+        assert model.num_ops == 3
+        assert model.output_ops == [1, 2, 0]
+        assert model.input_ops == [3, 1, 1]
+        assert model.nnz == 4
+        assert model.forward_colors == 2 and model.reverse_colors == 2
+        masks = output_masks(graph)
+        assert masks[graph.outputs[0]] == 1 and masks[0] == 3
+
+    def test_choose(self):
+        costs = {'a_f': 1.0, 'b_f': 1.0, 'a_r': 1.0, 'b_r': 1.0, 'c': 0.0}
+        # one function of many variables
+        names = [f'x{i}' for i in range(10)]
+        assert CostModel(Graph(names, [' + '.join(names)]), costs).choose() == 'reverse'
+        # many functions of one variable
+        assert CostModel(Graph(['x'], [f'x ** {i}' for i in range(10)]), costs).choose() == 'forward'
+        # diagonal Jacobian: one color
+        model = CostModel(Graph(names, [f'sin({x})' for x in names]), costs)
+        assert model.forward_colors == 1 and model.choose() == 'sparse'
+        # one dense column and one dense row
+        funcs = [f'sin(x0) * {i}' for i in range(1, 10)] + [' + '.join(names)]
+        model = CostModel(Graph(names, funcs), costs)
+        assert model.mixed_columns == [0] and model.choose() == 'mixed'
+        estimate = model.estimate()
+        assert estimate['mixed'] < min(estimate['forward'], estimate['reverse'])
+
+    def test_default_costs(self):
+        names = [f'x{i}' for i in range(50)]
+        gradient = [' + '.join(f'sin({a}) * {b}' for a, b in zip(names, names[1:]))]
+        assert CostModel(Graph(names, gradient)).choose() == 'reverse'
+        assert CostModel(Graph(['x'], [f'x ** {i}' for i in range(10)])).choose() == 'forward'
+
+    def test_split(self):
+        # the incremental split matches pricing every split from scratch
+        names = [f'x{i}' for i in range(6)]
+        funcs = ['sin(x0) * x1', 'x0 + x2 * x3', 'exp(x4)', 'x0 * x5 + x1', '2']
+        costs = {'a_f': 1.0, 'b_f': 0.5, 'a_r': 1.5, 'b_r': 0.7, 'c': 0.0}
+        model = CostModel(Graph(names, funcs), costs)
+        ins, outs = input_masks(model.graph), output_masks(model.graph)
+        order = sorted(range(6), key=lambda k: -len(model._rows_of[k]))
+        best = float('inf')
+        for size in range(1, 6):
+            columns = sum(1 << k for k in order[:size])
+            rows = {j for k in order[size:] for j in model._rows_of[k]}
+            mask = sum(1 << j for j in rows)
+            cost = (sum(1 for i in model._ops if ins[i] & columns) * (1.0 + 0.5 * size)
+                    + sum(1 for i in model._ops if outs[i] & mask) * (1.5 + 0.7 * len(rows)))
+            if cost < best:
+                best, columns_best = cost, sorted(order[:size])
+        assert model.mixed_columns == columns_best
+        assert np.isclose(model.estimate()['mixed'], best)
+
+    def test_selection_overhead(self, monkeypatch):
+        # the colorings and the elimination order are not computed when the
+        # dense modes are already cheaper
+        calls = []
+        monkeypatch.setattr(costModel, 'greedy_coloring', lambda *args: calls.append('coloring'))
+        monkeypatch.setattr(costModel, 'markowitz_order', lambda *args: calls.append('markowitz'))
+        rng = np.random.default_rng(0)
+        names = [f'x{i}' for i in range(100)]
+        funcs = [' + '.join(f'sin({names[rng.integers(100)]}) * {names[rng.integers(100)]}'
+                            for _ in range(60)) for _ in range(20)]
+        model = CostModel(Graph(names, funcs))
+        assert model.choose() in ('forward', 'reverse')
+        assert calls == []
+        assert AD(dict.fromkeys(names, 0.5), funcs).estimates == model.estimate()
+        assert calls == []
+
+    def test_calibrate(self, tmp_path):
+        path = str(tmp_path / 'costs.json')
+        costs = calibrate(path, repeat = 1)
+        assert set(costs) == set(DEFAULT_COSTS)
+        assert all(v >= 0 for k, v in costs.items() if k.startswith('b') or k == 'c')
+        assert calibrate(path) == costs
+        assert calibrate() == costs
+        # another path is written with the constants of the session
+        other = tmp_path / 'other.json'
+        assert calibrate(str(other)) == costs
+        assert other.exists()
+        other = tmp_path / 'given.json'
+        other.write_text('{"a_f": 1.0}')
+        assert calibrate(str(other)) == {'a_f': 1.0}
+
+
+class TestMixedAD:
+
+    def test_mixed(self):
+        names = ['x', 'y', 'z', 'w']
+        funcs = ['x * y + sin(z)', 'x ** 2', 'exp(x) * w', 'z * w', '3']
+        x = [0.3, 0.4, 0.5, 0.6]
+        dense = CompiledAD(names, funcs)(x)
+        for columns in (None, [], [0], [1, 3], [0, 1, 2, 3]):
+            f = MixedAD(names, funcs, columns = columns)
+            func_evals, J = f(x)
+            assert np.allclose(func_evals, dense[0])
+            assert np.allclose(J, dense[1])
+        assert MixedAD(names, funcs, columns = [0]).rows == [0, 2, 3]
+        assert isinstance(repr(f), str)
+        with pytest.raises(ValueError):
+            MixedAD(names, funcs, columns = [4])
+
+    def test_AD_modes(self, capfd):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', 'sqrt(x)/3']
+        expected = AD(vars, fcts, mode = 'f').Dpf
+        for mode in ('s', 'sparse', 'm', 'mixed'):
+            z = AD(vars, fcts, mode = mode)
+            assert np.allclose(z.Dpf, expected)
+            z()
+            out, err = capfd.readouterr()
+            assert 'Derivatives' in out
+
+        z = AD(vars, fcts)
+        assert z.mode == min(z.estimates, key=z.estimates.get)
+        AD(vars, fcts, calibrate = True)
+        # not parsable into a graph: count heuristic
+        z = AD({'x': 1, 'y': 2}, 'x if y else 1')
+        assert z.mode == 'reverse' and z.estimates is None
+        out, err = capfd.readouterr()
+        assert out == ''
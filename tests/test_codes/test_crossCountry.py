@@ -0,0 +1,64 @@
+import sys
+sys.path.append("./src/")
+
+import numpy as np
+import pytest
+from team20ad.compiledAD import Graph
+from team20ad.costModel import CostModel
+from team20ad.crossCountryAD import *
+from team20ad.reverseAD import ReverseAD
+from team20ad.wrapperAD import AD
+
+
+def bottleneck(n):
+    # n inputs reach n outputs through one intermediate
+    names = [f'x{i}' for i in range(n)]
+    funcs = [f'{i + 1} * sin({" + ".join(names)})' for i in range(n)]
+    return names, funcs
+
+
+class TestCrossCountryAD:
+
+    def test_jacobian(self):
+        vars = {'x': 0.3, 'y': 0.7, 'z': 1.2}
+        fcts = ['x * y * z + sin(x * y)', 'x ** 2', 'exp(x) * z + x * x',
+                'logsumexp(x, y, z)', '3', 'y']
+        ad = CrossCountryAD(vars, fcts)
+        ref = ReverseAD(vars, fcts)
+        assert np.allclose(ad.Dpf, ref.Dpf)
+        assert ad.func_evals == ref.func_evals
+
+        func_evals, Dpf = ad.replay({'x': 1, 'y': 2, 'z': 3})
+        assert np.allclose(Dpf, ref.replay([1, 2, 3])[1])
+        assert ad.var_dict == {'x': 1, 'y': 2, 'z': 3}
+
+        with pytest.raises(TypeError):
+            CrossCountryAD([1], 'x')
+        with pytest.raises(TypeError):
+            CrossCountryAD({'x': 1}, [1])
+
+    def test_markowitz(self):
+        names, funcs = bottleneck(10)
+        ad = CrossCountryAD(dict.fromkeys(names, 0.1), funcs)
+        # forward or reverse mode would propagate 10 components through every op
+        assert ad.num_mults < 10 * len(ad.tape)
+        s = np.cos(1.0)
+        assert np.allclose(ad.Dpf, np.outer(np.arange(1, 11) * s, np.ones(10)))
+
+        # a chain is eliminated at no cost beyond one multiply per vertex
+        order, mults = markowitz_order([[], [0], [1], [2]], [[1], [2], [3], []], [1, 2])
+        assert sorted(order) == [1, 2] and mults == 2
+
+    def test_AD_mode(self, capfd):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', 'sqrt(x)/3']
+        z = AD(vars, fcts, mode = 'c')
+        assert isinstance(z.res, CrossCountryAD)
+        assert np.allclose(z.Dpf, AD(vars, fcts, mode = 'r').Dpf)
+        z()
+        out, err = capfd.readouterr()
+        assert 'Cross-country AD' in out
+
+        names, funcs = bottleneck(20)
+        costs = {'a_f': 1.0, 'b_f': 1.0, 'a_r': 1.0, 'b_r': 1.0, 'c': 0.0, 'x': 1.0}
+        assert CostModel(Graph(names, funcs), costs).choose() == 'cross'
@@ -28,6 +28,14 @@ class TestDualNumber:
         assert y.dual == 2
 
 
+    def test_vector_dual(self):
+        x = DualNumber(3, np.array([1., 0.]))
+        y = DualNumber(2, np.array([0., 1.]))
+        z = sin(x * y) / y
+
+        assert z.real == np.sin(6) / 2
+        assert np.allclose(z.dual, [np.cos(6), (3 * np.cos(6) * 2 - np.sin(6)) / 4])
+
     def test_mul_rmul(self):
         x = DualNumber(3, 1)
         y = x * 3
@@ -200,3 +208,33 @@ class TestDualNumber:
         assert y.real == 3
         assert y.dual == 1
 
+
+
+def test_batched_dual():
+    x = DualNumber(np.array([1., 2., 4.]), np.array([[1.], [0.]]))
+    y = DualNumber(np.array([2., 2., 0.5]), np.array([[0.], [1.]]))
+    z = x ** y + exp(x) / y
+
+    assert np.allclose(z.real, [1 + np.e / 2, 4 + np.exp(2) / 2, 2 + np.exp(4) * 2])
+    assert z.dual.shape == (2, 3)
+    assert np.allclose(z.dual[0], [2 + np.e / 2, 4 + np.exp(2) / 2, 0.5 * 4 ** -0.5 + np.exp(4) * 2])
+    assert np.allclose(z.dual[1], [0 - np.e / 4, np.log(2) * 4 - np.exp(2) / 4, np.log(4) * 2 - np.exp(4) * 4])
+
+    with pytest.raises(ZeroDivisionError):
+        x / DualNumber(np.array([1., 0., 1.]), 1)
+    with pytest.raises(ValueError):
+        log(DualNumber(np.array([1., -1.])))
+
+
+def test_compact_layout():
+    x = DualNumber(2.0, 1.0)
+    assert not hasattr(x, '__dict__')
+    with pytest.raises(AttributeError):
+        x.other = 1
+
+    y = (x * x - x / x + 1 - x) ** 2
+    assert type(y) is DualNumber
+    assert y.real == 4.0 and y.dual == 2 * 2.0 * 3.0
+    for op in (x.__add__, x.__sub__, x.__rsub__, x.__mul__, x.__truediv__, x.__pow__, x.__eq__):
+        with pytest.raises(TypeError):
+            op("a")
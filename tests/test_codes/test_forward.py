@@ -17,6 +17,16 @@ class TestForwardAD:
         assert np.array_equal(np.around(z.Dpf, 4),
                               np.array([[-0.4794, 8.], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, 0.]]))
 
+    def test_vector_mode(self):
+        vars = {f'x{i}': float(i) for i in range(200)}
+        fcts = [' + '.join(f'x{i} ** 2' for i in range(200)), 'sin(x1) * x199', '7']
+        z = ForwardAD(vars, fcts)
+
+        assert np.allclose(z.Dpf[0], 2 * np.arange(200))
+        assert z.Dpf[1, 1] == np.cos(1) * 199 and z.Dpf[1, 199] == np.sin(1)
+        assert np.count_nonzero(z.Dpf[1]) == 2
+        assert z.func_evals[2] == 7 and not z.Dpf[2].any()
+
     def test_repr_str(self):
         vars = {'x': 0.5, 'y': 4}
         fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
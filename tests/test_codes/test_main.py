@@ -0,0 +1,93 @@
+import sys
+sys.path.append("./src/")
+
+import json
+
+import numpy as np
+import pytest
+from team20ad.__main__ import main, read_points
+from team20ad.compiledAD import CompiledAD
+from team20ad.primitives import register
+
+
+funcs = ['x * y', 'exp(x - y)']
+
+
+def ndjson(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestMain:
+
+    def test_read_points(self, tmp_path):
+        (tmp_path / 'a.csv').write_text('y,x\n1,2\n3,4\n5,6\n')
+        (tmp_path / 'b.csv').write_text('2,1\n4,3\n')
+        (tmp_path / 'c.ndjson').write_text('{"x": 2, "y": 1}\n\n[4, 3]\n')
+        np.save(tmp_path / 'd.npy', np.array([[2., 1.], [4., 3.], [6., 5.]]))
+        for name in ('a.csv', 'b.csv', 'c.ndjson', 'd.npy'):
+            chunks = list(read_points(str(tmp_path / name), ['x', 'y'], 2))
+            assert [len(c) for c in chunks] in ([2, 1], [2])
+            assert np.array_equal(chunks[0], [[2, 1], [4, 3]])
+        with pytest.raises(ValueError):
+            list(read_points(str(tmp_path / 'a.csv'), ['x', 'z'], 2))
+        with pytest.raises(ValueError):
+            list(read_points(str(tmp_path / 'a.txt'), ['x'], 2))
+
+    def test_modes(self, tmp_path, capsys):
+        X = np.random.default_rng(0).uniform(-1, 1, (50, 2))
+        np.save(tmp_path / 'p.npy', X)
+        ref = CompiledAD(['x', 'y'], funcs).evaluate_batch(X)
+        for mode in ('batch', 'auto', 'forward', 'reverse', 'sparse', 'mixed', 'cross'):
+            out = str(tmp_path / f'{mode}.ndjson')
+            argv = [str(tmp_path / 'p.npy'), '-v', 'x,y', '-f', funcs[0], '-f', funcs[1],
+                    '-m', mode, '-c', '16', '-o', out]
+            assert main(argv) == 0
+            rows = ndjson(out)
+            assert np.allclose([r['f'] for r in rows], ref[0])
+            assert np.allclose([r['J'] for r in rows], ref[1])
+        assert '50 points' in capsys.readouterr().err
+
+    def test_spec_and_csv(self, tmp_path, capsys):
+        (tmp_path / 'spec.json').write_text(json.dumps({'vars': ['x', 'y'], 'funcs': funcs,
+                                                        'workers': 2, 'chunk_size': 1}))
+        (tmp_path / 'p.csv').write_text('x,y\n1,2\n3,4\n')
+        assert main([str(tmp_path / 'p.csv'), '--spec', str(tmp_path / 'spec.json'),
+                     '-o', str(tmp_path / 'out.csv'), '-q']) == 0
+        lines = (tmp_path / 'out.csv').read_text().splitlines()
+        assert lines[0] == 'f0,f1,df0/dx,df0/dy,df1/dx,df1/dy'
+        assert np.allclose([float(v) for v in lines[2].split(',')],
+                           [12, np.exp(-1), 4, 3, np.exp(-1), -np.exp(-1)])
+        assert capsys.readouterr().err == ''
+
+        # stdout output and errors
+        assert main(['-v', 'x', '-v', 'y', str(tmp_path / 'p.csv'), '-f', 'x + y', '-q']) == 0
+        assert json.loads(capsys.readouterr().out.splitlines()[1]) == {'f': [7.0], 'J': [[1.0, 1.0]]}
+        assert main(['-v', 'x, y', str(tmp_path / 'p.csv'), '-f', 'x + z']) == 1
+        with pytest.raises(SystemExit):
+            main([str(tmp_path / 'p.csv'), '-f', 'x'])
+        with pytest.raises(SystemExit):
+            main([str(tmp_path / 'p.csv'), '-v', 'x', '-f', 'x', '-o', 'out.npz'])
+
+    def test_bad_input(self, tmp_path, capsys):
+        (tmp_path / 'p.ndjson').write_text('{"x": 1, "y": 2}\n{"x": 3}\n')
+        (tmp_path / 'p.csv').write_text('x,y\n1,2\n3\n')
+        (tmp_path / 'q.csv').write_text('1,2\n3,4,5\n')
+        for name, line in (('p.ndjson', 2), ('p.csv', 3), ('q.csv', 2)):
+            assert main([str(tmp_path / name), '-v', 'x,y', '-f', 'x * y', '-o',
+                         str(tmp_path / 'out.ndjson')]) == 1
+            assert capsys.readouterr().err.startswith(f"error: {tmp_path / name}, line {line}:")
+
+        # a spec file that cannot be read is reported by the parser
+        with pytest.raises(SystemExit) as exit:
+            main([str(tmp_path / 'p.csv'), '--spec', str(tmp_path / 'missing.json')])
+        assert exit.value.code == 2
+        assert 'error: cannot read the spec file' in capsys.readouterr().err
+
+        # a custom primitive raising KeyError is reported too
+        table = {1.0: 5.0}
+        register('table_test', lambda x: table[x], lambda x, y: 0.0)
+        (tmp_path / 'spec.json').write_text(json.dumps({'vars': ['x', 'y'], 'funcs': ['table_test(y)']}))
+        (tmp_path / 'r.ndjson').write_text('{"x": 1, "y": 2}\n')
+        assert main([str(tmp_path / 'r.ndjson'), '--spec', str(tmp_path / 'spec.json'), '-q']) == 1
+        assert capsys.readouterr().err == 'error: 2.0\n'
@@ -0,0 +1,172 @@
+import sys
+sys.path.append("./src/")
+
+import math
+
+import numpy as np
+import pytest
+from team20ad import elementary, tape
+from team20ad.dualNumber import DualNumber
+from team20ad.primitives import *
+from team20ad.reverseAD import Node
+
+
+POINTS = [0.3, -0.45, 0.8]
+PARAMS = {'log': (2,), 'logistic': (2, 3, 0.5)}
+
+
+class TestRegistry:
+
+    @pytest.mark.parametrize('name', list(PRIMITIVES))
+    def test_scalar_vector_and_partial_agree(self, name):
+        prim = PRIMITIVES[name]
+        points = [abs(x) for x in POINTS] if prim.domain and not prim.domain(-0.45) else POINTS
+        for params in [(), PARAMS.get(name, ())]:
+            values = [prim.scalar(x, *params) for x in points]
+            assert np.allclose(prim.vector(np.array(points), *params), values)
+
+            h = 1e-6
+            fd = [(prim.scalar(x + h, *params) - prim.scalar(x - h, *params)) / (2 * h) for x in points]
+            d_scalar = [prim.partial(SCALAR_LIB, x, y, *params) for x, y in zip(points, values)]
+            d_vector = prim.partial(np, np.array(points), np.array(values), *params)
+            assert np.allclose(d_scalar, fd, atol=1e-6)
+            assert np.allclose(d_vector, d_scalar)
+
+    def test_backends_generated(self):
+        for name, prim in PRIMITIVES.items():
+            assert elementary.FUNCTIONS[name].__name__ == name
+            assert tape.FUNCTIONS[name].__name__ == name
+            assert name in tape.OPS
+            assert callable(getattr(Node, name))
+        assert elementary.sin is elementary.FUNCTIONS['sin']
+        assert tape.LOGISTIC == tape.OPS['logistic']
+
+    def test_signature_and_bind(self):
+        prim = PRIMITIVES['logistic']
+        assert prim.param_names == ('L', 'k', 'x_0') and prim.defaults == (1, 1, 0)
+        assert prim.bind((2,), {'x_0': 3}) == (2, 1, 3)
+        with pytest.raises(TypeError):
+            prim.bind((), {'M': 1})
+        with pytest.raises(TypeError):
+            prim.bind((1, 2, 3, 4), {})
+        assert elementary.logistic(0.2, L=2, k=3) == elementary.logistic(0.2, 2, 3)
+
+    def test_check(self):
+        PRIMITIVES['sqrt'].check(np.array([1.0, 2.0]))
+        with pytest.raises(ValueError):
+            PRIMITIVES['sqrt'].check(np.array([1.0, -2.0]))
+        with pytest.raises(ValueError, match='arcsin'):
+            PRIMITIVES['arcsin'].check(2.0)
+        PRIMITIVES['exp'].check(1e6)
+
+    def test_new_primitive(self):
+        square = Primitive('square', lambda x, c = 1: c * x * x, lambda x, c = 1: c * x * x,
+                           lambda lib, x, y, c = 1: 2 * c * x)
+        assert square.param_names == ('c',)
+        f = elementary._elementary(square)
+        assert f(3.0) == 9.0 and f(3.0, 2) == 18.0
+        d = f(DualNumber(3.0, np.array([1.0, 0.0])), c=2)
+        assert d.real == 18.0 and np.array_equal(d.dual, [12.0, 0.0])
+        batched = f(DualNumber(np.array([1.0, 2.0]), np.ones((1, 2))))
+        assert np.array_equal(batched.real, [1.0, 4.0]) and np.array_equal(batched.dual, [[2.0, 4.0]])
+        with pytest.raises(TypeError):
+            Primitive('bad', lambda x, c: x, lambda x, c: x, lambda lib, x, y, c: 1)
+
+
+class TestRegister:
+
+    def test_engines(self):
+        from team20ad.compiledAD import CompiledAD
+        from team20ad.forwardAD import ForwardAD
+        from team20ad.reverseAD import ReverseAD
+        from team20ad.wrapperAD import AD
+
+        calls = []
+        def value(x, a = 1.0):
+            calls.append(x)
+            return math.erf(a * x)
+        def derivative(x, y, a = 1.0):
+            return 2 * a / math.sqrt(math.pi) * math.exp(-(a * x) ** 2)
+
+        AD.register('erf_test', value, derivative)
+        funcs = ['erf_test(x * y) + y', 'erf_test(x, 2) * x']
+        expected_vals = [math.erf(0.5) + 2, math.erf(0.5) * 0.25]
+        g1, g2 = derivative(0.5, None), derivative(0.25, None, 2.0)
+        expected = np.array([[2 * g1, 0.25 * g1 + 1], [g2 * 0.25 + math.erf(0.5), 0]])
+
+        for engine in (ForwardAD, ReverseAD):
+            res = engine({'x': 0.25, 'y': 2.0}, funcs)
+            assert np.allclose(res.func_evals, expected_vals)
+            assert np.allclose(res.Dpf, expected)
+        f = CompiledAD(['x', 'y'], funcs)
+        assert np.allclose(f([0.25, 2.0])[1], expected)
+
+        # one graph node per call
+        assert sum(op == 'erf_test' for op, _, _ in f.graph.nodes) == 2
+        calls.clear()
+        f.jvp([0.25, 2.0], [1.0, 0.0])
+        assert len(calls) == 2
+
+        # batched evaluation falls back to elementwise kernels
+        vals, jac = f.evaluate_batch(np.array([[0.25, 2.0], [0.1, 1.0]]))
+        assert np.allclose(jac[0], expected)
+        assert np.isclose(vals[1, 0], math.erf(0.1) + 1)
+
+        # Node and TapeVar methods
+        x = Node(0.5)
+        z = Node.erf_test(x)
+        assert z.var == math.erf(0.5) and x.partial() == g1
+        assert tape.TapeVar.erf_test is not None
+
+    def test_vectorized_and_domain(self):
+        register('sqrt3_test', lambda x: x ** (1 / 3), lambda x, y: 1 / (3 * y * y),
+                 vector=np.cbrt, vector_derivative=lambda x, y: 1 / (3 * y * y),
+                 domain=lambda x: x > 0)
+        f = elementary.FUNCTIONS['sqrt3_test']
+        assert np.allclose(f(np.array([8.0, 27.0])), [2, 3])
+        d = f(DualNumber(np.array([8.0, 27.0]), np.ones((1, 2))))
+        assert np.allclose(d.dual, [[1 / 12, 1 / 27]])
+        with pytest.raises(ValueError, match='sqrt3_test'):
+            f(-1.0)
+        with pytest.raises(ValueError):
+            Node.sqrt3_test(Node(-1.0))
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            register('sin', math.sin, lambda x, y: math.cos(x))
+        with pytest.raises(ValueError):
+            register('sin', math.sin, lambda x, y: math.cos(x), overwrite=True)
+        with pytest.raises(ValueError):
+            register('not a name', math.sin, lambda x, y: math.cos(x))
+
+        register('twice_test', lambda x: 2 * x, lambda x, y: 2)
+        with pytest.raises(ValueError):
+            register('twice_test', lambda x: 3 * x, lambda x, y: 3)
+        register('twice_test', lambda x: 3 * x, lambda x, y: 3, overwrite=True)
+        assert elementary.FUNCTIONS['twice_test'](DualNumber(1.0)).dual == 3
+        assert tape.FUNCTIONS['twice_test'](2.0) == 6.0
+
+    def test_ufunc_and_builtin(self):
+        from team20ad.compiledAD import CompiledAD
+        from team20ad.forwardAD import ForwardAD
+        from team20ad.reverseAD import ReverseAD
+
+        usin = register('usin_test', np.sin, lambda x, y: math.cos(x),
+                        vector_derivative=lambda x, y: np.cos(x))
+        mlog = register('mlog_test', math.log, lambda x, y: 1 / x)
+        assert usin.param_names == () and mlog.param_names == ()
+        assert usin.vector is np.sin
+
+        funcs = ['usin_test(x) * y', 'mlog_test(x * y)']
+        expected = [[math.cos(0.5) * 2, math.sin(0.5)], [2.0, 0.5]]
+        for engine in (ForwardAD, ReverseAD):
+            assert np.allclose(engine({'x': 0.5, 'y': 2.0}, funcs).Dpf, expected)
+        f = CompiledAD(['x', 'y'], funcs)
+        assert np.allclose(f([0.5, 2.0])[1], expected)
+        vals, jac = f.evaluate_batch(np.array([[0.5, 2.0], [1.0, 1.0]]))
+        assert np.allclose(jac[0], expected) and np.isclose(vals[1, 1], 0.0)
+
+        # parameters the signature does not list are given explicitly
+        scale = register('scale_test', lambda x, *c: c[0] * x, lambda x, y, c: c, params={'c': 1.0})
+        assert scale.param_names == ('c',) and scale.defaults == (1.0,)
+        assert np.allclose(CompiledAD(['x'], ['scale_test(x) + scale_test(x, 3)'])([2.0])[1], [[4.0]])
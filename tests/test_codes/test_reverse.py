@@ -29,3 +29,44 @@ def test_call(capfd):
     z()  # outputs to std out
     out, err = capfd.readouterr()
     assert out is not None
+
+
+def test_reverse_matches_forward():
+    from team20ad.forwardAD import ForwardAD
+    vars = {'x': 0.5, 'y': 4}
+    fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5', '2']
+    z = ReverseAD(vars, fcts)
+
+    assert np.allclose(z.Dpf, ForwardAD(vars, fcts).Dpf)
+    assert z.Dpf.shape == (5, 2)
+
+
+def test_reverse_replay():
+    fcts = ['x * y', 'exp(x + y) * y', 'sin(x) - 1']
+    z = ReverseAD({'x': 1, 'y': 2}, fcts)
+    tape_size = len(z.tape)
+    for point in ({'x': 0.5, 'y': -1}, [3, 0.25]):
+        func_evals, Dpf = z.replay(point)
+        fresh = ReverseAD(point if isinstance(point, dict) else {'x': 3, 'y': 0.25}, fcts)
+        assert np.allclose(func_evals, fresh.func_evals)
+        assert np.allclose(Dpf, fresh.Dpf)
+        assert len(z.tape) == tape_size
+    assert z.var_dict == {'x': 3, 'y': 0.25}
+
+def test_memory_per_operation():
+    import gc
+    import tracemalloc
+
+    # 20 outputs of 300 distinct terms each, about 18000 tape entries
+    fcts = [' + '.join(f'sin(x * {k} + {j})' for k in range(1, 301)) for j in range(20)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    z = ReverseAD({'x': 0.5}, fcts)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    assert z.tape._index is None
+    retained -= z.tape._adjoint_block.nbytes
+    assert len(z.tape) > 17000
+    assert retained / len(z.tape) < 80
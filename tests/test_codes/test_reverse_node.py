@@ -509,3 +509,30 @@ def test_node_logistic():
 
     with pytest.raises(TypeError):
         y = Node.logistic("string")
+
+
+def test_node_fused():
+    x, y = Node(1.0), Node(2.0)
+    z = Node.logsumexp(x, y, 0.5)
+    total = np.exp(1) + np.exp(2) + np.exp(0.5)
+    assert np.isclose(z.var, np.log(total))
+    assert np.isclose(x.partial(), np.exp(1) / total)
+    assert np.isclose(y.partial(), np.exp(2) / total)
+    assert Node.logsumexp(1000.0, 1000.0) == 1000.0 + np.log(2)
+
+    x, y = Node(1.0), Node(2.0)
+    z = Node.sumsq(x, y, 3)
+    assert z.var == 14.0 and x.partial() == 2.0 and y.partial() == 4.0
+
+    x = Node(1000.0)
+    z = Node.softplus(x)
+    assert z.var == 1000.0 and x.partial() == 1.0
+    assert Node.softplus(0.0) == np.log(2)
+
+    x = Node(1.0)
+    z = Node.logistic(x, L=2, k=3, x_0=0.5)
+    s = 1 / (1 + np.exp(-1.5))
+    assert np.isclose(z.var, 2 * s) and np.isclose(x.partial(), 6 * s * (1 - s))
+
+    with pytest.raises(TypeError):
+        Node.sumsq(Node(1.0), "x")
@@ -0,0 +1,81 @@
+import sys
+sys.path.append("./src/")
+
+import asyncio
+import json
+
+import numpy as np
+from team20ad.compiledAD import CompiledAD
+from team20ad.server import *
+
+
+names = ['x', 'y']
+funcs = ['x * y', 'log(x) + y ** 2']
+
+
+class TestServer:
+
+    def test_batching(self, tmp_path):
+        X = np.random.default_rng(0).uniform(0.5, 2, (200, 2))
+        ref = CompiledAD(names, funcs).evaluate_batch(X)
+
+        async def main():
+            server = await GradientServer(window = 0.05).start(str(tmp_path / 'ad.sock'))
+            client = await GradientClient.connect(*server.address)
+            results = await asyncio.gather(*(client.evaluate(names, funcs, x) for x in X))
+            # a point outside the domain only fails its own request
+            good, bad = await asyncio.gather(client.evaluate(names, funcs, {'x': 1, 'y': 2}),
+                                             client.evaluate(names, funcs, [-1, 2]),
+                                             return_exceptions = True)
+            await client.close()
+            await server.close()
+            return server.stats, results, good, bad
+
+        stats, results, good, bad = asyncio.run(main())
+        assert np.allclose([F for F, J in results], ref[0])
+        assert np.allclose([J for F, J in results], ref[1])
+        assert stats['requests'] == 202 and stats['batches'] <= 4
+        assert np.allclose(good[1], [[2, 1], [1, 4]])
+        assert isinstance(bad, ValueError)
+
+    def test_protocol(self):
+        async def main():
+            server = await GradientServer(max_batch = 1, max_functions = 1).start(port = 0)
+            reader, writer = await asyncio.open_connection(*server.address[1:])
+            lines = [{'id': 'a', 'vars': ['x'], 'funcs': 'x ** 2', 'point': [3]},
+                     {'id': 'b', 'vars': ['x'], 'funcs': ['exp(x)'], 'point': [0]},
+                     {'id': 'c', 'vars': ['x']},
+                     {'id': 'd', 'vars': ['x'], 'funcs': ['z'], 'point': [0]},
+                     [1, 2]]
+            for line in lines:
+                writer.write((json.dumps(line) + '\n').encode())
+            writer.write(b'not json\n')
+            writer.write_eof()
+            responses = [json.loads(line) async for line in reader]
+            writer.close()
+            await server.close()
+            return server, responses
+
+        server, responses = asyncio.run(main())
+        by_id = {r['id']: r for r in responses if r['id'] is not None}
+        assert by_id['a'] == {'id': 'a', 'f': [9.0], 'J': [[6.0]]}
+        assert by_id['b']['J'] == [[1.0]]
+        assert 'funcs' in by_id['c']['error'] and 'z' in by_id['d']['error']
+        assert sum(r['id'] is None for r in responses) == 2
+        assert len(server._batchers) == 1
+
+    def test_close(self):
+        async def main():
+            server = await GradientServer(window = 10).start(port = 0)
+            client = await GradientClient.connect(*server.address)
+            request = asyncio.ensure_future(client.evaluate(names, funcs, [1, 2]))
+            while not server._batchers:
+                await asyncio.sleep(0.01)
+            # the queued request is evaluated and answered before the server closes
+            await server.close()
+            assert not server._tasks and server.stats['batches'] == 1
+            func_evals, Dpf = await request
+            await client.close()
+            return Dpf
+
+        assert np.allclose(asyncio.run(main()), [[2, 1], [1, 4]])
@@ -0,0 +1,60 @@
+import sys
+sys.path.append("./src/")
+
+import numpy as np
+import pytest
+from team20ad.compiledAD import CompiledAD
+from team20ad.sparseAD import *
+from team20ad.wrapperAD import AD
+
+
+def banded(n):
+    names = [f'x{i}' for i in range(n)]
+    funcs = [f'x{i} ** 2 - sin(x{i + 1}) * x{i - 1}' if 0 < i < n - 1 else f'exp(x{i})'
+             for i in range(n)]
+    return names, funcs
+
+
+class TestSparseAD:
+
+    def test_pattern_and_coloring(self):
+        names, funcs = banded(8)
+        f = CompiledAD(names, funcs)
+        pattern = sparsity_pattern(f.graph)
+        assert pattern[0] == [0] and pattern[3] == [2, 3, 4]
+        colors = greedy_coloring(pattern, 8)
+        for cols in pattern:
+            assert len({colors[i] for i in cols}) == len(cols)
+        assert max(colors) + 1 == 3
+
+    def test_banded(self):
+        names, funcs = banded(200)
+        x = np.linspace(0.1, 1, 200)
+        dense = CompiledAD(names, funcs)(x)
+        for mode in ('forward', 'reverse'):
+            f = SparseAD(names, funcs, mode=mode)
+            assert f.mode == mode and f.num_colors == 3
+            func_evals, J = f(x)
+            assert J.nnz == 3 * 198 + 2
+            assert np.allclose(func_evals, dense[0])
+            assert np.allclose(J.toarray(), dense[1])
+
+            data, indices, indptr = J.tocsr()
+            assert np.array_equal(indptr[:3], [0, 1, 4])
+            assert np.allclose(data[indptr[5]:indptr[6]], dense[1][5, indices[indptr[5]:indptr[6]]])
+
+    def test_auto_mode(self):
+        # one dense row: columns all conflict, rows do not
+        f = AD.compile(['x', 'y', 'z'], ['x * y * z', '1', 'log(y)'], sparse = True)
+        assert isinstance(f, SparseAD)
+        assert f.mode == 'reverse' and f.num_colors == 2
+        func_evals, J = f({'x': 1, 'y': 2, 'z': 3})
+        assert np.allclose(J.toarray(), [[6, 3, 2], [0, 0, 0], [0, 0.5, 0]])
+        assert np.allclose(func_evals, [6, 1, np.log(2)])
+        assert isinstance(repr(f), str) and isinstance(repr(J), str)
+
+        f = SparseAD(['x', 'y'], ['x + 1', 'y * 2', 'x * y'])
+        assert f.mode == 'forward'
+
+        with pytest.raises(ValueError):
+            SparseAD(['x'], 'x', mode='sideways')
@@ -0,0 +1,183 @@
+import sys
+sys.path.append("./src/")
+
+import numpy as np
+import pytest
+from team20ad.forwardAD import ForwardAD
+from team20ad.tape import *
+
+
+def test_tape_record():
+    tape = Tape()
+    x, y = tape.variable(1.0), tape.variable(2.0)
+    z = x * y + sin(x)
+
+    assert len(tape) == 5
+    assert list(tape.ops) == [VAR, VAR, MUL, SIN, ADD]
+    assert list(tape.arg0[2:]) == [0, 0, 2] and list(tape.arg1[2:]) == [1, -1, 3]
+    assert z.value == 2 + np.sin(1)
+    assert np.allclose(tape.gradient(z, [x, y]), [2 + np.cos(1), 1])
+    assert isinstance(repr(tape), str) and isinstance(repr(z), str)
+
+
+def test_tape_matches_forward():
+    vars = {'x': 0.5, 'y': 0.25}
+    fcts = ['x ** y + y ** 3 - 2 ** x', '3 / x - y / 2 + x / y', '-(x - 1) + (1 - y) * 2',
+            'sqrt(x) * exp(y) * log(x) * log(y, 2)', 'sin(x) + cos(y) + tan(x * y)',
+            'arcsin(x) + arccos(y) + arctan(x + y)', 'sinh(x) * cosh(y) / tanh(x)',
+            'logistic(x) + logistic(y, L=2, k=3, x_0=1)', 'x - 1 + 5 * x']
+    z = ForwardAD(vars, fcts)
+    for j, f in enumerate(fcts):
+        tape = Tape()
+        inputs = {k: tape.variable(v) for k, v in vars.items()}
+        out = eval(f, dict(FUNCTIONS), dict(inputs))
+        assert np.isclose(out.value, z.func_evals[j])
+        assert np.allclose(tape.gradient(out, list(inputs.values())), z.Dpf[j])
+
+
+def test_tape_deep_expression():
+    tape = Tape()
+    x = tape.variable(0.5)
+    y = x
+    for _ in range(100000):
+        y = sin(y) + x
+    grad = tape.gradient(y, [x])
+    assert len(tape) == 200001
+    assert np.isfinite(grad[0])
+
+    # the adjoint buffer is reused by later sweeps
+    buffer = tape._adjoint
+    tape.gradient(x, [x])
+    assert tape._adjoint is buffer
+    assert tape.gradient(x, [x])[0] == 1
+
+
+def test_tape_scalars_and_errors():
+    assert exp(0) == 1 and log(8, 2) == 3
+    assert tape_gradient_of_constant() == [0, 0]
+
+    tape = Tape()
+    x = tape.variable(1.0)
+    assert x < 2 and x > 0 and x <= 1 and x >= 1
+    assert tape.gradient(abs(1 - x * 3), [x])[0] == 3
+    assert +x is x
+    with pytest.raises(TypeError):
+        tape.variable("x")
+    with pytest.raises(TypeError):
+        x + "x"
+    with pytest.raises(TypeError):
+        "x" * x
+    with pytest.raises(TypeError):
+        sin("x")
+    with pytest.raises(ZeroDivisionError):
+        x / 0
+    with pytest.raises(ValueError):
+        x + Tape().variable(1.0)
+    with pytest.raises(ValueError):
+        sqrt(-x)
+
+
+def tape_gradient_of_constant():
+    tape = Tape()
+    x, y = tape.variable(1.0), tape.variable(2.0)
+    return list(tape.gradient(3.0, [x, y]))
+
+
+def test_tape_shared_outputs():
+    tape = Tape(reuse = True)
+    x, y = tape.variable(1.0), tape.variable(2.0)
+    e = exp(x + y)
+    outputs = [e * 2, exp(x + y) + y, sin(x) * x, 4.0, x]
+    assert exp(x + y).index == e.index
+    assert len(tape) == 8
+    assert (x + 1).index != (y + 1).index
+
+    jac = tape.jacobian(outputs, [x, y])
+    expected = np.array([[2 * np.exp(3), 2 * np.exp(3)], [np.exp(3), np.exp(3) + 1],
+                         [np.cos(1) + np.sin(1), 0], [0, 0], [1, 0]])
+    assert np.allclose(jac, expected)
+    for j in (0, 1, 2, 4):
+        assert np.allclose(tape.gradient(outputs[j], [x, y]), expected[j])
+    assert np.array_equal(tape.jacobian([4.0], [x]), [[0]])
+
+    # sealing releases the index; later operations are appended as they come
+    tape.seal()
+    size = len(tape)
+    assert exp(x + y).index == size + 1 and len(tape) == size + 2
+
+
+def test_tape_replay():
+    tape = Tape(reuse = True)
+    x, y = tape.variable(1.0), tape.variable(2.0)
+    z = x ** y * logistic(x, L=2) + log(y, 2) / sqrt(x) - 3 ** x
+    size = len(tape)
+
+    for a, b in [(0.5, 3.0), (2.0, 0.25), (1.0, 2.0)]:
+        tape.replay([a, b])
+        fresh = Tape()
+        u, v = fresh.variable(a), fresh.variable(b)
+        w = u ** v * logistic(u, L=2) + log(v, 2) / sqrt(u) - 3 ** u
+        assert len(tape) == size
+        assert np.isclose(z.value, w.value)
+        assert np.allclose(tape.gradient(z, [x, y]), fresh.gradient(w, [u, v]))
+
+    with pytest.raises(ValueError):
+        tape.replay([1.0])
+
+
+def test_tape_compact_storage():
+    tape = Tape()
+    x, y = tape.variable(1.0), tape.variable(2.0)
+    z = logistic(x * y, L=2, k=3) + 1
+    for column in (tape.ops, tape.arg0, tape.arg1):
+        assert column.typecode == 'i' and column.itemsize == 4
+    for column in (tape.consts, tape.values, tape.partial0, tape.partial1):
+        assert column.typecode == 'd'
+    assert tape.params == {3: (2, 3, 0)}
+    assert tape.consts[4] == 1.0 and tape.consts[2] == 0.0
+
+    tape.replay([2.0, 0.5])
+    assert np.isclose(z.value, 2 / (1 + np.exp(-3)) + 1)
+
+
+def test_tape_node_interface():
+    tape = Tape()
+    x, y = tape.variable(0.5), tape.variable(2.0)
+    z = TapeVar.sin(x) * TapeVar.exp(y) + TapeVar.log(y, 2)
+    val, der = z.g_derivatives([x, y])
+    assert z.var == val == z.value
+    assert np.allclose(der, [np.cos(0.5) * np.exp(2), np.sin(0.5) * np.exp(2) + 1 / (2 * np.log(2))])
+
+    assert x == tape.variable(0.5)
+    assert x != y
+    with pytest.raises(TypeError):
+        x == 0.5
+
+
+def test_tape_fused():
+    tape = Tape()
+    x, y, z = tape.variable(1.0), tape.variable(2.0), tape.variable(-1.0)
+    size = len(tape)
+    f = logsumexp(x, y, z, 0.5)
+    assert len(tape) == size + 3
+    total = np.exp([1.0, 2.0, -1.0, 0.5]).sum()
+    assert np.isclose(f.value, np.log(total))
+    assert np.allclose(tape.gradient(f, [x, y, z]), np.exp([1.0, 2.0, -1.0]) / total)
+
+    size = len(tape)
+    g = sumsq(x, y, z, 2)
+    assert len(tape) == size + 3
+    assert g.value == 10.0
+    assert np.array_equal(tape.gradient(g, [x, y, z]), [2.0, 4.0, -2.0])
+    assert np.array_equal(tape.gradient(sumsq(y), [x, y]), [0.0, 4.0])
+
+    h = softplus(x * 800)
+    assert np.isclose(h.value, 800) and np.isclose(tape.gradient(h, [x]), 800)
+    assert logsumexp(1.0, 2.0) == np.logaddexp(1.0, 2.0)
+
+    tape.replay([0.0, 0.0, 0.0])
+    assert np.isclose(f.value, np.log(3 + np.exp(0.5)))
+    assert g.value == 4.0
+
+    with pytest.raises(ValueError):
+        logsumexp(x, Tape().variable(1.0))
@@ -0,0 +1,113 @@
+import sys
+sys.path.append("./src/")
+
+import math
+import numpy as np
+import pytest
+from team20ad.compiledAD import CompiledAD
+from team20ad.elementary import *
+from team20ad.taylorNumber import TaylorNumber
+
+
+def identity(value, order = 6):
+    return np.array([value, 1.0] + [0.0] * (order - 1))
+
+
+class TestTaylorNumber:
+
+    def test_initializer(self):
+        with pytest.raises(TypeError):
+            TaylorNumber(["a", "b"])
+        with pytest.raises(ValueError):
+            TaylorNumber([])
+        with pytest.raises(ValueError):
+            TaylorNumber.variable(1.0, -1)
+        x = TaylorNumber.variable(2.0, 3, direction = 0.5)
+        assert np.array_equal(x.coeffs, [2, 0.5, 0, 0])
+        assert x.order == 3 and x.real == 2
+        assert isinstance(repr(x), str) and isinstance(str(x), str)
+
+    def test_known_derivatives(self):
+        a = 0.3
+        x = TaylorNumber.variable(a, 6)
+        k = np.arange(7)
+        assert np.allclose(exp(x).derivatives(), np.exp(a))
+        assert np.allclose(sin(x).derivatives(), np.sin(a + k * np.pi / 2))
+        assert np.allclose(cos(x).derivatives(), np.cos(a + k * np.pi / 2))
+        assert np.allclose(log(x).derivatives()[1:],
+                           [(-1) ** (i - 1) * math.factorial(i - 1) / a ** i for i in range(1, 7)])
+        assert np.allclose(sinh(x).derivatives()[::2], np.sinh(a))
+        assert np.allclose(cosh(x).derivatives()[1::2], np.sinh(a))
+        assert np.allclose((x ** 3).derivatives(), [a ** 3, 3 * a ** 2, 6 * a, 6, 0, 0, 0])
+        assert np.allclose((x ** 2.5).derivatives()[:3], [a ** 2.5, 2.5 * a ** 1.5, 3.75 * a ** 0.5])
+        assert np.allclose((2 ** x).derivatives(), 2 ** a * np.log(2) ** k)
+        assert np.allclose((1 / x).derivatives(), [(-1) ** i * math.factorial(i) / a ** (i + 1) for i in k])
+        assert np.allclose(arctan(x).derivatives()[:3], [np.arctan(a), 1 / (1 + a ** 2), -2 * a / (1 + a ** 2) ** 2])
+        assert np.allclose(arcsin(x).derivatives()[:3], [np.arcsin(a), (1 - a ** 2) ** -0.5, a * (1 - a ** 2) ** -1.5])
+        assert np.allclose(tan(x).derivatives()[:3], [np.tan(a), 1 / np.cos(a) ** 2, 2 * np.tan(a) / np.cos(a) ** 2])
+
+        s = logistic(a, L = 2, k = 3, x_0 = 0.1)
+        assert np.allclose(logistic(x, L = 2, k = 3, x_0 = 0.1).derivatives()[:2], [s, 3 * s * (1 - s / 2)])
+
+    def test_identities(self):
+        a = 0.4
+        x = TaylorNumber.variable(a, 6)
+        assert np.allclose(sin(arcsin(x)).coeffs, identity(a))
+        assert np.allclose(cos(arccos(x)).coeffs, identity(a))
+        assert np.allclose(arctan(tan(x)).coeffs, identity(a))
+        assert np.allclose(exp(log(x)).coeffs, identity(a))
+        assert np.allclose(sqrt(x * x).coeffs, identity(a))
+        assert np.allclose(log(x ** x).coeffs, (x * log(x)).coeffs)
+        assert np.allclose((cosh(x) ** 2 - sinh(x) ** 2).coeffs, [1, 0, 0, 0, 0, 0, 0])
+        assert np.allclose((tanh(x) * cosh(x) / sinh(x)).coeffs, [1, 0, 0, 0, 0, 0, 0])
+        assert np.allclose((log(x, 2) * np.log(2)).coeffs, log(x).coeffs)
+        assert np.allclose((3 - x + x / 2 - 1).coeffs, (2 - x * 0.5).coeffs)
+        assert np.allclose(abs(-x).coeffs, x.coeffs)
+
+    def test_batched(self):
+        a = np.array([0.1, 0.5, 0.9])
+        x = TaylorNumber.variable(a, 5)
+        y = tanh(x) * exp(x) / sqrt(1 + x)
+        assert y.coeffs.shape == (6, 3)
+        for i in range(3):
+            xi = TaylorNumber.variable(a[i], 5)
+            assert np.allclose(y.coeffs[:, i], (tanh(xi) * exp(xi) / sqrt(1 + xi)).coeffs)
+
+    def test_errors(self):
+        x = TaylorNumber.variable(0.0, 3)
+        assert np.array_equal((x ** 2).derivatives(), [0, 0, 2, 0])
+        with pytest.raises(ValueError):
+            x ** 0.5
+        with pytest.raises(ValueError):
+            x + TaylorNumber.variable(0.0, 4)
+        with pytest.raises(TypeError):
+            x * "a"
+        with pytest.raises(ZeroDivisionError):
+            1 / x
+        with pytest.raises(ZeroDivisionError):
+            x / 0
+        with pytest.raises(ValueError):
+            log(x)
+        with pytest.raises(ValueError):
+            arcsin(x + 1)
+        with pytest.raises(ValueError):
+            (-1) ** x
+
+
+def test_compiled_taylor():
+    f = CompiledAD(['x', 'y'], ['x ** 2 * y + sin(x * y)', 'exp(x) - y', '4'])
+    point, v = np.array([0.5, 1.5]), np.array([1.0, -2.0])
+    derivs = f.taylor(point, v, 4)
+
+    assert derivs.shape == (3, 5)
+    assert np.allclose(derivs[:, 0], f(point)[0])
+    assert np.allclose(derivs[:, 1], f.jvp(point, v)[1])
+    assert np.isclose(derivs[0, 2], v @ f.hessian(point) @ v)
+    assert np.allclose(derivs[1], [np.exp(0.5) - 1.5, np.exp(0.5) + 2] + [np.exp(0.5)] * 3)
+    assert np.array_equal(derivs[2], [4, 0, 0, 0, 0])
+
+    points = np.array([[0.5, 1.5], [1.0, 0.0], [-0.3, 2.0]])
+    batch = f.taylor(points, v, 4)
+    assert batch.shape == (3, 3, 5)
+    for i in range(3):
+        assert np.allclose(batch[i], f.taylor(points[i], v, 4))